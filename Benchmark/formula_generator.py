@@ -0,0 +1,72 @@
+"""Synthetic formula generator module.
+
+Reproducible random chemical formulas built from the elements table, used as benchmark input.
+"""
+from pathlib import Path
+from typing import List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from band_gap_ml.config import Config
+
+# Number of formulas drawn at a time, bounding the memory of the random element keys
+GENERATION_CHUNK_SIZE = 100000
+
+
+def load_element_symbols(elements_path: Union[str, Path] = Config.ELEMENTS_PATH) -> List[str]:
+    """
+    Load the symbols of elements with a complete set of properties.
+
+    Parameters:
+        elements_path (str or Path): Path to the elements CSV file.
+
+    Returns:
+        list: Element symbols.
+    """
+    elements_df = pd.read_csv(elements_path)
+    return elements_df.dropna()['Symbol'].tolist()
+
+
+def generate_formulas(n_formulas: int, seed: int = 0, max_elements: int = 4, fractional_share: float = 0.2,
+                      symbols: Optional[List[str]] = None) -> List[str]:
+    """
+    Generate random chemical formulas.
+
+    Every formula has 1 to `max_elements` distinct elements with integer amounts from 1 to 8,
+    or with fractional amounts such as 'Hg0.7Cd0.3Te' for a `fractional_share` of the formulas.
+    The same seed always gives the same formulas.
+
+    Parameters:
+        n_formulas (int): Number of formulas.
+        seed (int): Seed of the random number generator.
+        max_elements (int): Maximum number of elements per formula.
+        fractional_share (float): Share of formulas with fractional amounts.
+        symbols (list of str, optional): Element symbols to choose from. If None, uses the elements table.
+
+    Returns:
+        list: Chemical formulas.
+    """
+    symbols = list(symbols) if symbols is not None else load_element_symbols()
+    rng = np.random.default_rng(seed)
+
+    formulas = []
+    for start in range(0, n_formulas, GENERATION_CHUNK_SIZE):
+        size = min(GENERATION_CHUNK_SIZE, n_formulas - start)
+        n_elements = rng.integers(1, max_elements + 1, size=size)
+        is_fractional = rng.random(size) < fractional_share
+        # The smallest of random keys give distinct elements per formula without a per-row rng.choice call
+        element_order = np.argpartition(rng.random((size, len(symbols))), max_elements, axis=1)[:, :max_elements]
+        integer_amounts = rng.integers(1, 9, size=(size, max_elements))
+        fractional_amounts = rng.integers(1, 100, size=(size, max_elements)) / 10
+
+        # Python lists are much faster than NumPy scalars in the per-formula string building
+        rows = zip(n_elements.tolist(), is_fractional.tolist(), element_order.tolist(),
+                   integer_amounts.tolist(), fractional_amounts.tolist())
+        for n, fractional, order, integers, fractions in rows:
+            if fractional:
+                amounts = [f'{amount:g}' for amount in fractions[:n]]
+            else:
+                amounts = [str(amount) if amount > 1 else '' for amount in integers[:n]]
+            formulas.append(''.join(symbols[i] + amount for i, amount in zip(order[:n], amounts)))
+    return formulas
@@ -0,0 +1,345 @@
+"""Performance benchmark suite.
+
+Measures cold start, featurization, model loading, inference and the end-to-end API on synthetic
+formulas at several scale points and writes the results to a JSON file, so runs of different commits
+can be compared.
+
+Usage:
+    python -m Benchmark.run_benchmarks --output benchmark_results.json
+    python -m Benchmark.run_benchmarks --sizes 10,1000 --compare baseline.json
+"""
+import argparse
+import datetime
+import gc
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import pandas as pd
+
+from band_gap_ml import __version__
+from band_gap_ml.band_gap_predictor import BandGapPredictor
+from band_gap_ml.config import Config
+from band_gap_ml.vectorizer import FormulaVectorizer
+from Benchmark.formula_generator import generate_formulas
+
+DEFAULT_SIZES = [10, 100, 1000, 10000, 100000, 1000000]
+DEFAULT_MODEL_TYPES = ['best_model', 'gradientboosting', 'xgboost']
+
+# Root directory of the repository, added to the path of startup benchmark subprocesses
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+# Relative slowdown above which a comparison with a baseline is reported as a regression
+REGRESSION_THRESHOLD = 0.1
+
+
+def measure(func: Callable, repeats: int) -> List[float]:
+    """
+    Measure the wall time of a function.
+
+    Parameters:
+        func (callable): Function without arguments.
+        repeats (int): Number of measured runs.
+
+    Returns:
+        list: Wall times in seconds.
+    """
+    times = []
+    for _ in range(repeats):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def make_result(benchmark: str, rows: Optional[int], times: List[float], model_type: Optional[str] = None) -> dict:
+    """
+    Summarize the wall times of a benchmark.
+
+    Parameters:
+        benchmark (str): Benchmark name.
+        rows (int, optional): Number of input rows, or None for benchmarks without rows.
+        times (list): Wall times in seconds.
+        model_type (str, optional): Model type, for benchmarks of a model.
+
+    Returns:
+        dict: Benchmark result with min, median and mean times and throughput.
+    """
+    result = {
+        'benchmark': benchmark,
+        'model_type': model_type,
+        'rows': rows,
+        'repeats': len(times),
+        'times_seconds': times,
+        'min_seconds': min(times),
+        'median_seconds': statistics.median(times),
+        'mean_seconds': statistics.fmean(times),
+    }
+    if rows:
+        result['rows_per_second'] = rows / result['median_seconds']
+    return result
+
+
+def run_benchmark(results: list, benchmark: str, rows: Optional[int], func: Callable, repeats: int,
+                  model_type: Optional[str] = None):
+    """
+    Run one benchmark, print its result and append it to the results. Failures are recorded, not raised.
+
+    Parameters:
+        results (list): Results collected so far.
+        benchmark (str): Benchmark name.
+        rows (int, optional): Number of input rows.
+        func (callable): Function without arguments to measure.
+        repeats (int): Number of measured runs.
+        model_type (str, optional): Model type, for benchmarks of a model.
+    """
+    label = f"{benchmark}[{model_type or '-'}, rows={rows if rows is not None else '-'}]"
+    try:
+        result = make_result(benchmark, rows, measure(func, repeats), model_type)
+    except Exception as e:
+        print(f"{label}: failed: {e}")
+        results.append({'benchmark': benchmark, 'model_type': model_type, 'rows': rows, 'error': str(e)})
+        return
+    throughput = f", {result['rows_per_second']:.0f} rows/s" if rows else ''
+    print(f"{label}: median {result['median_seconds']:.4f} s{throughput}")
+    results.append(result)
+
+
+def get_environment() -> dict:
+    """
+    Describe the environment of a benchmark run.
+
+    Returns:
+        dict: Timestamp, git commit, package versions, Python version, platform and CPU count.
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=Config.CURRENT_DIR, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    versions = {}
+    for package in ['numpy', 'pandas', 'sklearn', 'xgboost', 'fastapi']:
+        try:
+            versions[package] = __import__(package).__version__
+        except ImportError:
+            versions[package] = None
+
+    return {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'git_commit': commit,
+        'band_gap_ml_version': __version__,
+        'python_version': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'package_versions': versions,
+    }
+
+
+def benchmark_featurization(results: list, formulas_by_size: dict, repeats: int, max_loop_rows: int):
+    """Benchmark the per-formula FormulaVectorizer.vectorize_formula loop and batched prepare_features."""
+    vectorizer = FormulaVectorizer()
+    # No cache, so every run featurizes all formulas
+    predictor = BandGapPredictor(cache_size=None)
+
+    for size, formulas in formulas_by_size.items():
+        if size <= max_loop_rows:
+            run_benchmark(results, 'vectorize_formula', size,
+                          lambda: [vectorizer.vectorize_formula(formula) for formula in formulas], repeats)
+        else:
+            print(f"vectorize_formula[-, rows={size}]: skipped, above --max_loop_rows={max_loop_rows}")
+
+        input_data = pd.DataFrame({'composition': formulas})
+        run_benchmark(results, 'prepare_features', size, lambda: predictor.prepare_features(input_data), repeats)
+
+
+def benchmark_models(results: list, formulas_by_size: dict, model_types: List[str], repeats: int):
+    """Benchmark model loading and predict_with_probabilities of every model type and prediction backend."""
+    features_by_size = {
+        size: BandGapPredictor(cache_size=None).prepare_features(pd.DataFrame({'composition': formulas}))
+        for size, formulas in formulas_by_size.items()
+    }
+
+    for model_type in model_types:
+        # The first load also imports the model libraries, so it is not measured
+        predictor = BandGapPredictor(model_type=model_type, cache_size=None)
+        try:
+            predictor.config.load_models()
+        except Exception as e:
+            print(f"Skipping benchmarks of {model_type}: {e}")
+            results.append({'benchmark': 'model_load', 'model_type': model_type, 'rows': None, 'error': str(e)})
+            continue
+
+        # A new Config loads the artifacts again on every run
+        run_benchmark(results, 'model_load', None, lambda: Config(model_type).load_models(), repeats, model_type)
+
+        # Alternative backends, where available for the model type
+        backend_predictors = {}
+        for backend in ('compiled', 'onnx'):
+            try:
+                backend_predictors[backend] = BandGapPredictor(model_type=model_type, cache_size=None,
+                                                               backend=backend).load_models()
+            except Exception as e:
+                print(f"Skipping {backend} backend benchmarks of {model_type}: {e}")
+
+        for size, features in features_by_size.items():
+            run_benchmark(results, 'predict_with_probabilities', size,
+                          lambda: predictor.predict_with_probabilities(features), repeats, model_type)
+            for backend, backend_predictor in backend_predictors.items():
+                run_benchmark(results, f'predict_with_probabilities_{backend}', size,
+                              lambda: backend_predictor.predict_with_probabilities(features), repeats, model_type)
+
+
+def benchmark_api(results: list, formulas_by_size: dict, model_types: List[str], repeats: int, max_api_rows: int):
+    """Benchmark end-to-end /predict_bandgap requests with a CSV upload through a local TestClient."""
+    from fastapi.testclient import TestClient
+
+    # Start the service without preloaded models and without a prediction cache, so that
+    # the first request of each model loads it and later requests are not served from the cache
+    os.environ['BANDGAP_PRELOAD_MODELS'] = ''
+    from band_gap_ml import app as app_module
+    app_module.model_registry.predictor_kwargs['cache_size'] = None
+
+    with TestClient(app_module.app) as client:
+        for model_type in model_types:
+            for size, formulas in formulas_by_size.items():
+                if size > max_api_rows:
+                    print(f"predict_bandgap_api[{model_type}, rows={size}]: skipped, above --max_api_rows={max_api_rows}")
+                    continue
+                contents = pd.DataFrame({'composition': formulas}).to_csv(index=False).encode('utf-8')
+
+                def request():
+                    response = client.post('/predict_bandgap', data={'model_type': model_type},
+                                           files={'file': ('formulas.csv', io.BytesIO(contents), 'text/csv')})
+                    if response.status_code != 200:
+                        raise RuntimeError(f"{response.status_code}: {response.text[:200]}")
+
+                # Warm-up request, which also loads the model
+                try:
+                    request()
+                except Exception:
+                    pass
+                run_benchmark(results, 'predict_bandgap_api', size, request, repeats, model_type)
+
+
+def run_python(args: List[str], env: Optional[dict] = None):
+    """
+    Run a fresh Python interpreter and raise if it fails.
+
+    Parameters:
+        args (list): Interpreter arguments, e.g. ['-c', 'import band_gap_ml'].
+        env (dict, optional): Additional environment variables.
+    """
+    process_env = {**os.environ, **(env or {})}
+    process_env['PYTHONPATH'] = os.pathsep.join(filter(None, [str(REPO_DIR), process_env.get('PYTHONPATH')]))
+    completed = subprocess.run([sys.executable, *args], capture_output=True, text=True, cwd=REPO_DIR, env=process_env)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else
+                           f"exit code {completed.returncode}")
+
+
+def benchmark_startup(results: list, model_types: List[str], repeats: int):
+    """Benchmark cold start: interpreter startup, module imports and one-shot CLI predictions in new processes."""
+    run_benchmark(results, 'python_startup', None, lambda: run_python(['-c', 'pass']), repeats)
+    run_benchmark(results, 'import_predictor', None,
+                  lambda: run_python(['-c', 'import band_gap_ml.band_gap_predictor']), repeats)
+    run_benchmark(results, 'import_app', None,
+                  lambda: run_python(['-c', 'import band_gap_ml.app'], {'BANDGAP_PRELOAD_MODELS': ''}), repeats)
+    for model_type in model_types:
+        run_benchmark(results, 'cli_formula', 1,
+                      lambda: run_python(['-m', 'band_gap_ml.band_gap_predictor', '--formula', 'TiO2',
+                                          '--model_type', model_type]), repeats, model_type)
+
+
+def compare_results(results: list, baseline_path: str):
+    """
+    Print the change of median times against a baseline results file.
+
+    Parameters:
+        results (list): Results of this run.
+        baseline_path (str): Path to the JSON results file of an earlier run.
+    """
+    with open(baseline_path, 'r', encoding='utf-8') as fh:
+        baseline = json.load(fh)
+
+    def key(result):
+        return result['benchmark'], result['model_type'], result['rows']
+
+    baseline_results = {key(result): result for result in baseline['results'] if 'error' not in result}
+    print(f"\nComparison with {baseline_path} (commit {baseline['environment'].get('git_commit')}):")
+    for result in results:
+        old = baseline_results.get(key(result))
+        if old is None or 'error' in result:
+            continue
+        change = result['median_seconds'] / old['median_seconds'] - 1
+        flag = '  REGRESSION' if change > REGRESSION_THRESHOLD else ''
+        print(f"  {result['benchmark']}[{result['model_type'] or '-'}, rows={result['rows'] or '-'}]: "
+              f"{old['median_seconds']:.4f} s -> {result['median_seconds']:.4f} s ({change:+.1%}){flag}")
+
+
+def main():
+    """Command line interface of the benchmark suite."""
+    parser = argparse.ArgumentParser(description='Benchmark featurization, inference and the API of BandGap-ml')
+    parser.add_argument('--sizes', type=str, default=','.join(map(str, DEFAULT_SIZES)),
+                        help='Comma-separated numbers of formulas (scale points)')
+    parser.add_argument('--model_types', type=str, default=','.join(DEFAULT_MODEL_TYPES),
+                        help='Comma-separated model types to benchmark')
+    parser.add_argument('--benchmarks', type=str, default='startup,featurization,models,api',
+                        help='Comma-separated benchmark groups: startup, featurization, models, api')
+    parser.add_argument('--repeats', type=int, default=3, help='Number of measured runs per benchmark')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the synthetic formula generator')
+    parser.add_argument('--max_loop_rows', type=int, default=1000,
+                        help='Largest scale point for the per-formula vectorize_formula loop')
+    parser.add_argument('--max_api_rows', type=int, default=100000,
+                        help='Largest scale point for the end-to-end API benchmark')
+    parser.add_argument('--output', type=str, default='benchmark_results.json', help='Path to the JSON results file')
+    parser.add_argument('--compare', type=str, default=None, help='JSON results file of an earlier run to compare with')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    model_types = [model_type.strip() for model_type in args.model_types.split(',') if model_type.strip()]
+    benchmarks = {benchmark.strip() for benchmark in args.benchmarks.split(',')}
+
+    # Smaller scale points are prefixes of the largest one, so all groups see the same formulas
+    all_formulas = generate_formulas(max(sizes), seed=args.seed)
+    formulas_by_size = {size: all_formulas[:size] for size in sorted(sizes)}
+
+    results = []
+    if 'startup' in benchmarks:
+        benchmark_startup(results, model_types, args.repeats)
+    if 'featurization' in benchmarks:
+        benchmark_featurization(results, formulas_by_size, args.repeats, args.max_loop_rows)
+    if 'models' in benchmarks:
+        benchmark_models(results, formulas_by_size, model_types, args.repeats)
+    if 'api' in benchmarks:
+        benchmark_api(results, formulas_by_size, model_types, args.repeats, args.max_api_rows)
+
+    report = {
+        'environment': get_environment(),
+        'settings': {
+            'sizes': sorted(sizes),
+            'model_types': model_types,
+            'benchmarks': sorted(benchmarks),
+            'repeats': args.repeats,
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as fh:
+        json.dump(report, fh, indent=2)
+    print(f"\nResults saved to {args.output}")
+
+    if args.compare:
+        compare_results(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,27 +4,72 @@ FastAPI web service for predicting band gaps of materials based on their chemica
 The API accepts chemical formulas as input and returns the predicted band gaps along with classification probabilities.
 
 """
+import asyncio
 import io
-import pandas as pd
+import json
+import os
 import time
-from typing import List, Optional, Union
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Iterator, List, Optional, Tuple, Union
 
-from fastapi import FastAPI, HTTPException, Form, UploadFile, File
+import pandas as pd
+from fastapi import FastAPI, HTTPException, Form, UploadFile, File, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
 
 from band_gap_ml.band_gap_predictor import BandGapPredictor
+from band_gap_ml.model_registry import ModelRegistry
+from band_gap_ml.inference_executor import InferenceExecutor, ServiceOverloadedError
+from band_gap_ml.request_coalescer import RequestCoalescer
+from band_gap_ml.serialization import columnar_results, compress, dumps, negotiate_encoding
+from band_gap_ml.metrics import render_prometheus
 from band_gap_ml import __version__
 
+# Comma-separated model types loaded at startup, e.g. "best_model,XGBoost"
+PRELOAD_MODELS = [model_type.strip() for model_type in os.environ.get('BANDGAP_PRELOAD_MODELS', 'best_model').split(',')
+                  if model_type.strip()]
+# Maximum number of models kept in memory; 0 keeps all loaded models
+MAX_MODELS = int(os.environ.get('BANDGAP_MAX_MODELS', '0'))
+# Prediction backend: "native" models, "compiled" tree ensembles with folded scaling, or "onnx" graphs
+BACKEND = os.environ.get('BANDGAP_BACKEND', 'native')
+# Number of onnxruntime intra-op threads per model of the onnx backend; 0 uses all CPU cores
+ONNX_THREADS = int(os.environ.get('BANDGAP_ONNX_THREADS', '0'))
+# Pool used for CPU-bound prediction work: "thread" or "process"
+EXECUTOR_KIND = os.environ.get('BANDGAP_EXECUTOR', 'thread')
+# Number of predictions running at once and number of requests allowed to wait for a worker
+WORKERS = int(os.environ.get('BANDGAP_WORKERS', '2'))
+MAX_QUEUE = int(os.environ.get('BANDGAP_MAX_QUEUE', '16'))
+# Seconds a request waits for its prediction; 0 waits indefinitely
+REQUEST_TIMEOUT = float(os.environ.get('BANDGAP_REQUEST_TIMEOUT', '300'))
+# Milliseconds formula requests wait to be predicted together with concurrent requests; 0 disables batching
+BATCH_WAIT_MS = float(os.environ.get('BANDGAP_BATCH_WAIT_MS', '5'))
+# Number of pending formulas that starts a batch prediction without waiting
+BATCH_MAX_ROWS = int(os.environ.get('BANDGAP_BATCH_MAX_ROWS', '256'))
+# Number of uploaded rows predicted per chunk of a streamed NDJSON response
+STREAM_CHUNKSIZE = int(os.environ.get('BANDGAP_STREAM_CHUNKSIZE', '10000'))
+
+# Media type of streamed responses with one JSON record per line
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
 # Start time to calculate loading time
 start = time.time()
 
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Shut down the inference workers when the service stops."""
+    yield
+    inference_executor.shutdown()
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Band Gap Predictor API",
     description="API for predicting band gaps of materials based on their chemical formulas",
-    version=__version__
+    version=__version__,
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -35,8 +80,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize the predictor
-predictor = BandGapPredictor()
+# Initialize the shared model registry and load the models used most
+model_registry = ModelRegistry(max_models=MAX_MODELS or None, backend=BACKEND, onnx_threads=ONNX_THREADS or None)
+model_registry.preload(PRELOAD_MODELS)
+
+# Run predictions outside the event loop, so large requests do not block other clients.
+# Worker processes are forked after preloading and share the loaded models.
+inference_executor = InferenceExecutor(EXECUTOR_KIND, WORKERS, MAX_QUEUE, REQUEST_TIMEOUT or None)
 
 # End time to calculate loading time
 end = time.time()
@@ -55,39 +105,382 @@ class PredictionResult(BaseModel):
           dict-like structures."""
         orm_mode = True
 
+
+class BatchPredictionRequest(BaseModel):
+    formulas: List[str] = Field(..., description="Chemical formulas to predict")
+    model_type: str = Field("best_model", description="Type of model to use")
+    verbose_output: bool = Field(False, description="Include classification results and regression band gaps "
+                                                    "for all materials")
+
+
+def result_records(result_df: pd.DataFrame, verbose_output: bool) -> List[dict]:
+    """
+    Convert prediction results to a list of records.
+
+    Parameters:
+        result_df (pd.DataFrame): DataFrame with predictions.
+        verbose_output (bool): Keep the classification result columns.
+
+    Returns:
+        list: Prediction records.
+    """
+    if not verbose_output:
+        result_df = result_df.drop(columns=['is_semiconductor', 'semiconductor_probability'])
+    return result_df.to_dict(orient='records')
+
+
+def dump_json(obj) -> str:
+    """Encode an object to compact JSON the same way as JSONResponse."""
+    return json.dumps(obj, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":"))
+
+
+def serialize_results(result_df: pd.DataFrame, verbose_output: bool) -> bytes:
+    """
+    Serialize prediction results to a JSON list.
+
+    Parameters:
+        result_df (pd.DataFrame): DataFrame with predictions.
+        verbose_output (bool): Keep the classification result columns.
+
+    Returns:
+        bytes: JSON encoded list of prediction records.
+    """
+    return dump_json(result_records(result_df, verbose_output)).encode("utf-8")
+
+
+def serialize_results_ndjson(result_df: pd.DataFrame, verbose_output: bool) -> bytes:
+    """
+    Serialize prediction results to newline-delimited JSON with one record per line.
+
+    Parameters:
+        result_df (pd.DataFrame): DataFrame with predictions.
+        verbose_output (bool): Keep the classification result columns.
+
+    Returns:
+        bytes: NDJSON encoded prediction records.
+    """
+    return "".join(dump_json(record) + "\n" for record in result_records(result_df, verbose_output)).encode("utf-8")
+
+
+def run_prediction(model_type: str, formula: Optional[Union[str, List[str]]], contents: Optional[bytes],
+                   file_name: Optional[str], verbose_output: bool) -> bytes:
+    """
+    Predict band gaps for a formula or an uploaded file and serialize the results to JSON.
+
+    Runs in an inference worker thread or process, outside the event loop.
+
+    Parameters:
+        model_type (str): Type of model to use.
+        formula (str or list, optional): Chemical formula(s).
+        contents (bytes, optional): Contents of an uploaded file.
+        file_name (str, optional): Name of the uploaded file, used to detect its format.
+        verbose_output (bool): Include classification results and regression band gaps for all materials.
+
+    Returns:
+        bytes: JSON encoded list of prediction records.
+    """
+    current_predictor = model_registry.get(model_type)
+
+    if contents is not None:
+        # Handle file upload
+        with current_predictor.metrics.time('input_decode'):
+            input_data = BandGapPredictor.load_input_data(io.BytesIO(contents), file_name=file_name)
+        result_df = current_predictor.predict_from_file(input_data=input_data, regress_all=verbose_output)
+    elif formula:
+        result_df = current_predictor.predict_from_formula(formula, regress_all=verbose_output)
+    else:
+        raise ValueError("Please provide either a formula or a file.")
+
+    with current_predictor.metrics.time('serialization'):
+        return serialize_results(result_df, verbose_output)
+
+
+def run_formula_batch(model_type: str, verbose_output: bool, formulas: List[str]) -> List[bytes]:
+    """
+    Predict band gaps for a micro-batch of formulas collected from concurrent requests and serialize each record.
+
+    Runs in an inference worker thread or process, outside the event loop, which only joins the records
+    of each request with `join_records`.
+
+    Parameters:
+        model_type (str): Type of model to use.
+        verbose_output (bool): Include classification results and regression band gaps for all materials.
+        formulas (list of str): Chemical formulas of all requests in the batch.
+
+    Returns:
+        list of bytes: JSON encoded prediction records in the order of the formulas.
+    """
+    current_predictor = model_registry.get(model_type)
+    result_df = current_predictor.predict_from_formula(formulas, regress_all=verbose_output)
+    with current_predictor.metrics.time('serialization'):
+        return [dump_json(record).encode("utf-8") for record in result_records(result_df, verbose_output)]
+
+
+def join_records(records: List[bytes]) -> bytes:
+    """Join JSON encoded records into the JSON list `serialize_results` would encode."""
+    return b"[" + b",".join(records) + b"]"
+
+
+def run_chunk_prediction(model_type: str, input_chunk: pd.DataFrame, verbose_output: bool,
+                         decode_seconds: float) -> bytes:
+    """
+    Predict band gaps for one chunk of a streamed request and serialize the results to NDJSON.
+
+    Runs in an inference worker thread or process, outside the event loop.
+
+    Parameters:
+        model_type (str): Type of model to use.
+        input_chunk (pd.DataFrame): Chunk of the input data.
+        verbose_output (bool): Include classification results and regression band gaps for all materials.
+        decode_seconds (float): Time spent reading the chunk, recorded as its input decoding time.
+
+    Returns:
+        bytes: NDJSON encoded prediction records.
+    """
+    current_predictor = model_registry.get(model_type)
+    current_predictor.metrics.observe('input_decode', decode_seconds)
+    result_df = current_predictor.predict_from_file(input_data=input_chunk, regress_all=verbose_output)
+    with current_predictor.metrics.time('serialization'):
+        return serialize_results_ndjson(result_df, verbose_output)
+
+
+def read_next_chunk(chunks: Iterator[pd.DataFrame]) -> Tuple[Optional[pd.DataFrame], float]:
+    """
+    Read the next chunk of a streamed upload and measure the decoding time.
+
+    The time is recorded by the inference task of the chunk, so reading needs no model.
+
+    Parameters:
+        chunks (iterator): Iterator over chunks of the input data.
+
+    Returns:
+        tuple: (next chunk of the input data, or None when the input is exhausted, decoding time in seconds).
+    """
+    start = time.perf_counter()
+    input_chunk = next(chunks, None)
+    return input_chunk, time.perf_counter() - start
+
+
+def run_batch_prediction(model_type: str, formulas: List[str], verbose_output: bool,
+                         encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+    """
+    Predict band gaps for a JSON batch request and encode the results as compressed columnar JSON.
+
+    Runs in an inference worker thread or process, outside the event loop.
+
+    Parameters:
+        model_type (str): Type of model to use.
+        formulas (list of str): Chemical formulas.
+        verbose_output (bool): Include classification results and regression band gaps for all materials.
+        encoding (str, optional): Negotiated response compression, 'zstd', 'gzip' or None.
+
+    Returns:
+        tuple: (response body, applied content encoding or None).
+    """
+    current_predictor = model_registry.get(model_type)
+    result_df = current_predictor.predict_from_formula(formulas, regress_all=verbose_output)
+    with current_predictor.metrics.time('serialization'):
+        return compress(dumps(columnar_results(result_df, verbose_output)), encoding)
+
+
+async def predict_next_chunk(chunks: Iterator[pd.DataFrame], model_type: str, verbose_output: bool) -> Optional[bytes]:
+    """
+    Read the next input chunk in a thread and predict it in the inference executor.
+
+    Parameters:
+        chunks (iterator): Iterator over chunks of the input data.
+        model_type (str): Type of model to use.
+        verbose_output (bool): Include classification results and regression band gaps for all materials.
+
+    Returns:
+        bytes or None: NDJSON encoded prediction records, or None when the input is exhausted.
+    """
+    input_chunk, decode_seconds = await asyncio.to_thread(read_next_chunk, chunks)
+    if input_chunk is None:
+        return None
+    return await inference_executor.run(run_chunk_prediction, model_type, input_chunk, verbose_output,
+                                        decode_seconds)
+
+
+async def stream_predictions(chunks: Iterator[pd.DataFrame], model_type: str, verbose_output: bool,
+                             first_chunk: Optional[bytes]) -> AsyncIterator[bytes]:
+    """
+    Stream NDJSON prediction records chunk by chunk.
+
+    Errors after the response has started are reported as a final {"error": ...} record,
+    since the status code has already been sent.
+
+    Parameters:
+        chunks (iterator): Iterator over the remaining chunks of the input data.
+        model_type (str): Type of model to use.
+        verbose_output (bool): Include classification results and regression band gaps for all materials.
+        first_chunk (bytes, optional): Already predicted records of the first chunk.
+
+    Yields:
+        bytes: NDJSON encoded prediction records of one chunk.
+    """
+    content = first_chunk
+    while content is not None:
+        yield content
+        try:
+            content = await predict_next_chunk(chunks, model_type, verbose_output)
+        except Exception as e:
+            yield (dump_json({"error": f"Error during prediction: {to_http_exception(e).detail}"}) + "\n").encode("utf-8")
+            return
+
+
+def to_http_exception(e: Exception) -> HTTPException:
+    """
+    Map an exception raised during prediction to an HTTP error response.
+
+    Parameters:
+        e (Exception): Exception raised during prediction.
+
+    Returns:
+        HTTPException: 503 if the service is overloaded, 504 on timeout, 400 otherwise.
+    """
+    if isinstance(e, ServiceOverloadedError):
+        return HTTPException(status_code=503, detail=f"Service is overloaded, please retry later. {str(e)}",
+                             headers={"Retry-After": "1"})
+    if isinstance(e, asyncio.TimeoutError):
+        return HTTPException(status_code=504, detail=f"Prediction did not finish within {REQUEST_TIMEOUT} seconds.")
+    return HTTPException(status_code=400, detail=f"Error during prediction: {str(e)}")
+
+
+async def predict_formula_batch(key, formulas: List[str]):
+    """Run a micro-batch of the request coalescer in the inference executor."""
+    model_type, verbose_output = key
+    return await inference_executor.run(run_formula_batch, model_type, verbose_output, formulas)
+
+
+# Predict single formulas of concurrent requests to the same model in one batch
+request_coalescer = RequestCoalescer(predict_formula_batch, BATCH_WAIT_MS / 1000, BATCH_MAX_ROWS) \
+    if BATCH_WAIT_MS > 0 else None
+
+
 @app.post("/predict_bandgap", response_model=List[PredictionResult])
 async def predict_band_gap(
+        request: Request,
         formula: Optional[Union[str, List[str]]] = Form(None),
         model_type: Optional[str] = Form("best_model"),
         file: Optional[UploadFile] = File(None),
         verbose_output: bool= Form(False),
 ):
+    """
+    Predict band gaps for chemical formulas or an uploaded file.
+
+    With the `Accept: application/x-ndjson` header, the predictions are streamed chunk by chunk
+    as newline-delimited JSON records instead of being returned as one JSON list.
+    """
+    if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        return await predict_band_gap_stream(formula, model_type, file, verbose_output)
+
+    contents = await file.read() if file else None
+
     try:
-        current_predictor = BandGapPredictor(model_type=model_type) if model_type != "best_model" else predictor
-
-        if file:
-            # Handle file upload
-            contents = await file.read()
-            if file.filename.endswith('.csv'):
-                input_data = pd.read_csv(io.StringIO(contents.decode('utf-8')))
-            elif file.filename.endswith('.xlsx'):
-                input_data = pd.read_excel(io.BytesIO(contents))
-            else:
-                raise ValueError("Unsupported file format. Please provide a CSV or Excel file.")
-            result_df = current_predictor.predict_from_file(input_data=input_data)
-        elif formula:
-            result_df = current_predictor.predict_from_formula(formula)
+        if contents is None and formula and request_coalescer is not None:
+            formulas = [formula] if isinstance(formula, str) else list(formula)
+            content = join_records(await request_coalescer.submit((model_type, verbose_output), formulas))
         else:
-            raise ValueError("Please provide either a formula or a file.")
-
-        # Convert DataFrame to list of dictionaries and return as JSONResponse
-        if not verbose_output:
-            result_df.drop(columns=['is_semiconductor', 'semiconductor_probability'], inplace=True)
-        response_results = result_df.to_dict(orient='records')
-        print(f'response_results: {response_results}')
-        return JSONResponse(content=response_results)
+            content = await inference_executor.run(
+                run_prediction, model_type, formula, contents, file.filename if file else None, verbose_output
+            )
+    except Exception as e:
+        raise to_http_exception(e)
+
+    return Response(content=content, media_type="application/json")
+
+
+async def predict_band_gap_stream(formula: Optional[Union[str, List[str]]], model_type: str,
+                                  file: Optional[UploadFile], verbose_output: bool) -> StreamingResponse:
+    """
+    Stream predictions for chemical formulas or an uploaded file as NDJSON.
+
+    The upload is read and predicted chunk by chunk, so the first records are sent before the whole
+    input is processed and the server holds at most one chunk of results in memory.
+    """
+    if file:
+        chunks = BandGapPredictor.iter_input_data(file.file, STREAM_CHUNKSIZE, file_name=file.filename)
+    elif formula:
+        chunks = iter([pd.DataFrame({'composition': [formula] if isinstance(formula, str) else list(formula)})])
+    else:
+        raise HTTPException(status_code=400, detail="Error during prediction: Please provide either a formula or a file.")
+
+    # Predict the first chunk before the response starts, so that invalid input gets an error status
+    try:
+        first_chunk = await predict_next_chunk(chunks, model_type, verbose_output)
     except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Error during prediction: {str(e)}")
+        raise to_http_exception(e)
+
+    return StreamingResponse(stream_predictions(chunks, model_type, verbose_output, first_chunk),
+                             media_type=NDJSON_MEDIA_TYPE)
+
+
+@app.post("/predict_bandgap/batch")
+async def predict_band_gap_batch(batch: BatchPredictionRequest, request: Request):
+    """
+    Predict band gaps for a JSON batch of chemical formulas.
+
+    Returns columnar arrays {"composition": [...], "band_gap": [...]}, plus "is_semiconductor" and
+    "semiconductor_probability" with verbose output, in the order of the formulas. The response is
+    compressed with zstd or gzip if the client accepts it.
+    """
+    if not batch.formulas:
+        raise HTTPException(status_code=400, detail="Error during prediction: Please provide at least one formula.")
+
+    try:
+        content, encoding = await inference_executor.run(
+            run_batch_prediction, batch.model_type, batch.formulas, batch.verbose_output,
+            negotiate_encoding(request.headers.get("accept-encoding"))
+        )
+    except Exception as e:
+        raise to_http_exception(e)
+
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+@app.get("/models")
+async def resident_models():
+    """
+    List the models resident in memory and their loaded memory footprint.
+    """
+    return {
+        "models": model_registry.resident_models(),
+        "total_memory_bytes": model_registry.memory_bytes(),
+        "max_models": model_registry.max_models,
+        "inference": inference_executor.stats(),
+        "batching": request_coalescer.stats() if request_coalescer is not None else None,
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Expose per-model stage latency histograms and counters in the Prometheus text format.
+
+    With the process executor, every stage including serialization runs in worker processes
+    whose metrics are not collected, so only the resident model and inference executor metrics are reported.
+    """
+    inference_stats = inference_executor.stats()
+    content = render_prometheus(
+        ((model_type if model_dir is None else f'{model_type}@{model_dir}', predictor.metrics)
+         for (model_type, model_dir), predictor in model_registry.predictors()),
+        {
+            'bandgap_resident_models': ('gauge', 'Number of models resident in memory.', len(model_registry)),
+            'bandgap_resident_models_bytes': ('gauge', 'Memory footprint of the loaded resident models.',
+                                              model_registry.memory_bytes()),
+            'bandgap_inference_pending': ('gauge', 'Number of running and queued prediction jobs.',
+                                          inference_stats['pending']),
+            'bandgap_inference_rejected_total': ('counter', 'Number of prediction jobs rejected as overloaded.',
+                                                 inference_stats['rejected']),
+            'bandgap_inference_timed_out_total': ('counter', 'Number of prediction jobs that timed out.',
+                                                  inference_stats['timed_out']),
+        }
+    )
+    return PlainTextResponse(content, media_type="text/plain; version=0.0.4; charset=utf-8")
 
 
 @app.get("/healthcheck")
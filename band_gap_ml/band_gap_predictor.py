@@ -1,9 +1,20 @@
 """Band gap predictor module."""
 import argparse
+import os
+import threading
+
+import numpy as np
 import pandas as pd
-from typing import Optional, Union, List
-from band_gap_ml.vectorizer import FormulaVectorizer
+from pathlib import Path
+from typing import IO, Iterator, Optional, Union, List
+from band_gap_ml.vectorizer import FormulaVectorizer, init_featurization_worker, featurize_chunk
 from band_gap_ml.config import Config
+from band_gap_ml.data_io import (get_file_format, read_input_data, iter_input_data, write_predictions,
+                                 read_column_names, get_composition_column, PredictionWriter)
+from band_gap_ml.prediction_cache import PredictionCache, CacheEntry
+from band_gap_ml.metrics import PredictorMetrics
+
+PREDICTION_COLUMNS = ['is_semiconductor', 'semiconductor_probability', 'band_gap']
 
 
 class BandGapPredictor:
@@ -14,7 +25,14 @@ class BandGapPredictor:
     and predict band gaps using a combination of classification and regression models.
     """
 
-    def __init__(self, model_type: str = 'best_model', model_dir: Optional[str] = None):
+    def __init__(self, model_type: str = 'best_model', model_dir: Optional[str] = None,
+                 cache_size: Optional[int] = Config.DEFAULT_CACHE_SIZE,
+                 cache: Optional[PredictionCache] = None,
+                 n_jobs: Optional[int] = None,
+                 chunk_size: int = Config.DEFAULT_CHUNK_SIZE,
+                 classification_threshold: float = Config.CLASSIFICATION_THRESHOLD,
+                 backend: str = Config.DEFAULT_BACKEND,
+                 onnx_threads: Optional[int] = None):
         """
         Initialize the BandGapPredictor with specified models.
 
@@ -22,44 +40,367 @@ class BandGapPredictor:
             model_type (str): Type of model to load (e.g., 'RandomForest', 'GradientBoosting', 'XGBoost').
                              Default is 'best_model' with RandomForest models.
             model_dir (str, optional): Directory where models are stored. If None, uses default Config.MODELS_DIR.
+            cache_size (int, optional): Maximum number of compositions kept in the prediction cache.
+                                        None or 0 disables caching. Default is Config.DEFAULT_CACHE_SIZE.
+            cache (PredictionCache, optional): Existing cache to use, e.g. one shared between predictors.
+                                               Takes precedence over cache_size.
+            n_jobs (int, optional): Number of worker processes for featurization of large inputs.
+                                    None or 1 featurizes in-process, -1 uses all CPU cores.
+            chunk_size (int): Number of formulas featurized per worker task. Default is Config.DEFAULT_CHUNK_SIZE.
+            classification_threshold (float): Semiconductor probability above which a material is classified
+                                              as a semiconductor. Default is Config.CLASSIFICATION_THRESHOLD.
+            backend (str): 'native' predicts with the loaded models and scalers, 'compiled' with flattened
+                           tree ensembles with the scalers folded into their thresholds, 'onnx' with ONNX
+                           graphs of the models and scalers run by onnxruntime. Default is Config.DEFAULT_BACKEND.
+            onnx_threads (int, optional): Number of onnxruntime intra-op threads of the 'onnx' backend.
+                                          None uses all CPU cores.
         """
+        if backend not in Config.PREDICTION_BACKENDS:
+            raise ValueError(f"Unknown prediction backend: {backend}. "
+                             f"Available backends: {', '.join(Config.PREDICTION_BACKENDS)}")
         self.vectorizer = FormulaVectorizer()
-        self.config = Config(model_type, model_dir)
+        self.config = Config(model_type, model_dir, artifact_format='onnx' if backend == 'onnx' else None,
+                             onnx_threads=onnx_threads)
+        self.classification_threshold = classification_threshold
+        self.backend = backend
+        self._compiled_models = {}
+        self.model_key = (model_type.lower(), str(model_dir) if model_dir else None, classification_threshold, backend)
+        if cache is None and cache_size:
+            cache = PredictionCache(cache_size)
+        self.cache = cache
+        self.metrics = PredictorMetrics()
+        # Per-thread, as registry predictors are shared by the executor threads of the API
+        self._local = threading.local()
+        self.n_jobs = os.cpu_count() if n_jobs == -1 else (n_jobs or 1)
+        self.chunk_size = chunk_size
+        self._executor = None
+
+    @property
+    def last_batch_stats(self) -> dict:
+        """Row and deduplication counts of the last batch predicted by the calling thread."""
+        return getattr(self._local, 'batch_stats', {})
+
+    @last_batch_stats.setter
+    def last_batch_stats(self, stats: dict):
+        self._local.batch_stats = stats
+
+    @property
+    def last_timings(self) -> dict:
+        """Seconds spent in each stage of the last batch predicted by the calling thread."""
+        return getattr(self._local, 'timings', {})
+
+    @last_timings.setter
+    def last_timings(self, timings: dict):
+        self._local.timings = timings
+
+    def load_models(self):
+        """
+        Load, and compile for the compiled backend, all models now instead of on first use.
+
+        Returns:
+            BandGapPredictor: This instance.
+        """
+        self.config.load_models()
+        for task in ('classification', 'regression'):
+            self._get_model(task)
+        return self
+
+    def _get_model(self, task: str):
+        """
+        Get the model and scaler of a task for the prediction backend.
+
+        Parameters:
+            task (str): 'classification' or 'regression'.
+
+        Returns:
+            tuple: (model, scaler). The scaler is None for compiled and ONNX models, which take raw features.
+        """
+        model = getattr(self.config, f'{task}_model')
+        scaler = getattr(self.config, f'{task}_scaler')
+        if self.backend != 'compiled':
+            return model, scaler
+        compiled = self._compiled_models.get(task)
+        if compiled is None:
+            from band_gap_ml.model_arrays import compile_model
+
+            compiled = self._compiled_models[task] = compile_model(model, scaler)
+        return compiled, None
 
     def prepare_features(self, input_data: pd.DataFrame) -> pd.DataFrame:
         """
         Prepare feature vectors for input chemical formulas using the FormulaVectorizer.
 
+        Each distinct composition is vectorized once and feature vectors of compositions
+        found in the prediction cache are reused.
+
         Parameters:
             input_data (pd.DataFrame): Input data containing a 'composition' column.
 
         Returns:
             pd.DataFrame: Transformed feature vectors.
         """
-        features = []
+        unique_compositions, keys, inverse, unique_features = self._featurize_formulas(input_data['composition'])
+
+        if unique_features is None:
+            entries = self._get_cached_entries(keys)
+            missing = [i for i, entry in enumerate(entries) if entry is None]
+            unique_features = np.empty((len(unique_compositions), len(self.vectorizer.column_names)))
+            for i, entry in enumerate(entries):
+                if entry is not None:
+                    unique_features[i] = entry.features
+            if missing:
+                with self.metrics.time('featurization'):
+                    unique_features[missing] = self.vectorizer.vectorize_compositions(
+                        [unique_compositions[i] for i in missing]
+                    )
+
+        X = pd.DataFrame(unique_features[inverse], columns=self.vectorizer.column_names)
+        return X
+
+    def _featurize_formulas(self, formulas):
+        """
+        Parse a batch of chemical formulas and group them by canonical composition.
 
-        for formula in input_data['composition']:
-            vectorized = self.vectorizer.vectorize_formula(formula)
-            features.append(vectorized)
+        Large batches are parsed and vectorized in a process pool when `n_jobs` allows it;
+        otherwise only parsing is done here and vectorization is left to the caller,
+        so that cached compositions are not vectorized again.
 
-        X = pd.DataFrame(features, columns=self.vectorizer.column_names)
-        return X
+        Parameters:
+            formulas (iterable of str): Chemical formulas.
+
+        Returns:
+            tuple: (list of unique compositions, list of their keys,
+                    np.ndarray mapping every input row to its unique composition,
+                    np.ndarray of unique feature vectors or None if not vectorized yet).
+        """
+        formulas = list(formulas)
+
+        if self._use_process_pool(len(formulas)):
+            # Workers parse and vectorize together, so the pool time is reported as featurization
+            with self.metrics.time('featurization'):
+                compositions, features = self._featurize_in_pool(formulas)
+        else:
+            with self.metrics.time('parsing'):
+                compositions, features = self.vectorizer.parse_formulas(formulas), None
+
+        self.metrics.increment('parse_failures', sum(composition is None for composition in compositions))
+        unique_compositions, keys, inverse, first_rows = self._deduplicate(compositions)
+        unique_features = features[first_rows] if features is not None else None
+        return unique_compositions, keys, inverse, unique_features
+
+    def _use_process_pool(self, n_formulas: int) -> bool:
+        """
+        Decide whether a batch is large enough to be featurized in a process pool.
+
+        Small batches stay in-process, because starting workers and transferring the results
+        costs more than featurizing a few thousand formulas.
+
+        Parameters:
+            n_formulas (int): Number of formulas in the batch.
+
+        Returns:
+            bool: True if the process pool should be used.
+        """
+        return (self.n_jobs > 1
+                and n_formulas >= Config.PARALLEL_MIN_ROWS
+                and n_formulas > self.chunk_size)
+
+    def _featurize_in_pool(self, formulas: List[str]):
+        """
+        Parse and vectorize formulas in chunks in a process pool with one FormulaVectorizer per worker.
+
+        Parameters:
+            formulas (list of str): Chemical formulas.
+
+        Returns:
+            tuple: (list of fractional compositions, np.ndarray of feature vectors) in input order.
+        """
+        if self._executor is None:
+            # Imported here, as multiprocessing is only needed for large inputs
+            from concurrent.futures import ProcessPoolExecutor
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.n_jobs,
+                initializer=init_featurization_worker,
+                initargs=(self.vectorizer.elements_data_path,)
+            )
+
+        chunks = [formulas[i:i + self.chunk_size] for i in range(0, len(formulas), self.chunk_size)]
+        compositions, features = [], []
+        # Executor.map yields the chunk results in submission order
+        for chunk_compositions, chunk_features in self._executor.map(featurize_chunk, chunks):
+            compositions.extend(chunk_compositions)
+            features.append(chunk_features)
+
+        return compositions, np.vstack(features)
+
+    def close(self):
+        """Shut down the featurization process pool, if it was started."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    @staticmethod
+    def _deduplicate(compositions: List[Optional[dict]]):
+        """
+        Group parsed compositions by their canonical composition key.
+
+        Compositions that could not be parsed share the None key, since they all get the same
+        NaN feature vector.
+
+        Parameters:
+            compositions (list): Fractional compositions as returned by FormulaVectorizer.parse_formulas.
+
+        Returns:
+            tuple: (list of unique compositions, list of their keys,
+                    np.ndarray mapping every input row to its unique composition,
+                    np.ndarray with the first input row of every unique composition).
+        """
+        positions = {}
+        unique_compositions, keys, inverse, first_rows = [], [], [], []
+
+        for row, composition in enumerate(compositions):
+            key = PredictionCache.composition_key(composition) if composition is not None else None
+            position = positions.get(key)
+            if position is None:
+                position = positions[key] = len(keys)
+                unique_compositions.append(composition)
+                keys.append(key)
+                first_rows.append(row)
+            inverse.append(position)
+
+        return unique_compositions, keys, np.asarray(inverse, dtype=np.intp), np.asarray(first_rows, dtype=np.intp)
+
+    def _get_cached_entries(self, keys: list, regress_all: bool = False) -> List[Optional[CacheEntry]]:
+        """
+        Look up canonical composition keys in the prediction cache.
+
+        Parameters:
+            keys (list): Canonical composition keys, None for compositions that could not be parsed.
+            regress_all (bool): Whether the cached predictions were made with regression for all rows.
+
+        Returns:
+            list: Cache entries, or None for keys that are not cached, are None or if caching is disabled.
+        """
+        if self.cache is None:
+            return [None] * len(keys)
+        model_key = (self.model_key, regress_all)
+        entries = [self.cache.get(model_key, key) if key is not None else None for key in keys]
+        hits = sum(entry is not None for entry in entries)
+        self.metrics.increment('cache_hits', hits)
+        self.metrics.increment('cache_misses', len(entries) - hits)
+        return entries
+
+    def _predict_formulas(self, formulas, regress_all: bool = False) -> pd.DataFrame:
+        """
+        Predict band gaps with classification probabilities for a batch of chemical formulas.
+
+        The batch is deduplicated by canonical composition, so only distinct compositions
+        missing from the prediction cache are vectorized and passed to the models. The results
+        are scattered back to the original row order.
+
+        Parameters:
+            formulas (iterable of str): Chemical formulas.
+            regress_all (bool): Run the regressor for all rows, not only for semiconductors.
+
+        Returns:
+            pd.DataFrame: DataFrame with predictions including class probabilities.
+        """
+        unique_compositions, keys, inverse, unique_features = self._featurize_formulas(formulas)
+
+        self.last_batch_stats = {
+            'rows': len(inverse),
+            'unique_compositions': len(keys),
+            'deduplicated_rows': len(inverse) - len(keys),
+        }
+
+        entries = self._get_cached_entries(keys, regress_all)
+        missing = [i for i, entry in enumerate(entries) if entry is None]
+
+        if missing:
+            if unique_features is not None:
+                features = unique_features[missing]
+            else:
+                with self.metrics.time('featurization'):
+                    features = self.vectorizer.vectorize_compositions([unique_compositions[i] for i in missing])
+            predictions = self.predict_with_probabilities(
+                pd.DataFrame(features, columns=self.vectorizer.column_names), regress_all
+            )
+            prediction_rows = zip(*(predictions[column].to_numpy() for column in PREDICTION_COLUMNS))
+            for i, feature_row, prediction_row in zip(missing, features, prediction_rows):
+                entries[i] = CacheEntry(feature_row.copy(), prediction_row)
+                if self.cache is not None and keys[i] is not None:
+                    self.cache.put((self.model_key, regress_all), keys[i], entries[i].features, prediction_row)
+
+        # Build columns from the stored numpy scalars to keep the dtypes of the model outputs
+        return pd.DataFrame({
+            column: np.array([entry.prediction[j] for entry in entries])[inverse]
+            for j, column in enumerate(PREDICTION_COLUMNS)
+        })
+
+    def classify(self, input_data: pd.DataFrame):
+        """
+        Classify materials as semiconductors or not with a single pass of the classifier.
+
+        Classes are derived from the predicted probabilities and the decision threshold,
+        so the ensemble is not traversed a second time by `predict`.
+
+        Parameters:
+            input_data (pd.DataFrame): Feature vectors for chemical formulas.
+
+        Returns:
+            tuple: (np.ndarray of predicted classes, np.ndarray of class probabilities).
+        """
+        # Models are loaded on first access, outside of the timed stages
+        model, scaler = self._get_model('classification')
+        X_class = np.asarray(input_data, dtype=float)
+        if scaler is not None:
+            with self.metrics.time('scaling'):
+                X_class = scaler.transform(X_class)
+        with self.metrics.time('classification'):
+            class_probs = model.predict_proba(X_class)
+        is_positive = (class_probs[:, 1] > self.classification_threshold).astype(int)
+        classification_result = model.classes_.take(is_positive)
+        return classification_result, class_probs
+
+    def regress(self, input_data: pd.DataFrame, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Predict band gaps with the regressor, optionally only for a subset of rows.
+
+        Parameters:
+            input_data (pd.DataFrame): Feature vectors for chemical formulas.
+            mask (np.ndarray, optional): Boolean mask of rows to predict. Other rows get a band gap of 0.
+                                         If None, all rows are predicted.
+
+        Returns:
+            np.ndarray: Predicted band gaps.
+        """
+        X = np.asarray(input_data, dtype=float)
+        band_gap = np.zeros(len(X))
+        rows = np.arange(len(X)) if mask is None else np.flatnonzero(mask)
+        if len(rows):
+            model, scaler = self._get_model('regression')
+            X_reg = X[rows]
+            if scaler is not None:
+                with self.metrics.time('scaling'):
+                    X_reg = scaler.transform(X_reg)
+            with self.metrics.time('regression'):
+                band_gap[rows] = model.predict(X_reg)
+        return band_gap
 
     def predict_band_gap(self, input_data: pd.DataFrame) -> List[float]:
         """
         Predict band gaps using the loaded classifier and regressor models.
 
+        The regressor is run only for materials classified as semiconductors.
+
         Parameters:
             input_data (pd.DataFrame): Feature vectors for chemical formulas.
 
         Returns:
             list: Predicted band gaps (regression values or classification results).
         """
-        X_scaled_class = self.config.classification_scaler.transform(input_data)
-        X_scaled_reg = self.config.regression_scaler.transform(input_data)
-
-        classification_result = self.config.classification_model.predict(X_scaled_class)
-        regression_result = self.config.regression_model.predict(X_scaled_reg)
+        classification_result, _ = self.classify(input_data)
+        regression_result = self.regress(input_data, classification_result == 1)
 
         final_result = [
             regression_result[i] if classification_result[i] == 1 else classification_result[i]
@@ -68,25 +409,23 @@ class BandGapPredictor:
 
         return final_result
 
-    def predict_with_probabilities(self, input_data: pd.DataFrame) -> pd.DataFrame:
+    def predict_with_probabilities(self, input_data: pd.DataFrame, regress_all: bool = False) -> pd.DataFrame:
         """
         Main method for predicting band gaps with classification probabilities.
 
         Parameters:
             input_data (pd.DataFrame): Feature vectors for chemical formulas.
+            regress_all (bool): Run the regressor for all rows. By default it runs only for rows
+                                classified as semiconductors and other rows get a band gap of 0.
 
         Returns:
             pd.DataFrame: DataFrame with predictions including class probabilities.
         """
-        X_scaled_class = self.config.classification_scaler.transform(input_data)
-        X_scaled_reg = self.config.regression_scaler.transform(input_data)
-
         # Get classification results and probabilities
-        classification_result = self.config.classification_model.predict(X_scaled_class)
-        class_probs = self.config.classification_model.predict_proba(X_scaled_class)
+        classification_result, class_probs = self.classify(input_data)
 
         # Get regression results
-        regression_result = self.config.regression_model.predict(X_scaled_reg)
+        regression_result = self.regress(input_data, None if regress_all else classification_result == 1)
 
         # Create results DataFrame
         results = pd.DataFrame({
@@ -98,60 +437,152 @@ class BandGapPredictor:
         return results
 
     @staticmethod
-    def load_input_data(file_path: str) -> pd.DataFrame:
+    def load_input_data(file_path: Union[str, Path, IO[bytes]], composition_only: bool = False,
+                        file_name: Optional[str] = None) -> pd.DataFrame:
         """
-        Load input data from a file (CSV or Excel).
+        Load input data from a file (CSV, Excel, Parquet or Arrow IPC/Feather).
 
         Parameters:
-            file_path (str): Path to the input file.
+            file_path (str, Path or file-like): Path to the input file or a binary file-like object.
+            composition_only (bool): Read only the composition column instead of all columns.
+            file_name (str, optional): File name used to detect the format, e.g. of an uploaded file.
+                                       If None, the format is detected from file_path.
 
         Returns:
             pd.DataFrame: Input data with 'composition' column.
         """
-        if file_path.endswith('.csv'):
-            input_data = pd.read_csv(file_path)
-        elif file_path.endswith('.xlsx'):
-            input_data = pd.read_excel(file_path)
-        else:
-            raise ValueError("Unsupported file format. Please provide a CSV or Excel file.")
+        file_format = get_file_format(file_name or file_path)
+        return read_input_data(file_path, file_format, composition_only)
 
-        return input_data
+    @staticmethod
+    def iter_input_data(file_path: Union[str, Path, IO[bytes]], chunksize: int,
+                        composition_only: bool = False, file_name: Optional[str] = None) -> Iterator[pd.DataFrame]:
+        """
+        Load input data from a file (CSV, Excel, Parquet or Arrow IPC/Feather) in chunks.
 
-    def predict_from_file(self, file_path: Optional[str] = None,
-                          input_data: Optional[pd.DataFrame] = None
+        CSV and Parquet files are read incrementally and Arrow IPC files are memory-mapped,
+        so memory is bounded by the chunk size. Excel files cannot be read incrementally
+        and are loaded at once before being split.
+
+        Parameters:
+            file_path (str, Path or file-like): Path to the input file or a binary file-like object.
+            chunksize (int): Number of rows per chunk.
+            composition_only (bool): Read only the composition column instead of all columns.
+            file_name (str, optional): File name used to detect the format, e.g. of an uploaded file.
+                                       If None, the format is detected from file_path.
+
+        Yields:
+            pd.DataFrame: Chunk of the input data.
+        """
+        yield from iter_input_data(file_path, get_file_format(file_name or file_path), chunksize, composition_only)
+
+    def iter_predict_from_file(self, file_path: Union[str, Path], chunksize: int,
+                               composition_only: bool = False, regress_all: bool = False) -> Iterator[pd.DataFrame]:
+        """
+        Predict band gaps from an input file chunk by chunk.
+
+        Parameters:
+            file_path (str or Path): Path to the input file.
+            chunksize (int): Number of input rows read and predicted at a time.
+            composition_only (bool): Read only the composition column instead of all columns.
+            regress_all (bool): Run the regressor for all rows, not only for semiconductors.
+
+        Yields:
+            pd.DataFrame: DataFrame with predictions for one chunk of the input file.
+        """
+        for input_chunk in self.iter_input_data(file_path, chunksize, composition_only):
+            yield self.predict_from_file(input_data=input_chunk, regress_all=regress_all)
+
+    def stream_predict_to_file(self, file_path: Union[str, Path], output_path: Union[str, Path], chunksize: int,
+                               composition_only: bool = False, float32: bool = False,
+                               regress_all: bool = False) -> int:
+        """
+        Predict band gaps from an input file chunk by chunk and append the results to an output file.
+
+        Peak memory is bounded by the chunk size rather than by the size of the input file.
+
+        Parameters:
+            file_path (str or Path): Path to the input file.
+            output_path (str or Path): Path to the output CSV, Parquet or Arrow IPC (Feather) file.
+                                       An existing file is overwritten.
+            chunksize (int): Number of input rows read and predicted at a time.
+            composition_only (bool): Read only the composition column instead of all columns.
+            float32 (bool): Store the float prediction columns as float32.
+            regress_all (bool): Run the regressor for all rows, not only for semiconductors.
+
+        Returns:
+            int: Number of rows written.
+        """
+        column_names = read_column_names(file_path, get_file_format(file_path))
+        composition_column = get_composition_column(column_names)
+        input_columns = ['composition'] if composition_only else \
+            ['composition' if column == composition_column else column for column in column_names]
+        with PredictionWriter(output_path, float32, input_columns) as writer:
+            for predictions in self.iter_predict_from_file(file_path, chunksize, composition_only, regress_all):
+                writer.write(predictions)
+        return writer.n_rows
+
+    @staticmethod
+    def save_predictions(predictions: pd.DataFrame, output_path: Union[str, Path], float32: bool = False):
+        """
+        Save predictions to a CSV, Parquet or Arrow IPC (Feather) file depending on its extension.
+
+        Parameters:
+            predictions (pd.DataFrame): DataFrame with predictions.
+            output_path (str or Path): Path to the output file.
+            float32 (bool): Store the float prediction columns as float32.
+        """
+        write_predictions(predictions, output_path, float32)
+
+    def predict_from_file(self, file_path: Optional[Union[str, Path]] = None,
+                          input_data: Optional[pd.DataFrame] = None,
+                          composition_only: bool = False,
+                          regress_all: bool = False
                           ) -> pd.DataFrame:
         """
         Predict band gaps from an input file containing chemical formulas.
 
+        Rows with repeated compositions are predicted once; the number of deduplicated rows
+        is reported in `last_batch_stats` and the time spent in each stage in `last_timings`.
+        Both are kept per thread, so concurrent callers sharing a predictor each see their own batch.
+
         Parameters:
             file_path (str, optional): Path to the input file. Default is None.
             input_data (pd.DataFrame, optional): Input data with 'composition' column. Defaults to None.
+            composition_only (bool): Read only the composition column of the input file instead of all columns.
+            regress_all (bool): Run the regressor for all rows. By default it runs only for rows
+                                classified as semiconductors and other rows get a band gap of 0.
 
         Returns:
             pd.DataFrame: DataFrame with predictions.
         """
-        if file_path:
-            input_data = self.load_input_data(file_path)
+        with self.metrics.batch() as timings:
+            if file_path:
+                with self.metrics.time('input_decode'):
+                    input_data = self.load_input_data(file_path, composition_only)
 
-        if 'composition' not in input_data.columns:
-            first_column = input_data.columns[0]
-            input_data.rename(columns={first_column: 'composition'}, inplace=True)
+            if 'composition' not in input_data.columns:
+                first_column = input_data.columns[0]
+                input_data.rename(columns={first_column: 'composition'}, inplace=True)
 
-        X = self.prepare_features(input_data)
+            # Predict band gaps and probabilities
+            predictions = self._predict_formulas(input_data['composition'], regress_all)
 
-        # Predict band gaps and probabilities
-        predictions = self.predict_with_probabilities(X)
+            # Combine original data with predictions
+            result = pd.concat([input_data.reset_index(drop=True), predictions], axis=1)
 
-        # Combine original data with predictions
-        result = pd.concat([input_data.reset_index(drop=True), predictions], axis=1)
+        self.last_timings = timings
+        self.metrics.increment('batches')
+        self.metrics.increment('rows', len(result))
         return result
 
-    def predict_from_formula(self, formula: Union[str, List[str]]) -> pd.DataFrame:
+    def predict_from_formula(self, formula: Union[str, List[str]], regress_all: bool = False) -> pd.DataFrame:
         """
         Predict band gap from a single chemical formula or list of formulas.
 
         Parameters:
             formula (str or list): Chemical formula as a string or list of strings.
+            regress_all (bool): Run the regressor for all formulas, not only for semiconductors.
 
         Returns:
             pd.DataFrame: DataFrame with predictions.
@@ -163,43 +594,82 @@ class BandGapPredictor:
             input_dict['composition'].append(formula)
         input_data = pd.DataFrame(input_dict)
 
-        return self.predict_from_file(input_data=input_data)
+        return self.predict_from_file(input_data=input_data, regress_all=regress_all)
 
 
 def main():
     """Command line interface for band gap prediction."""
     parser = argparse.ArgumentParser(description='Predict Band Gap from Chemical Formula or File')
-    parser.add_argument('--file', type=str, help='Path to input file (csv/excel) with chemical formulas')
+    parser.add_argument('--file', type=str,
+                        help='Path to input file (csv/excel/parquet/feather) with chemical formulas')
     parser.add_argument('--formula', type=str, help='Single chemical formula for prediction')
     parser.add_argument('--model_type', type=str, default='best_model',
                         help='Type of model to use for prediction: RandomForest, GradientBoosting, or XGBoost')
     parser.add_argument("--model_dir", type=str, default=None,
                         help="Directory where models and scalers are stored")
     parser.add_argument("--output", type=str, default=None,
-                        help="Path to save output predictions (CSV format)")
+                        help="Path to save output predictions (CSV, Parquet or Feather format by file extension)")
+    parser.add_argument("--n_jobs", type=int, default=None,
+                        help="Number of worker processes for featurization of large files (-1 uses all CPU cores)")
+    parser.add_argument("--pool_chunk_size", type=int, default=Config.DEFAULT_CHUNK_SIZE,
+                        help="Number of formulas featurized per worker process task (used with --n_jobs)")
+    parser.add_argument("--stream_chunksize", type=int, default=None,
+                        help="Stream the input file: read, predict and write this many rows at a time")
+    parser.add_argument("--composition_only", action="store_true",
+                        help="Read only the composition column of the input file")
+    parser.add_argument("--float32", action="store_true",
+                        help="Save the float prediction columns with float32 dtype")
+    parser.add_argument("--regress_all", action="store_true",
+                        help="Predict band gaps with the regressor also for materials classified as non-semiconductors")
+    parser.add_argument("--backend", type=str, default=Config.DEFAULT_BACKEND, choices=Config.PREDICTION_BACKENDS,
+                        help="Prediction backend: native models, compiled tree ensembles with folded scaling, "
+                             "or ONNX graphs run with onnxruntime")
+    parser.add_argument("--onnx_threads", type=int, default=None,
+                        help="Number of onnxruntime intra-op threads of the onnx backend (default: all CPU cores)")
+    parser.add_argument("--timings", action="store_true",
+                        help="Print the time spent in each prediction stage")
 
     args = parser.parse_args()
 
-    predictor = BandGapPredictor(model_type=args.model_type, model_dir=args.model_dir)
+    predictor = BandGapPredictor(model_type=args.model_type, model_dir=args.model_dir,
+                                 n_jobs=args.n_jobs, chunk_size=args.pool_chunk_size, backend=args.backend,
+                                 onnx_threads=args.onnx_threads)
 
-    if args.file:
-        predictions = predictor.predict_from_file(args.file)
+    if args.file and args.stream_chunksize:
+        if args.output:
+            n_rows = predictor.stream_predict_to_file(args.file, args.output, args.stream_chunksize,
+                                                      args.composition_only, args.float32, args.regress_all)
+            print(f"Predictions for {n_rows} rows from file '{args.file}' saved to {args.output}")
+        else:
+            print(f"Predictions from file '{args.file}':")
+            for predictions in predictor.iter_predict_from_file(args.file, args.stream_chunksize, args.composition_only,
+                                                                args.regress_all):
+                print(predictions.to_string(index=False))
+    elif args.file:
+        predictions = predictor.predict_from_file(args.file, composition_only=args.composition_only,
+                                                  regress_all=args.regress_all)
         print(f"Predictions from file '{args.file}':")
         print(predictions)
 
         if args.output:
-            predictions.to_csv(args.output, index=False)
+            predictor.save_predictions(predictions, args.output, args.float32)
             print(f"Results saved to {args.output}")
 
     if args.formula:
-        predictions = predictor.predict_from_formula(args.formula)
+        predictions = predictor.predict_from_formula(args.formula, regress_all=args.regress_all)
         print(f"Prediction for formula '{args.formula}':")
         print(predictions)
 
         if args.output:
-            predictions.to_csv(args.output, index=False)
+            predictor.save_predictions(predictions, args.output, args.float32)
             print(f"Results saved to {args.output}")
 
+    if args.timings:
+        print("Prediction stage timings:")
+        for stage, stats in predictor.metrics.snapshot()['stages'].items():
+            print(f"  {stage}: {stats['total_seconds']:.4f} s in {stats['count']} call(s)")
+        print(f"Counters: {predictor.metrics.snapshot()['counters']}")
+
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
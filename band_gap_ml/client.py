@@ -1,11 +1,15 @@
 import argparse
 import datetime
+import json
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List,  Union
+from typing import List, Union
 
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from band_gap_ml.constants import API_URL
 
@@ -15,60 +19,99 @@ start = time.time()
 
 class BandGapPredictorClient:
     """
-    A client for interacting with the Band Gap Predictor API.
+    A high-throughput client for interacting with the Band Gap Predictor API.
+
+    All requests share a pooled session with keep-alive connections. Transient failures
+    (connection errors, 502 and 503 responses) are retried with exponential backoff,
+    honouring the Retry-After header of an overloaded server. 504 responses are not retried, as the server
+    already spent its whole request timeout on the prediction.
 
     Attributes:
         server_url (str): The URL of the Band Gap Predictor server.
+        chunk_size (int): Number of formulas sent per request.
+        max_workers (int): Number of requests sent concurrently.
+        timeout (float): Seconds to wait for the response of a single request.
 
     Methods:
-        predict_band_gap(formula: Union[str, List[str]], model_type: str = "best_model") -> dict:
-            Sends a POST request to the server with the chemical formula(s).
-            Returns the prediction results in dictionary format.
+        predict_band_gap(formula: Union[str, List[str]], model_type: str = "best_model") -> pd.DataFrame:
+            Sends the chemical formula(s) in concurrent chunks to the batch endpoint.
+            Returns the prediction results as one DataFrame in input order.
 
-        predict_from_file(file_path: str, model_type: str = "best_model") -> dict:
-            Sends a POST request to the server with the path to a file containing chemical formulas.
-            Returns the prediction results in dictionary format.
+        predict_from_file(file_path: str, model_type: str = "best_model") -> pd.DataFrame:
+            Uploads a file containing chemical formulas and streams back the predictions.
+            Returns the prediction results as a DataFrame.
 
         healthcheck() -> dict:
             Sends a GET request to the server to check its health status.
             Returns the health status as a dictionary.
     """
 
-    def __init__(self, server_url: str):
+    def __init__(self, server_url: str = API_URL, chunk_size: int = 10000, max_workers: int = 4,
+                 max_retries: int = 5, backoff_factor: float = 0.5, timeout: float = 300):
         """
         Initializes a BandGapPredictorClient instance.
 
         Parameters:
             server_url (str): The URL of the Band Gap Predictor server.
+            chunk_size (int): Number of formulas sent per request.
+            max_workers (int): Number of requests sent concurrently.
+            max_retries (int): Number of retries of a failed request.
+            backoff_factor (float): Base delay in seconds of the exponential backoff between retries.
+            timeout (float): Seconds to wait for the response of a single request.
         """
-        self.server_url = server_url
-
-    def predict_band_gap(self, formula: Union[str, List[str]], model_type: str = "best_model"):
+        if chunk_size < 1 or max_workers < 1:
+            raise ValueError("Chunk size and number of workers must be positive integers.")
+        self.server_url = server_url.rstrip('/')
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.timeout = timeout
+
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(502, 503),
+            # Predictions are idempotent, so POST requests can be retried safely
+            allowed_methods=None,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def predict_band_gap(self, formula: Union[str, List[str]], model_type: str = "best_model",
+                         verbose_output: bool = False):
         """
-        Sends a POST request to the server with the chemical formula(s).
-        Returns the prediction results in dictionary format.
+        Sends the chemical formula(s) to the server in chunks of `chunk_size`, up to `max_workers` at a time.
+        Returns the prediction results in one DataFrame in the order of the formulas.
 
         Parameters:
             formula (str or List[str]): The chemical formula(s) to predict.
             model_type (str): The type of model to use for prediction.
+            verbose_output (bool): Include classification results and regression band gaps for all materials.
 
         Returns:
-            dict: Prediction results, including composition, is_semiconductor,
-                  semiconductor_probability, and band_gap.
+            pd.DataFrame: Prediction results with composition and band_gap columns, plus is_semiconductor
+                          and semiconductor_probability with verbose output.
+                          dict with an 'error' key if the request failed.
         """
         try:
-            # Prepare the request data
-            data = {
-                "formula": formula,
-                "model_type": model_type
-            }
-
-            # Send a POST request to the server
-            response = requests.post(f'{self.server_url}/predict_bandgap_from_formula', json=data)
-            response.raise_for_status()  # Raise an HTTPError for bad responses
-
-            # Parse the JSON response
-            return response.json()
+            formulas = [formula] if isinstance(formula, str) else list(formula)
+            chunks = [formulas[i:i + self.chunk_size] for i in range(0, len(formulas), self.chunk_size)]
+
+            if len(chunks) <= 1:
+                results = [self._predict_chunk(chunk, model_type, verbose_output) for chunk in chunks]
+            else:
+                # map() yields the results in submission order, so the chunks are merged in input order
+                with ThreadPoolExecutor(max_workers=min(self.max_workers, len(chunks))) as executor:
+                    results = list(executor.map(
+                        lambda chunk: self._predict_chunk(chunk, model_type, verbose_output), chunks
+                    ))
+
+            if not results:
+                return pd.DataFrame(columns=['composition', 'band_gap'])
+            return pd.concat(results, ignore_index=True)
 
         except requests.exceptions.RequestException as e:
             print(f"Request failed: {e}")
@@ -77,17 +120,42 @@ class BandGapPredictorClient:
             print(f"Unexpected error: {e}")
             return {'error': str(e)}
 
-    def predict_from_file(self, file_path: str, model_type: str = "best_model"):
+    def _predict_chunk(self, formulas: List[str], model_type: str, verbose_output: bool) -> pd.DataFrame:
         """
-        Sends a POST request to the server with the path to a file containing chemical formulas.
-        Returns the prediction results in dictionary format.
+        Predicts one chunk of formulas with the JSON batch endpoint.
 
         Parameters:
-            file_path (str): The path to the file containing chemical formulas.
+            formulas (List[str]): Chemical formulas of the chunk.
             model_type (str): The type of model to use for prediction.
+            verbose_output (bool): Include classification results and regression band gaps for all materials.
 
         Returns:
-            dict: Prediction results for all formulas in the file.
+            pd.DataFrame: Prediction results of the chunk.
+        """
+        data = {
+            "formulas": formulas,
+            "model_type": model_type,
+            "verbose_output": verbose_output,
+        }
+        response = self.session.post(f'{self.server_url}/predict_bandgap/batch', json=data, timeout=self.timeout)
+        self._raise_for_status(response)
+        # The server returns columnar arrays, which map directly onto DataFrame columns
+        return pd.DataFrame(response.json())
+
+    def predict_from_file(self, file_path: str, model_type: str = "best_model", verbose_output: bool = False):
+        """
+        Uploads a file containing chemical formulas to the server.
+        The predictions are streamed back as newline-delimited JSON, so the server never holds
+        all results in memory. Returns the prediction results as a DataFrame.
+
+        Parameters:
+            file_path (str): The path to a CSV, Excel, Parquet or Arrow IPC (Feather) file with chemical formulas.
+            model_type (str): The type of model to use for prediction.
+            verbose_output (bool): Include classification results and regression band gaps for all materials.
+
+        Returns:
+            pd.DataFrame: Prediction results for all formulas in the file.
+                          dict with an 'error' key if the request failed.
         """
         try:
             # Check if the path to the file is valid
@@ -97,16 +165,24 @@ class BandGapPredictorClient:
 
             # Prepare the form data
             data = {
-                "file_path": str(file_path_obj),
-                "model_type": model_type
+                "model_type": model_type,
+                "verbose_output": str(verbose_output).lower(),
             }
 
-            # Send a POST request to the server
-            response = requests.post(f'{self.server_url}/predict_bandgap_from_file', data=data)
-            response.raise_for_status()  # Raise an HTTPError for bad responses
+            with open(file_path_obj, 'rb') as file:
+                response = self.session.post(
+                    f'{self.server_url}/predict_bandgap', data=data,
+                    files={'file': (file_path_obj.name, file.read())},
+                    headers={'Accept': 'application/x-ndjson'}, timeout=self.timeout, stream=True,
+                )
 
-            # Parse the JSON response
-            return response.json()
+            with response:
+                self._raise_for_status(response)
+                records = [json.loads(line) for line in response.iter_lines() if line]
+
+            if records and 'error' in records[-1]:
+                raise RuntimeError(records[-1]['error'])
+            return pd.DataFrame.from_records(records)
 
         except requests.exceptions.RequestException as e:
             print(f"Request failed: {e}")
@@ -115,6 +191,19 @@ class BandGapPredictorClient:
             print(f"Unexpected error: {e}")
             return {'error': str(e)}
 
+    @staticmethod
+    def _raise_for_status(response: requests.Response):
+        """Raise an HTTPError with the error detail returned by the server for bad responses."""
+        if response.ok:
+            return
+        try:
+            detail = response.json().get('detail')
+        except ValueError:
+            detail = None
+        if detail is None:
+            response.raise_for_status()
+        raise requests.exceptions.HTTPError(f"{response.status_code} Error: {detail}", response=response)
+
     def healthcheck(self):
         """
         Sends a GET request to the server to check its health status.
@@ -125,7 +214,7 @@ class BandGapPredictorClient:
         """
         try:
             # Send a GET request to the server
-            response = requests.get(f'{self.server_url}/healthcheck')
+            response = self.session.get(f'{self.server_url}/healthcheck', timeout=self.timeout)
             response.raise_for_status()  # Raise an HTTPError for bad responses
 
             # Parse the JSON response
@@ -134,6 +223,16 @@ class BandGapPredictorClient:
         except requests.exceptions.RequestException as e:
             return {'error': str(e)}
 
+    def close(self):
+        """Close the pooled connections."""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description="Client for Band Gap Predictor API")
@@ -141,14 +240,20 @@ if __name__ == '__main__':
     parser.add_argument("--file", type=str, help="Path to a file containing chemical formulas")
     parser.add_argument("--model_type", type=str, default="best_model",
                         help="Type of model to use (default: best_model)")
+    parser.add_argument("--verbose_output", action="store_true",
+                        help="Include classification results and regression band gaps for all materials")
     parser.add_argument("--export_dir", type=str, default=".",
                         help="Export directory for the results")
     parser.add_argument("--server_url", type=str, default=API_URL,
                         help=f"URL of the Band Gap Predictor server (default: {API_URL})")
+    parser.add_argument("--chunk_size", type=int, default=10000,
+                        help="Number of formulas sent per request (default: 10000)")
+    parser.add_argument("--max_workers", type=int, default=4,
+                        help="Number of requests sent concurrently (default: 4)")
     args = parser.parse_args()
 
     # Create an instance of the client
-    client = BandGapPredictorClient(args.server_url)
+    client = BandGapPredictorClient(args.server_url, chunk_size=args.chunk_size, max_workers=args.max_workers)
 
     # Check the health of the server
     health_status = client.healthcheck()
@@ -160,22 +265,20 @@ if __name__ == '__main__':
     if args.formula:
         # Handle comma-separated list of formulas
         formulas = [f.strip() for f in args.formula.split(',')]
-        if len(formulas) == 1:
-            formulas = formulas[0]  # Single formula
 
         print(f"Predicting band gap for: {args.formula}")
-        results = client.predict_band_gap(formulas, args.model_type)
+        results = client.predict_band_gap(formulas, args.model_type, args.verbose_output)
     elif args.file:
         print(f"Predicting band gaps from file: {args.file}")
-        results = client.predict_from_file(args.file, args.model_type)
+        results = client.predict_from_file(args.file, args.model_type, args.verbose_output)
     else:
         print("Error: Either --formula or --file must be provided.")
         parser.print_help()
         exit(1)
+    client.close()
 
-    if results and 'error' not in results:
-        # Convert results to pandas DataFrame
-        df = pd.DataFrame(results)
+    if isinstance(results, pd.DataFrame):
+        df = results
         print("\nPrediction Results:")
         print(df)
 
@@ -188,4 +291,4 @@ if __name__ == '__main__':
         print(f"\nError: {results.get('error', 'Unknown error occurred')}")
 
     end = time.time()
-    print(f"\nWork took {time.strftime('%H:%M:%S', time.gmtime(end - start))}")
\ No newline at end of file
+    print(f"\nWork took {time.strftime('%H:%M:%S', time.gmtime(end - start))}")
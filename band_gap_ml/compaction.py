@@ -0,0 +1,178 @@
+"""Compaction module.
+
+Post-training pruning of tree ensembles under an accuracy budget. Inference cost grows linearly with the
+number of trees, so ensembles are cut to the smallest number of trees whose held-out metric stays within
+the budget of the full ensemble.
+
+Ensembles are only cut to their first trees, not to the trees that contribute most on validation data.
+Stages of boosted ensembles fit the residuals of the stages before them, so only their prefixes are
+valid models, and the trees of forests are exchangeable, so their prefixes are random subsets.
+Ranking forest trees by their held-out contribution would also fit the selection to the held-out split
+that reports the metric of the compact model.
+"""
+import copy
+import pickle
+import time
+
+import numpy as np
+
+from band_gap_ml.config import Config
+from band_gap_ml.model_arrays import flatten_model
+
+# Number of timed predictions of which the median is reported as latency
+LATENCY_REPEATS = 5
+
+
+def staged_predictions(model, X: np.ndarray) -> np.ndarray:
+    """
+    Predict with the first 1, 2, ..., n trees of an ensemble at once.
+
+    Boosted ensembles are truncated to their first stages. Trees of forests are exchangeable,
+    so their first trees are a random subset of the forest.
+
+    Parameters:
+        model (object): Fitted tree ensemble.
+        X (np.ndarray): Scaled feature matrix.
+
+    Returns:
+        np.ndarray: Predicted class labels of classifiers or target values of regressors,
+                    with shape (n_trees, n_rows).
+    """
+    ensemble = flatten_model(model)
+    values = ensemble.value.take(ensemble.apply(X), axis=0)
+    values[0] += ensemble.base_score
+    raw = np.cumsum(values, axis=0)
+    if ensemble.average:
+        raw /= np.arange(1, ensemble.n_trees + 1)[:, None, None]
+    if ensemble.classes_ is None:
+        return raw[..., 0]
+    if ensemble.link == 'logistic':
+        return ensemble.classes_.take((raw[..., 0] > 0).astype(int))
+    return ensemble.classes_.take(np.argmax(raw, axis=-1))
+
+
+def staged_scores(model, X: np.ndarray, y: np.ndarray, task: str) -> np.ndarray:
+    """
+    Compute the compaction metric of every number of trees.
+
+    Parameters:
+        model (object): Fitted tree ensemble.
+        X (np.ndarray): Scaled held-out feature matrix.
+        y (np.ndarray): Held-out targets.
+        task (str): 'classification' (accuracy) or 'regression' (R2 score).
+
+    Returns:
+        np.ndarray: Metric of the first k trees at index k - 1.
+    """
+    predictions = staged_predictions(model, X)
+    if task == 'classification':
+        return (predictions == y).mean(axis=1)
+    return 1 - ((predictions - y) ** 2).sum(axis=1) / ((y - y.mean()) ** 2).sum()
+
+
+def select_n_trees(scores: np.ndarray, budget: float) -> int:
+    """
+    Find the smallest number of trees with a metric at most `budget` below the full ensemble.
+
+    Parameters:
+        scores (np.ndarray): Metric of the first k trees at index k - 1.
+        budget (float): Allowed decrease of the metric.
+
+    Returns:
+        int: Number of trees.
+    """
+    return int(np.flatnonzero(scores >= scores[-1] - budget)[0]) + 1
+
+
+def truncate_model(model, n_trees: int):
+    """
+    Keep the first trees of a fitted ensemble.
+
+    Parameters:
+        model (object): Fitted random forest, gradient boosting or XGBoost model.
+        n_trees (int): Number of trees to keep.
+
+    Returns:
+        object: Shallow copy of the model with `n_trees` trees. The original model is not changed.
+    """
+    compact = copy.copy(model)
+    if hasattr(model, 'get_booster'):
+        booster = model.get_booster()
+        # Early stopped models predict with the rounds up to their best iteration only, like flatten_model
+        n_rounds = int(booster.attr('best_iteration')) + 1 if booster.attr('best_iteration') is not None \
+            else booster.num_boosted_rounds()
+        if n_rounds != flatten_model(model).n_trees:
+            raise ValueError("Only XGBoost models with one tree per boosting round can be truncated.")
+        if n_trees > n_rounds:
+            raise ValueError(f"Cannot keep {n_trees} trees of a model predicting with {n_rounds} trees.")
+        # The sliced booster has no best iteration, so the compact model predicts with all its rounds
+        compact._Booster = booster[:n_trees]
+        compact.n_estimators = n_trees
+    elif hasattr(model, 'learning_rate'):
+        compact.estimators_ = model.estimators_[:n_trees]
+        compact.train_score_ = model.train_score_[:n_trees]
+        compact.n_estimators = compact.n_estimators_ = n_trees
+    else:
+        compact.estimators_ = model.estimators_[:n_trees]
+        compact.n_estimators = n_trees
+    return compact
+
+
+def measure_latency(model, X: np.ndarray) -> float:
+    """Median wall time in seconds of predicting X."""
+    timings = []
+    for _ in range(LATENCY_REPEATS):
+        start = time.perf_counter()
+        model.predict(X)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def compact_results(results: dict, task: str, budget: float) -> dict:
+    """
+    Compact the final model of a training task under an accuracy budget.
+
+    The number of trees is chosen with the model trained on the training split and its held-out split,
+    and the final model is cut to the same number of trees. All statistics are those of the saved final
+    and compact models, with their metrics computed on the held-out split scaled with the final scaler.
+    Final models refit on the full data, or warm-started on it, were partly trained on that split;
+    'metric_data' tells whether their metrics are held-out ones.
+
+    Parameters:
+        results (dict): Results of train_classification_model or train_regression_model.
+        task (str): 'classification' or 'regression'.
+        budget (float): Allowed decrease of the held-out metric (accuracy or R2 score).
+
+    Returns:
+        dict: 'final_model' with the compact model, 'scaler', and 'statistics' with the number of trees,
+              metric, size and latency of the final and compact models, and the held-out metrics of the
+              selection with the model trained on the training split.
+    """
+    metric = Config.TASK_METRICS[task]
+    selection_scores = staged_scores(results['test_model'], results['X_test'], results['Y_test'], task)
+    n_trees = select_n_trees(selection_scores, budget)
+    final_model = results['final_model']
+    compact_model = truncate_model(final_model, n_trees)
+
+    X_test = results['X_test_final']
+    scores = staged_scores(final_model, X_test, results['Y_test'], task)
+    refit_mode = (results.get('refit') or {}).get('mode', 'none')
+    statistics = {
+        'metric': metric,
+        'budget': budget,
+        'metric_data': 'held-out split' if refit_mode == 'none' else 'held-out split, seen by the final model',
+        'n_trees': len(scores),
+        'compact_n_trees': n_trees,
+        'metric_value': float(scores[-1]),
+        'compact_metric_value': float(scores[n_trees - 1]),
+        'metric_delta': float(scores[n_trees - 1] - scores[-1]),
+        'selection_metric_value': float(selection_scores[-1]),
+        'selection_compact_metric_value': float(selection_scores[n_trees - 1]),
+        'size_bytes': len(pickle.dumps(final_model)),
+        'compact_size_bytes': len(pickle.dumps(compact_model)),
+        'latency_seconds': measure_latency(final_model, X_test),
+        'compact_latency_seconds': measure_latency(compact_model, X_test),
+    }
+    print(f"Compacted {task} model from {len(scores)} to {n_trees} trees: "
+          f"{metric} {statistics['metric_value']:.4f} -> {statistics['compact_metric_value']:.4f}")
+    return {'final_model': compact_model, 'scaler': results['scaler'], 'statistics': statistics}
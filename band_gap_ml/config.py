@@ -2,7 +2,6 @@
 """
 from pathlib import Path
 from typing import Optional
-from functools import lru_cache
 import pickle
 
 
@@ -21,6 +20,59 @@ class Config:
     ELEMENTS_PATH = DATA_DIR / 'elements.csv'
     CLASSIFICATION_DATA_PATH = DATA_DIR / 'train_classification.csv'
     REGRESSION_DATA_PATH = DATA_DIR / 'train_regression.csv'
+    # Feature matrices of training datasets, keyed by the hashes of the dataset and the elements file
+    FEATURE_CACHE_DIR = DATA_DIR / 'feature_cache'
+
+    # Semiconductor probability above which a material is classified as a semiconductor
+    CLASSIFICATION_THRESHOLD = 0.5
+
+    # Default maximum number of compositions kept in the BandGapPredictor prediction cache
+    DEFAULT_CACHE_SIZE = 10000
+
+    # Number of formulas per featurization task of the BandGapPredictor process pool
+    DEFAULT_CHUNK_SIZE = 10000
+    # Smaller inputs are featurized in-process, as starting worker processes would cost more than it saves
+    PARALLEL_MIN_ROWS = 50000
+
+    # Names of the model and scaler artifacts of a model type
+    ARTIFACT_NAMES = ('classification_model', 'regression_model', 'classification_scaler', 'regression_scaler')
+    # Model artifact formats and their file suffixes: pickled estimators, flattened memory-mappable arrays,
+    # or ONNX graphs of each model with its scaler, which have no separate scaler files
+    ARTIFACT_FORMATS = {'pickle': '.pkl', 'arrays': '.joblib', 'onnx': '.onnx'}
+    # Memory-map mode of array artifacts, so that worker processes on one host share one copy of the models
+    DEFAULT_MMAP_MODE = 'r'
+
+    # Prediction backends: the loaded models themselves, flattened tree ensembles with folded scaling,
+    # or ONNX graphs run with onnxruntime
+    PREDICTION_BACKENDS = ('native', 'compiled', 'onnx')
+    DEFAULT_BACKEND = 'native'
+
+    # Held-out metric of each task, used to compare model types and to bound the loss of ensemble compaction
+    TASK_METRICS = {'classification': 'accuracy', 'regression': 'r2_score'}
+    # Suffix of the model type directory the compact models are saved to next to the original models
+    COMPACT_MODEL_SUFFIX = '_compact'
+
+    # Hyperparameter search strategies: exhaustive grid search, successive halving, randomized search within a
+    # candidate and time budget, and randomized search with early stopping of boosted ensembles
+    SEARCH_STRATEGIES = ('grid', 'halving', 'random', 'early_stopping')
+    DEFAULT_SEARCH_STRATEGY = 'grid'
+    DEFAULT_SEARCH_N_ITER = 20
+    SEARCH_RANDOM_STATE = 0
+    # Fraction of candidates kept, and factor of the data they get, in each successive halving round
+    HALVING_FACTOR = 3
+    # Boosting stages without improvement on the validation split before stopping, the fraction of the
+    # training data used for validation, and the maximum number of stages if the grid has no n_estimators
+    EARLY_STOPPING_ROUNDS = 10
+    EARLY_STOPPING_VALIDATION_FRACTION = 0.1
+    EARLY_STOPPING_MAX_ESTIMATORS = 1000
+
+    # How the final models are obtained after evaluation on the held-out split: retrained from scratch on the
+    # full data, the evaluated model continued on the full data, or the evaluated model itself
+    REFIT_MODES = ('full', 'warm_start', 'none')
+    DEFAULT_REFIT = 'full'
+    # Trees added by warm starts relative to the evaluated model, in proportion to the data added by the held-out
+    # split, which is a quarter of the training split
+    WARM_START_EXTRA_FRACTION = 0.25
 
     # Model types
     MODEL_TYPES = {
@@ -84,7 +136,9 @@ class Config:
         }
     }
 
-    def __init__(self, model_type: str = 'best_model', model_dir: Optional[str] = None):
+    def __init__(self, model_type: str = 'best_model', model_dir: Optional[str] = None,
+                 artifact_format: Optional[str] = None, mmap_mode: Optional[str] = DEFAULT_MMAP_MODE,
+                 onnx_threads: Optional[int] = None):
         """
         Initialize the Config instance with model settings.
 
@@ -92,14 +146,34 @@ class Config:
             model_type (str): Type of model to load (e.g., 'RandomForest', 'GradientBoosting', 'XGBoost').
                              Default is 'best_model' with RandomForest models.
             model_dir (str, optional): Directory where models are stored. If None, uses default Config.MODELS_DIR.
+            artifact_format (str, optional): 'pickle', 'arrays' or 'onnx'. If None, uses array artifacts when
+                                             all of them exist and pickles otherwise. ONNX models include
+                                             their scalers, so the scalers of this format are None.
+            mmap_mode (str, optional): Memory-map mode of array artifacts. None reads them into memory.
+                                       Default is Config.DEFAULT_MMAP_MODE.
+            onnx_threads (int, optional): Number of onnxruntime intra-op threads of ONNX models.
+                                          None uses all CPU cores.
         """
         self.model_type = model_type
         self.model_dir = model_dir
+        self.mmap_mode = mmap_mode
+        self.onnx_threads = onnx_threads
         self._classification_model = None
         self._regression_model = None
         self._classification_scaler = None
         self._regression_scaler = None
-        self._model_paths = self.get_model_paths(model_type, model_dir)
+        self._models_loaded = False
+        self._model_paths = self.get_model_paths(model_type, model_dir, artifact_format)
+
+    @property
+    def model_paths(self):
+        """
+        Returns the paths to the model and scaler files of this configuration.
+
+        Returns:
+            dict: Dictionary with paths to model and scaler files.
+        """
+        return self._model_paths
 
     @property
     def classification_model(self):
@@ -149,27 +223,56 @@ class Config:
             self._load_models()
         return self._regression_scaler
 
-    @lru_cache(maxsize=None)
+    def load_models(self):
+        """
+        Load all models and scalers now instead of on first use.
+
+        Returns:
+            Config: This instance.
+        """
+        self._load_models()
+        return self
+
     def _load_models(self):
         """
-        Load all models and scalers from pickle files.
+        Load all models and scalers from pickle files, array artifacts or ONNX graphs, once per instance.
+
+        The loaded models live only on the instance, so they are freed together with it.
         """
-        self._classification_model = self._load_model(self._model_paths['classification_model'])
-        self._regression_model = self._load_model(self._model_paths['regression_model'])
-        self._classification_scaler = self._load_model(self._model_paths['classification_scaler'])
-        self._regression_scaler = self._load_model(self._model_paths['regression_scaler'])
+        if self._models_loaded:
+            return
+        self._classification_model = self._load_model(self._model_paths['classification_model'], self.mmap_mode,
+                                                      self.onnx_threads)
+        self._regression_model = self._load_model(self._model_paths['regression_model'], self.mmap_mode,
+                                                  self.onnx_threads)
+        # ONNX graphs include their scalers
+        if 'classification_scaler' in self._model_paths:
+            self._classification_scaler = self._load_model(self._model_paths['classification_scaler'], self.mmap_mode)
+            self._regression_scaler = self._load_model(self._model_paths['regression_scaler'], self.mmap_mode)
+        self._models_loaded = True
 
-    @staticmethod
-    def _load_model(filepath):
+    @classmethod
+    def _load_model(cls, filepath, mmap_mode: Optional[str] = None, onnx_threads: Optional[int] = None):
         """
-        Load a model from a pickle file.
+        Load a model from a pickle file, an array artifact or an ONNX graph.
 
         Parameters:
-            filepath (str or Path): Path to the pickle file.
+            filepath (str or Path): Path to the pickle file, array artifact or ONNX file.
+            mmap_mode (str, optional): Memory-map mode of an array artifact.
+            onnx_threads (int, optional): Number of onnxruntime intra-op threads of an ONNX model.
 
         Returns:
             object: The loaded model.
         """
+        suffix = Path(filepath).suffix
+        if suffix == cls.ARTIFACT_FORMATS['arrays']:
+            from band_gap_ml.model_arrays import load_artifact
+
+            return load_artifact(filepath, mmap_mode)
+        if suffix == cls.ARTIFACT_FORMATS['onnx']:
+            from band_gap_ml.onnx_export import OnnxModel
+
+            return OnnxModel(filepath, onnx_threads)
         with open(filepath, 'rb') as file:
             return pickle.load(file)
 
@@ -196,13 +299,16 @@ class Config:
         return model_dir
 
     @classmethod
-    def get_model_paths(cls, model_type='best_model', model_dir: Optional[str] = None):
+    def get_model_paths(cls, model_type='best_model', model_dir: Optional[str] = None,
+                        artifact_format: Optional[str] = None):
         """
         Get paths for model and scaler files.
 
         Parameters:
             model_type (str): Type of model to load (e.g., 'RandomForest', 'GradientBoosting', 'XGBoost').  Default is 'best_model' with RandomForest models.
             model_dir (str, optional): Directory where models are stored. If None, uses default Config.MODELS_DIR.
+            artifact_format (str, optional): 'pickle' or 'arrays'. If None, uses array artifacts when all of
+                                             them exist and pickles otherwise.
 
         Returns:
             dict: Dictionary with paths to model and scaler files
@@ -213,12 +319,18 @@ class Config:
             print(f"Model directory: {model_dir}")
             model_dir = Path(model_dir) / model_type.lower()
 
-        return {
-            'classification_model': model_dir / f'classification_model.pkl',
-            'regression_model': model_dir / f'regression_model.pkl',
-            'classification_scaler': model_dir / f'classification_scaler.pkl',
-            'regression_scaler': model_dir / f'regression_scaler.pkl'
-        }
+        if artifact_format is None:
+            arrays_suffix = cls.ARTIFACT_FORMATS['arrays']
+            has_arrays = all((model_dir / f'{name}{arrays_suffix}').exists() for name in cls.ARTIFACT_NAMES)
+            artifact_format = 'arrays' if has_arrays else 'pickle'
+        if artifact_format not in cls.ARTIFACT_FORMATS:
+            raise ValueError(f"Unknown artifact format: {artifact_format}. "
+                             f"Available formats: {', '.join(cls.ARTIFACT_FORMATS)}")
+
+        suffix = cls.ARTIFACT_FORMATS[artifact_format]
+        # ONNX graphs include their scalers
+        names = [name for name in cls.ARTIFACT_NAMES if artifact_format != 'onnx' or name.endswith('_model')]
+        return {name: model_dir / f'{name}{suffix}' for name in names}
 
     @staticmethod
     def get_default_grid_params(model_type, task):
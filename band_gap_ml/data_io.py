@@ -0,0 +1,265 @@
+"""Data input/output module.
+
+Reading of input files with chemical formulas and writing of predictions in CSV, Excel,
+Parquet and Arrow IPC (Feather) formats. pyarrow is imported lazily, only for columnar formats.
+"""
+from pathlib import Path
+from typing import IO, Iterator, List, Optional, Union
+
+import pandas as pd
+
+# Supported file extensions and their formats
+INPUT_FORMATS = {'.csv': 'csv', '.xlsx': 'excel', '.parquet': 'parquet', '.feather': 'feather', '.arrow': 'feather'}
+OUTPUT_FORMATS = {'.csv': 'csv', '.parquet': 'parquet', '.feather': 'feather', '.arrow': 'feather'}
+
+# Prediction columns stored as float32 when compact output is requested
+FLOAT_PREDICTION_COLUMNS = ['semiconductor_probability', 'band_gap']
+# Types of the prediction columns of an empty output file
+PREDICTION_DTYPES = {'is_semiconductor': 'int64', 'semiconductor_probability': 'float64', 'band_gap': 'float64'}
+
+Source = Union[str, Path, IO[bytes]]
+
+
+def get_file_format(file_name: Union[str, Path], formats: dict = INPUT_FORMATS) -> str:
+    """
+    Get the file format from the file extension.
+
+    Parameters:
+        file_name (str or Path): File name or path.
+        formats (dict): Mapping of supported extensions to formats.
+
+    Returns:
+        str: File format, e.g. 'csv' or 'parquet'.
+    """
+    file_format = formats.get(Path(str(file_name)).suffix.lower())
+    if file_format is None:
+        raise ValueError(f"Unsupported file format. Please provide a file with one of the extensions: "
+                         f"{', '.join(formats)}.")
+    return file_format
+
+
+def _rewind(source: Source):
+    """Move a file-like source back to its beginning so it can be read again."""
+    if hasattr(source, 'seek'):
+        source.seek(0)
+
+
+def read_column_names(source: Source, file_format: str) -> List[str]:
+    """
+    Read the column names of an input file without loading its data.
+
+    Parameters:
+        source (str, Path or file-like): Input file.
+        file_format (str): Input file format.
+
+    Returns:
+        list: Column names.
+    """
+    if file_format == 'csv':
+        names = pd.read_csv(source, nrows=0).columns
+    elif file_format == 'excel':
+        names = pd.read_excel(source, nrows=0).columns
+    elif file_format == 'parquet':
+        import pyarrow.parquet as pq
+        names = pq.read_schema(source).names
+    else:
+        import pyarrow as pa
+        names = pa.ipc.open_file(source).schema.names
+    _rewind(source)
+    return list(names)
+
+
+def get_composition_column(column_names: List[str]) -> str:
+    """
+    Get the name of the column with chemical formulas: 'composition' if present, otherwise the first column.
+
+    Parameters:
+        column_names (list): Column names of the input data.
+
+    Returns:
+        str: Name of the composition column.
+    """
+    return 'composition' if 'composition' in column_names else column_names[0]
+
+
+def read_input_data(source: Source, file_format: str, composition_only: bool = False) -> pd.DataFrame:
+    """
+    Read input data with chemical formulas.
+
+    Parameters:
+        source (str, Path or file-like): Input file.
+        file_format (str): Input file format.
+        composition_only (bool): Read only the composition column instead of all columns.
+
+    Returns:
+        pd.DataFrame: Input data.
+    """
+    columns = [get_composition_column(read_column_names(source, file_format))] if composition_only else None
+
+    if file_format == 'csv':
+        return pd.read_csv(source, usecols=columns)
+    if file_format == 'excel':
+        return pd.read_excel(source, usecols=columns)
+    if file_format == 'parquet':
+        return pd.read_parquet(source, columns=columns)
+    return pd.read_feather(source, columns=columns)
+
+
+def iter_input_data(source: Source, file_format: str, chunksize: int,
+                    composition_only: bool = False) -> Iterator[pd.DataFrame]:
+    """
+    Read input data with chemical formulas in chunks.
+
+    CSV and Parquet files are read incrementally and Arrow IPC files are memory-mapped and read one
+    record batch at a time, so memory is bounded by the chunk size and the record batch size. Excel files cannot be read incrementally
+    and are loaded at once before being split.
+
+    Parameters:
+        source (str, Path or file-like): Input file.
+        file_format (str): Input file format.
+        chunksize (int): Number of rows per chunk.
+        composition_only (bool): Read only the composition column instead of all columns.
+
+    Yields:
+        pd.DataFrame: Chunk of the input data.
+    """
+    columns = [get_composition_column(read_column_names(source, file_format))] if composition_only else None
+
+    if file_format == 'csv':
+        yield from pd.read_csv(source, usecols=columns, chunksize=chunksize)
+    elif file_format == 'parquet':
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+    elif file_format == 'feather':
+        import pyarrow as pa
+        memory_source = pa.memory_map(str(source)) if isinstance(source, (str, Path)) else source
+        reader = pa.ipc.open_file(memory_source)
+        # Compressed record batches are decompressed on reading, so they are read one at a time
+        # and re-chunked instead of reading the whole table
+        pending = pa.Table.from_batches([], reader.schema)
+        for i in range(reader.num_record_batches):
+            pending = pa.concat_tables([pending, pa.Table.from_batches([reader.get_batch(i)])])
+            while pending.num_rows >= chunksize:
+                chunk = pending.slice(0, chunksize)
+                yield (chunk.select(columns) if columns else chunk).to_pandas()
+                pending = pending.slice(chunksize)
+        if pending.num_rows:
+            yield (pending.select(columns) if columns else pending).to_pandas()
+    else:
+        input_data = read_input_data(source, file_format, composition_only)
+        for start in range(0, len(input_data), chunksize):
+            yield input_data.iloc[start:start + chunksize].copy()
+
+
+def to_float32(predictions: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert the float prediction columns to float32.
+
+    Parameters:
+        predictions (pd.DataFrame): DataFrame with predictions.
+
+    Returns:
+        pd.DataFrame: DataFrame with float32 prediction columns.
+    """
+    columns = [column for column in FLOAT_PREDICTION_COLUMNS if column in predictions.columns]
+    return predictions.astype({column: 'float32' for column in columns})
+
+
+def write_predictions(predictions: pd.DataFrame, output_path: Union[str, Path], float32: bool = False):
+    """
+    Write predictions to a CSV, Parquet or Arrow IPC (Feather) file depending on its extension.
+
+    Parameters:
+        predictions (pd.DataFrame): DataFrame with predictions.
+        output_path (str or Path): Path to the output file.
+        float32 (bool): Store the float prediction columns as float32.
+    """
+    with PredictionWriter(output_path, float32) as writer:
+        writer.write(predictions)
+
+
+class PredictionWriter:
+    """
+    Incremental writer of predictions to a CSV, Parquet or Arrow IPC (Feather) file.
+
+    Every call of `write` appends a chunk of predictions, so results of streamed predictions
+    never need to be held in memory at once. Use as a context manager to close the file.
+    If no chunk was written, closing writes an empty file with the input and prediction columns.
+    """
+
+    def __init__(self, output_path: Union[str, Path], float32: bool = False,
+                 input_columns: Optional[List[str]] = None):
+        """
+        Initialize the PredictionWriter.
+
+        Parameters:
+            output_path (str or Path): Path to the output file. An existing file is overwritten.
+            float32 (bool): Store the float prediction columns as float32.
+            input_columns (list, optional): Input columns preceding the prediction columns, used for an empty
+                                            output file. Default is ['composition'].
+        """
+        self.output_path = output_path
+        self.file_format = get_file_format(output_path, OUTPUT_FORMATS)
+        self.float32 = float32
+        self.input_columns = input_columns or ['composition']
+        self.n_rows = 0
+        self._started = False
+        self._writer = None
+        self._schema = None
+
+    def write(self, predictions: pd.DataFrame):
+        """
+        Append a chunk of predictions to the output file.
+
+        Parameters:
+            predictions (pd.DataFrame): DataFrame with predictions.
+        """
+        if self.float32:
+            predictions = to_float32(predictions)
+
+        if self.file_format == 'csv':
+            first_chunk = self.n_rows == 0
+            predictions.to_csv(self.output_path, index=False, mode='w' if first_chunk else 'a', header=first_chunk)
+        else:
+            import pyarrow as pa
+            table = pa.Table.from_pandas(predictions, preserve_index=False)
+            if self._writer is None:
+                self._schema = table.schema
+                if self.file_format == 'parquet':
+                    import pyarrow.parquet as pq
+                    self._writer = pq.ParquetWriter(self.output_path, self._schema)
+                else:
+                    self._writer = pa.ipc.new_file(str(self.output_path), self._schema)
+            else:
+                # Column types inferred from later chunks may differ, e.g. int vs float with NaN
+                table = table.cast(self._schema)
+            self._writer.write_table(table)
+
+        self._started = True
+        self.n_rows += len(predictions)
+
+    def empty_predictions(self) -> pd.DataFrame:
+        """
+        Build an empty DataFrame with the columns of the output file.
+
+        Returns:
+            pd.DataFrame: Empty DataFrame with string input columns and typed prediction columns.
+        """
+        columns = {column: pd.Series(dtype=str) for column in self.input_columns}
+        columns.update({column: pd.Series(dtype=dtype) for column, dtype in PREDICTION_DTYPES.items()})
+        return pd.DataFrame(columns)
+
+    def close(self):
+        """Close the output file, writing an empty file if no predictions were written."""
+        if not self._started:
+            self.write(self.empty_predictions())
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
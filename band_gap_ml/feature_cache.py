@@ -0,0 +1,147 @@
+"""Feature cache module.
+
+Loading of training data from files with chemical formulas and labels, or with precomputed feature columns,
+through an on-disk cache of the feature matrices. Cache entries are keyed by the hashes of the dataset file and
+of the elements properties file, so they are recomputed whenever either of them changes.
+"""
+import hashlib
+import os
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+import numpy as np
+
+from band_gap_ml.config import Config
+from band_gap_ml.data_io import get_composition_column, get_file_format, read_input_data
+from band_gap_ml.vectorizer import FormulaVectorizer
+
+# Bytes read at once while hashing files
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def file_hash(path: Union[str, Path]) -> str:
+    """
+    Compute the SHA-256 hash of a file.
+
+    Parameters:
+        path (str or Path): Path to the file.
+
+    Returns:
+        str: Hexadecimal digest.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_cache_path(data_path: Union[str, Path], task: str, elements_path: Union[str, Path] = Config.ELEMENTS_PATH,
+                   cache_dir: Union[str, Path] = Config.FEATURE_CACHE_DIR) -> Path:
+    """
+    Get the feature cache file of a dataset.
+
+    Parameters:
+        data_path (str or Path): Path to the dataset file.
+        task (str): 'classification' or 'regression'.
+        elements_path (str or Path): Path to the elements properties file used for featurization.
+        cache_dir (str or Path): Directory of the feature cache.
+
+    Returns:
+        Path: Path to the .npz cache file.
+    """
+    key = f'{file_hash(data_path)[:16]}_{file_hash(elements_path)[:16]}'
+    return Path(cache_dir) / f'{Path(data_path).stem}_{task}_{key}.npz'
+
+
+def compute_features(data_path: Union[str, Path], task: str,
+                     elements_path: Union[str, Path] = Config.ELEMENTS_PATH) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Read a dataset and compute its feature matrix and labels.
+
+    Datasets with all FormulaVectorizer feature columns are used as they are. Otherwise the dataset must
+    contain chemical formulas ('composition' column or the first column) and labels, which are featurized
+    with the FormulaVectorizer. The label column is the last column that is neither a formula nor a feature
+    column. Rows with formulas that cannot be featurized are dropped.
+
+    Parameters:
+        data_path (str or Path): Path to a CSV, Excel, Parquet or Arrow IPC (Feather) dataset.
+        task (str): 'classification' (integer labels) or 'regression'.
+        elements_path (str or Path): Path to the elements properties file.
+
+    Returns:
+        tuple: (np.ndarray feature matrix, np.ndarray labels).
+    """
+    vectorizer = FormulaVectorizer(elements_path)
+    data = read_input_data(data_path, get_file_format(data_path))
+    columns = list(data.columns)
+
+    if set(vectorizer.column_names).issubset(columns):
+        print(f"Reading precomputed features from {data_path}")
+        label_column = [column for column in columns if column not in set(vectorizer.column_names)][-1]
+        X = data[vectorizer.column_names].to_numpy(dtype=float)
+    else:
+        composition_column = get_composition_column(columns)
+        label_column = [column for column in columns if column != composition_column][-1]
+        print(f"Featurizing {len(data)} compositions from {data_path}")
+        X = vectorizer.vectorize_batch(data[composition_column])
+
+    y = data[label_column].to_numpy()
+    valid = ~np.isnan(X).any(axis=1)
+    if not valid.all():
+        print(f"Dropping {np.count_nonzero(~valid)} rows with formulas that could not be featurized")
+        X, y = X[valid], y[valid]
+    if task == 'classification':
+        y = y.astype('int')
+    return X, y
+
+
+def check_data_paths(data_paths: dict):
+    """
+    Check that the datasets of all tasks exist before any training starts.
+
+    The classification dataset of Config.CLASSIFICATION_DATA_PATH is not shipped with the package,
+    so it has to be given explicitly.
+
+    Parameters:
+        data_paths (dict): Task name to the path of its dataset.
+    """
+    for task, data_path in data_paths.items():
+        if not Path(data_path).is_file():
+            raise FileNotFoundError(f"The {task} dataset {data_path} does not exist. "
+                                    f"Pass the path of a {task} dataset with --{task}_data.")
+
+
+def load_training_data(data_path: Union[str, Path], task: str, elements_path: Union[str, Path] = Config.ELEMENTS_PATH,
+                       cache_dir: Optional[Union[str, Path]] = Config.FEATURE_CACHE_DIR) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Load the feature matrix and labels of a dataset, from the feature cache when possible.
+
+    Parameters:
+        data_path (str or Path): Path to the dataset file.
+        task (str): 'classification' or 'regression'.
+        elements_path (str or Path): Path to the elements properties file.
+        cache_dir (str or Path, optional): Directory of the feature cache. If None, features are always computed
+                                           and not cached.
+
+    Returns:
+        tuple: (np.ndarray feature matrix, np.ndarray labels).
+    """
+    if cache_dir is None:
+        return compute_features(data_path, task, elements_path)
+
+    cache_path = get_cache_path(data_path, task, elements_path, cache_dir)
+    if cache_path.exists():
+        print(f"Loading cached features from {cache_path}")
+        with np.load(cache_path) as cached:
+            return cached['X'], cached['y']
+
+    X, y = compute_features(data_path, task, elements_path)
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    # Write to a temporary file first, so that concurrent runs never read a partial cache file
+    temporary_path = cache_path.with_name(f'{cache_path.name}.{os.getpid()}.tmp')
+    with open(temporary_path, 'wb') as file:
+        np.savez(file, X=X, y=y)
+    os.replace(temporary_path, cache_path)
+    print(f"Saved features to {cache_path}")
+    return X, y
@@ -0,0 +1,169 @@
+"""Hyperparameter search module.
+
+Search strategies for the hyperparameters of the classification and regression models: exhaustive grid search,
+successive halving, randomized search with a candidate and time budget, and early stopping of boosted ensembles,
+which finds the number of trees on a validation split instead of searching over it.
+"""
+import time
+from typing import Optional
+
+import numpy as np
+from sklearn.model_selection import GridSearchCV, ParameterSampler, cross_val_score, train_test_split
+
+from band_gap_ml.config import Config
+
+
+def _run_candidates(params: dict, n_iter: int, time_budget: Optional[float], evaluate):
+    """
+    Evaluate randomly sampled parameter candidates until the candidate or time budget is spent.
+
+    Parameters:
+        params (dict): Parameter grid with lists of values.
+        n_iter (int): Maximum number of candidates.
+        time_budget (float, optional): Seconds after which no new candidate is started.
+        evaluate (callable): Function of candidate parameters returning their score and the
+                             parameters to keep, which may differ from the candidate.
+
+    Returns:
+        tuple: (best score, best parameters, number of evaluated candidates).
+    """
+    start = time.perf_counter()
+    best_score, best_params, n_candidates = -np.inf, None, 0
+    for candidate in ParameterSampler(params, n_iter, random_state=Config.SEARCH_RANDOM_STATE):
+        if time_budget is not None and n_candidates and time.perf_counter() - start > time_budget:
+            print(f"Time budget of {time_budget} s spent after {n_candidates} candidates")
+            break
+        score, candidate = evaluate(candidate)
+        n_candidates += 1
+        print(f"Score {score:.4f} for {candidate}")
+        if score > best_score:
+            best_score, best_params = score, candidate
+    return best_score, best_params, n_candidates
+
+
+def _early_stopping_evaluator(Model, X_fit, y_fit, X_val, y_val, max_estimators: int, estimator_params: dict):
+    """
+    Build a candidate evaluator fitting boosted ensembles with early stopping on a validation split.
+
+    Parameters:
+        Model (type): GradientBoosting or XGBoost estimator class.
+        X_fit, y_fit (np.ndarray): Training split.
+        X_val, y_val (np.ndarray): Validation split.
+        max_estimators (int): Maximum number of boosting stages.
+        estimator_params (dict): Fixed parameters of the estimators.
+
+    Returns:
+        callable: Evaluator for _run_candidates. The kept parameters include the number of stages
+                  before early stopping.
+    """
+    model_params = Model().get_params()
+    if 'early_stopping_rounds' in model_params:
+        def evaluate(candidate):
+            model = Model(**estimator_params, **candidate, n_estimators=max_estimators,
+                          early_stopping_rounds=Config.EARLY_STOPPING_ROUNDS)
+            model.fit(X_fit, y_fit, eval_set=[(X_val, y_val)], verbose=False)
+            return model.score(X_val, y_val), {**candidate, 'n_estimators': model.best_iteration + 1}
+    elif 'n_iter_no_change' in model_params:
+        def evaluate(candidate):
+            model = Model(**estimator_params, **candidate, n_estimators=max_estimators,
+                          n_iter_no_change=Config.EARLY_STOPPING_ROUNDS,
+                          validation_fraction=Config.EARLY_STOPPING_VALIDATION_FRACTION)
+            model.fit(X_fit, y_fit)
+            return model.score(X_val, y_val), {**candidate, 'n_estimators': int(model.n_estimators_)}
+    else:
+        raise ValueError(f"Early stopping is only supported for GradientBoosting and XGBoost models, "
+                         f"not {Model.__name__}.")
+    return evaluate
+
+
+def search_hyperparameters(Model, X: np.ndarray, y: np.ndarray, params: dict, task: str,
+                           strategy: str = Config.DEFAULT_SEARCH_STRATEGY, n_iter: int = Config.DEFAULT_SEARCH_N_ITER,
+                           time_budget: Optional[float] = None, cv: int = 5, n_jobs: int = -1,
+                           estimator_params: Optional[dict] = None):
+    """
+    Search the hyperparameters of a model.
+
+    Strategies:
+        'grid': cross-validate every combination of the parameter grid.
+        'halving': successive halving of the grid, cross-validating all candidates on a small sample of the data
+                   and only the best third of them on three times more data in each round.
+        'random': cross-validate at most `n_iter` randomly sampled combinations, within `time_budget` seconds.
+        'early_stopping': like 'random' for the parameters other than `n_estimators`, which is found by
+                          fitting GradientBoosting or XGBoost models with early stopping on a validation split.
+                          Candidates are compared by their validation split score, and the chosen one is
+                          cross-validated, so its best score is comparable with the other strategies.
+
+    Parameters:
+        Model (type): Estimator class.
+        X (np.ndarray): Scaled training features.
+        y (np.ndarray): Training targets.
+        params (dict): Parameter grid with lists of values.
+        task (str): 'classification' or 'regression'.
+        strategy (str): Search strategy, one of Config.SEARCH_STRATEGIES.
+        n_iter (int): Maximum number of candidates of the 'random' and 'early_stopping' strategies.
+        time_budget (float, optional): Seconds after which the 'random' and 'early_stopping' strategies start
+                                       no new candidate.
+        cv (int): Number of cross-validation folds.
+        n_jobs (int): Number of parallel fits of the cross-validation. -1 uses all CPU cores.
+        estimator_params (dict, optional): Fixed parameters of all estimators, e.g. their own `n_jobs`.
+
+    Returns:
+        tuple: (best estimator fitted on X, best parameters,
+                dict with the strategy, wall time, best cross-validated score and number of evaluated candidates,
+                and the validation split score of the 'early_stopping' strategy).
+    """
+    if strategy not in Config.SEARCH_STRATEGIES:
+        raise ValueError(f"Unknown search strategy: {strategy}. "
+                         f"Available strategies: {', '.join(Config.SEARCH_STRATEGIES)}")
+    print(f"Starting {strategy} search for {task}...")
+    estimator_params = estimator_params or {}
+    start = time.perf_counter()
+
+    if strategy in ('grid', 'halving'):
+        if strategy == 'grid':
+            search = GridSearchCV(Model(**estimator_params), params, cv=cv, n_jobs=n_jobs, verbose=2)
+        else:
+            from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+            from sklearn.model_selection import HalvingGridSearchCV
+
+            search = HalvingGridSearchCV(Model(**estimator_params), params, cv=cv, factor=Config.HALVING_FACTOR,
+                                         n_jobs=n_jobs, verbose=1, random_state=Config.SEARCH_RANDOM_STATE)
+        search.fit(X, y)
+        best_estimator, best_params, best_score = search.best_estimator_, search.best_params_, search.best_score_
+        # Successive halving has one cv_results_ row per candidate and round, so count the candidates of its first round
+        n_candidates = int(search.n_candidates_[0]) if strategy == 'halving' else len(search.cv_results_['params'])
+    else:
+        if strategy == 'random':
+            def evaluate(candidate):
+                model = Model(**estimator_params, **candidate)
+                return cross_val_score(model, X, y, cv=cv, n_jobs=n_jobs).mean(), candidate
+        else:
+            params = dict(params)
+            # Candidates are fit one at a time, so the estimators themselves get the parallelism of the search
+            if 'n_jobs' in estimator_params:
+                estimator_params = {**estimator_params, 'n_jobs': n_jobs}
+            max_estimators = max(params.pop('n_estimators', [Config.EARLY_STOPPING_MAX_ESTIMATORS]))
+            X_fit, X_val, y_fit, y_val = train_test_split(
+                X, y, test_size=Config.EARLY_STOPPING_VALIDATION_FRACTION, random_state=Config.SEARCH_RANDOM_STATE
+            )
+            evaluate = _early_stopping_evaluator(Model, X_fit, y_fit, X_val, y_val, max_estimators, estimator_params)
+
+        best_score, best_params, n_candidates = _run_candidates(params, n_iter, time_budget, evaluate)
+        if strategy == 'early_stopping':
+            validation_score = best_score
+            best_score = cross_val_score(Model(**estimator_params, **best_params), X, y, cv=cv,
+                                         n_jobs=1 if 'n_jobs' in estimator_params else n_jobs).mean()
+        best_estimator = Model(**estimator_params, **best_params).fit(X, y)
+
+    search_statistics = {
+        "strategy": strategy,
+        "wall_time_seconds": time.perf_counter() - start,
+        "best_score": float(best_score),
+        "n_candidates": n_candidates,
+    }
+    if strategy == 'early_stopping':
+        search_statistics["validation_score"] = float(validation_score)
+    print(f"Best score: {best_score}")
+    print(f"Best parameters: {best_params}")
+    print(f"Search took {search_statistics['wall_time_seconds']:.1f} s")
+    return best_estimator, best_params, search_statistics
@@ -0,0 +1,110 @@
+"""Inference executor module.
+
+Runs CPU-bound prediction jobs of the web service outside the asyncio event loop, with a bounded
+number of running and queued jobs and per-job timeouts.
+"""
+import asyncio
+import functools
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional
+
+
+class ServiceOverloadedError(Exception):
+    """Raised when all workers are busy and the job queue is full."""
+
+
+class InferenceExecutor:
+    """
+    An asyncio-friendly executor for CPU-bound prediction jobs.
+
+    Jobs run in a thread or process pool. At most `max_workers` jobs run at once and at most
+    `max_queue` further jobs wait for a worker; additional jobs are rejected immediately with
+    ServiceOverloadedError, so the caller can answer with a 503 instead of piling up work.
+    """
+
+    def __init__(self, kind: str = 'thread', max_workers: Optional[int] = None, max_queue: int = 0,
+                 timeout: Optional[float] = None):
+        """
+        Initialize the InferenceExecutor.
+
+        Parameters:
+            kind (str): 'thread' or 'process' pool.
+            max_workers (int, optional): Number of workers. If None, uses the pool default.
+            max_queue (int): Number of jobs that may wait for a free worker.
+            timeout (float, optional): Seconds to wait for a job result. None waits indefinitely.
+        """
+        if kind == 'process':
+            self._executor = ProcessPoolExecutor(max_workers=max_workers)
+        elif kind == 'thread':
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='inference')
+        else:
+            raise ValueError(f"Unsupported executor kind '{kind}'. Please use 'thread' or 'process'.")
+
+        self.kind = kind
+        self.max_workers = self._executor._max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.pending = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    async def run(self, func: Callable, *args, **kwargs):
+        """
+        Run a job in the pool and wait for its result.
+
+        Parameters:
+            func (callable): Job function. Must be picklable for a process pool.
+            *args, **kwargs: Arguments of the job function.
+
+        Returns:
+            object: Result of the job.
+
+        Raises:
+            ServiceOverloadedError: If all workers are busy and the queue is full.
+            asyncio.TimeoutError: If the job did not finish within the timeout.
+        """
+        # The counter is only touched from the event loop thread, so it needs no lock
+        if self.pending >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise ServiceOverloadedError(
+                f"All {self.max_workers} workers are busy and {self.max_queue} jobs are queued."
+            )
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+        self.pending += 1
+        # Release the slot only when the job really finishes, even if the caller stopped waiting
+        future.add_done_callback(self._release)
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise
+
+    def _release(self, future: asyncio.Future):
+        """Free the slot of a finished job and mark its exception as retrieved."""
+        self.pending -= 1
+        if not future.cancelled():
+            future.exception()
+
+    def stats(self) -> dict:
+        """
+        Get executor statistics.
+
+        Returns:
+            dict: Executor kind, number of workers, queue size, pending, rejected and timed out jobs.
+        """
+        return {
+            'kind': self.kind,
+            'max_workers': self.max_workers,
+            'max_queue': self.max_queue,
+            'timeout_seconds': self.timeout,
+            'pending': self.pending,
+            'rejected': self.rejected,
+            'timed_out': self.timed_out,
+        }
+
+    def shutdown(self):
+        """Shut down the worker pool without waiting for running jobs."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,234 @@
+"""Metrics module.
+
+Per-stage latency histograms and counters of the prediction hot path, with rendering in the
+Prometheus text exposition format.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+# Prediction stages in hot path order
+STAGES = ('input_decode', 'parsing', 'featurization', 'scaling', 'classification', 'regression', 'serialization')
+
+# Counters of processed work and their descriptions
+COUNTERS = {
+    'batches': 'Number of predicted batches.',
+    'rows': 'Number of predicted input rows.',
+    'parse_failures': 'Number of input rows with formulas that could not be parsed.',
+    'cache_hits': 'Number of distinct compositions found in the prediction cache.',
+    'cache_misses': 'Number of distinct compositions missing from the prediction cache.',
+}
+
+# Upper bounds of the latency histogram buckets in seconds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Cumulative latency histogram with fixed bucket bounds."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        """Record one observation."""
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+
+    def cumulative_counts(self) -> Iterator[Tuple[str, int]]:
+        """Yield (upper bound label, cumulative count) pairs including the +Inf bucket."""
+        total = 0
+        for bound, count in zip(self.buckets, self.bucket_counts):
+            total += count
+            yield repr(bound), total
+        yield '+Inf', self.count
+
+
+class PredictorMetrics:
+    """
+    Thread-safe stage timings and counters of one predictor.
+
+    Stage times measured inside `batch()` are summed per batch, e.g. both scaler transforms
+    count towards one 'scaling' observation, and recorded once when the batch ends. Stage times
+    measured outside a batch, e.g. serialization in the web service, are recorded directly.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        Initialize the PredictorMetrics.
+
+        Parameters:
+            buckets (tuple of float): Upper bounds of the latency histogram buckets in seconds.
+        """
+        self.buckets = buckets
+        self.histograms = {}
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def batch(self) -> Iterator[Dict[str, float]]:
+        """
+        Collect the stage times of one batch on the current thread.
+
+        Yields:
+            dict: Stage name to seconds, filled while the batch runs.
+        """
+        timings = {}
+        outer = getattr(self._local, 'timings', None)
+        self._local.timings = timings
+        try:
+            yield timings
+        finally:
+            self._local.timings = outer
+            if outer is None:
+                self.observe_all(timings)
+            else:
+                for stage, seconds in timings.items():
+                    outer[stage] = outer.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def time(self, stage: str):
+        """
+        Measure the wall time of a stage.
+
+        Parameters:
+            stage (str): Stage name, e.g. 'parsing' or 'classification'.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            timings = getattr(self._local, 'timings', None)
+            if timings is None:
+                self.observe(stage, seconds)
+            else:
+                timings[stage] = timings.get(stage, 0.0) + seconds
+
+    def observe(self, stage: str, seconds: float):
+        """
+        Record the duration of a stage.
+
+        Parameters:
+            stage (str): Stage name.
+            seconds (float): Duration in seconds.
+        """
+        self.observe_all({stage: seconds})
+
+    def observe_all(self, timings: Dict[str, float]):
+        """
+        Record the durations of several stages.
+
+        Parameters:
+            timings (dict): Stage name to seconds.
+        """
+        with self._lock:
+            for stage, seconds in timings.items():
+                histogram = self.histograms.get(stage)
+                if histogram is None:
+                    histogram = self.histograms[stage] = Histogram(self.buckets)
+                histogram.observe(seconds)
+
+    def increment(self, counter: str, value: int = 1):
+        """
+        Increase a counter.
+
+        Parameters:
+            counter (str): Counter name, e.g. 'rows' or 'parse_failures'.
+            value (int): Amount to add.
+        """
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def snapshot(self) -> dict:
+        """
+        Get the accumulated metrics.
+
+        Returns:
+            dict: 'stages' with count, total and mean seconds per stage, and 'counters'.
+        """
+        with self._lock:
+            return {
+                'stages': {
+                    stage: {
+                        'count': histogram.count,
+                        'total_seconds': histogram.sum,
+                        'mean_seconds': histogram.sum / histogram.count if histogram.count else 0.0,
+                    }
+                    for stage, histogram in self._ordered_histograms()
+                },
+                'counters': dict(self.counters),
+            }
+
+    def reset(self):
+        """Remove all recorded timings and reset the counters."""
+        with self._lock:
+            self.histograms = {}
+            self.counters = dict.fromkeys(COUNTERS, 0)
+
+    def _ordered_histograms(self):
+        """Histograms in hot path order, followed by other stages. Must be called with the lock held."""
+        order = {stage: i for i, stage in enumerate(STAGES)}
+        return sorted(self.histograms.items(), key=lambda item: (order.get(item[0], len(order)), item[0]))
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    """Format Prometheus labels, escaping backslashes, quotes and newlines in values."""
+    def escape(value) -> str:
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def render_prometheus(metrics_by_model: Iterable[Tuple[str, PredictorMetrics]],
+                      extra_metrics: Optional[Dict[str, Tuple[str, str, float]]] = None) -> str:
+    """
+    Render predictor metrics in the Prometheus text exposition format.
+
+    Parameters:
+        metrics_by_model (iterable): (model label, PredictorMetrics) pairs.
+        extra_metrics (dict, optional): Additional metrics without labels, as metric name to
+                                        (type, help text, value), e.g. ('gauge', 'Pending jobs.', 3).
+
+    Returns:
+        str: Metrics text.
+    """
+    metrics_by_model = list(metrics_by_model)
+    lines = [
+        '# HELP bandgap_stage_duration_seconds Time spent in a prediction stage per batch or request.',
+        '# TYPE bandgap_stage_duration_seconds histogram',
+    ]
+    counter_lines = {counter: [] for counter in COUNTERS}
+
+    for model, metrics in metrics_by_model:
+        with metrics._lock:
+            for stage, histogram in metrics._ordered_histograms():
+                labels = {'model': model, 'stage': stage}
+                for bound, count in histogram.cumulative_counts():
+                    lines.append(f'bandgap_stage_duration_seconds_bucket{_format_labels({**labels, "le": bound})} {count}')
+                lines.append(f'bandgap_stage_duration_seconds_sum{_format_labels(labels)} {histogram.sum!r}')
+                lines.append(f'bandgap_stage_duration_seconds_count{_format_labels(labels)} {histogram.count}')
+            for counter in COUNTERS:
+                counter_lines[counter].append(
+                    f'bandgap_{counter}_total{_format_labels({"model": model})} {metrics.counters.get(counter, 0)}'
+                )
+
+    for counter, counter_values in counter_lines.items():
+        lines.append(f'# HELP bandgap_{counter}_total {COUNTERS[counter]}')
+        lines.append(f'# TYPE bandgap_{counter}_total counter')
+        lines.extend(counter_values)
+
+    for name, (metric_type, help_text, value) in (extra_metrics or {}).items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {metric_type}')
+        lines.append(f'{name} {value}')
+
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,577 @@
+"""Model arrays module.
+
+Flattened tree ensembles and scalers made of plain NumPy arrays. Saved with joblib, the arrays of an
+artifact are memory-mapped on loading, so worker processes on one host share one physical copy of the
+models through the page cache, and loading needs neither scikit-learn nor XGBoost.
+"""
+import argparse
+import json
+from pathlib import Path
+from typing import Iterator, Optional, Tuple, Union
+
+import numpy as np
+
+# Version of the array artifact layout, stored in every artifact
+ARTIFACT_VERSION = 1
+
+# Number of (tree, row) pairs traversed at a time; small batches keep the node index arrays in CPU caches
+TRAVERSAL_BATCH_SIZE = 1 << 16
+# Number of tree levels between removals of (tree, row) pairs that reached a leaf
+COMPACTION_INTERVAL = 8
+
+
+class TreeEnsemble:
+    """
+    Tree ensemble stored as contiguous node arrays of all trees.
+
+    A row goes to the left child of a node if its feature value is less than or equal to the node
+    threshold, or if the value is missing (NaN) and the node sends missing values to the left.
+    Leaves are their own children, so `max_depth` steps of a traversal end in a leaf for every tree.
+    All trees are traversed together, one level at a time, with vectorized gathers over (tree, row) pairs.
+
+    The raw prediction is the base score plus the leaf values of all trees, summed in tree order
+    like scikit-learn and XGBoost do, and divided by the number of trees for averaged ensembles
+    (random forests). The 'logistic' link turns a raw score into the probability of the second class.
+    """
+
+    ARRAYS = ('feature', 'threshold', 'left', 'right', 'missing_left', 'value', 'roots', 'base_score')
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, left: np.ndarray, right: np.ndarray,
+                 missing_left: np.ndarray, value: np.ndarray, roots: np.ndarray, max_depth: int,
+                 base_score: np.ndarray, average: bool = False, link: str = 'identity',
+                 classes: Optional[np.ndarray] = None, n_features_in: Optional[int] = None):
+        """
+        Initialize the TreeEnsemble.
+
+        Parameters:
+            feature (np.ndarray): Feature index of each node.
+            threshold (np.ndarray): Split threshold of each node, +inf for leaves.
+            left (np.ndarray): Index of the left child of each node.
+            right (np.ndarray): Index of the right child of each node.
+            missing_left (np.ndarray): Whether each node sends missing values to the left child.
+            value (np.ndarray): Leaf values with shape (n_nodes, n_outputs).
+            roots (np.ndarray): Index of the root node of each tree.
+            max_depth (int): Maximum depth of the trees.
+            base_score (np.ndarray): Raw score added to the sum of the leaf values, one per output.
+            average (bool): Whether the sum of the leaf values is divided by the number of trees.
+            link (str): 'identity' for raw outputs, or 'logistic' for the positive class probability.
+            classes (np.ndarray, optional): Class labels of a classifier, None for a regressor.
+            n_features_in (int, optional): Number of input features.
+        """
+        if link not in ('identity', 'logistic'):
+            raise ValueError(f"Unsupported link function: {link}")
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_left = missing_left
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.base_score = base_score
+        self.average = average
+        self.link = link
+        self.classes_ = classes
+        self.n_features_in_ = n_features_in
+
+    @property
+    def n_trees(self) -> int:
+        """Number of trees in the ensemble."""
+        return len(self.roots)
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """
+        Find the leaf of every tree for every row.
+
+        Parameters:
+            X (np.ndarray): Feature matrix with shape (n_rows, n_features).
+
+        Returns:
+            np.ndarray: Leaf node indices with shape (n_trees, n_rows).
+        """
+        X = np.asarray(X, dtype=self.threshold.dtype)
+        leaves = np.empty((self.n_trees, len(X)), dtype=self.left.dtype)
+        for start, batch_leaves in self._iter_leaves(X):
+            leaves[:, start:start + batch_leaves.shape[1]] = batch_leaves
+        return leaves
+
+    def raw_predict(self, X: np.ndarray) -> np.ndarray:
+        """
+        Predict raw scores.
+
+        Parameters:
+            X (np.ndarray): Feature matrix with shape (n_rows, n_features).
+
+        Returns:
+            np.ndarray: Raw scores with shape (n_rows, n_outputs).
+        """
+        X = np.asarray(X, dtype=self.threshold.dtype)
+        raw = np.empty((len(X), self.value.shape[1]), dtype=self.value.dtype)
+        for start, leaves in self._iter_leaves(X):
+            values = self.value.take(leaves, axis=0)
+            values[0] += self.base_score
+            # A sum over the leading axis adds the trees one after another, in the order of the original models
+            raw[start:start + leaves.shape[1]] = values.sum(axis=0)
+        if self.average:
+            raw /= self.n_trees
+        return raw
+
+    def _iter_leaves(self, X: np.ndarray) -> Iterator[Tuple[int, np.ndarray]]:
+        """Yield (first row, leaf node indices with shape (n_trees, n_batch_rows)) for batches of rows."""
+        batch_rows = max(1, TRAVERSAL_BATCH_SIZE // max(self.n_trees, 1))
+        check_missing = bool(np.isnan(X).any())
+        for start in range(0, len(X), batch_rows):
+            yield start, self._traverse(np.ascontiguousarray(X[start:start + batch_rows]), check_missing)
+
+    def _traverse(self, rows: np.ndarray, check_missing: bool) -> np.ndarray:
+        """
+        Traverse all trees for a batch of rows, one tree level at a time.
+
+        Parameters:
+            rows (np.ndarray): C-contiguous feature matrix in the threshold dtype.
+            check_missing (bool): Whether rows contain missing values.
+
+        Returns:
+            np.ndarray: Leaf node indices with shape (n_trees, n_rows).
+        """
+        flat_rows = rows.ravel()
+        row_offsets = np.arange(len(rows)) * rows.shape[1]
+        nodes = np.repeat(self.roots[:, None], len(rows), axis=1)
+        # The first levels are traversed for all (tree, row) pairs at once
+        for _ in range(min(self.max_depth, COMPACTION_INTERVAL)):
+            nodes = self._descend(nodes, flat_rows, row_offsets, check_missing)
+        if self.max_depth <= COMPACTION_INTERVAL:
+            return nodes
+
+        # Deeper levels of unbalanced trees, e.g. of random forests, only follow pairs that are not in a leaf yet
+        nodes = nodes.ravel()
+        pending = np.flatnonzero(self.left.take(nodes) != nodes)
+        current, offsets = nodes[pending], row_offsets[pending % len(rows)]
+        remaining = self.max_depth - COMPACTION_INTERVAL
+        while remaining > 0 and len(pending):
+            for _ in range(min(remaining, COMPACTION_INTERVAL)):
+                current = self._descend(current, flat_rows, offsets, check_missing)
+            remaining -= COMPACTION_INTERVAL
+            nodes[pending] = current
+            unfinished = self.left.take(current) != current
+            pending, current, offsets = pending[unfinished], current[unfinished], offsets[unfinished]
+        return nodes.reshape(self.n_trees, len(rows))
+
+    def _descend(self, nodes: np.ndarray, flat_rows: np.ndarray, row_offsets: np.ndarray,
+                 check_missing: bool) -> np.ndarray:
+        """Move every node index one level down, to the child chosen by its row."""
+        values = flat_rows.take(self.feature.take(nodes) + row_offsets)
+        go_left = values <= self.threshold.take(nodes)
+        if check_missing:
+            go_left |= np.isnan(values) & self.missing_left.take(nodes)
+        return np.where(go_left, self.left.take(nodes), self.right.take(nodes))
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """
+        Predict class probabilities.
+
+        Parameters:
+            X (np.ndarray): Feature matrix with shape (n_rows, n_features).
+
+        Returns:
+            np.ndarray: Class probabilities with shape (n_rows, n_classes).
+        """
+        if self.classes_ is None:
+            raise ValueError("Class probabilities are only available for classifiers.")
+        raw = self.raw_predict(X)
+        if self.link == 'identity':
+            return raw
+        positive = 1 / (1 + np.exp(-raw[:, 0]))
+        return np.column_stack([1 - positive, positive])
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """
+        Predict class labels of a classifier or target values of a regressor.
+
+        Parameters:
+            X (np.ndarray): Feature matrix with shape (n_rows, n_features).
+
+        Returns:
+            np.ndarray: Predicted class labels or target values.
+        """
+        if self.classes_ is None:
+            return self.raw_predict(X)[:, 0]
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+    def to_dict(self) -> dict:
+        """Artifact content of the ensemble: its arrays and settings."""
+        return {
+            'kind': 'tree_ensemble',
+            'version': ARTIFACT_VERSION,
+            **{name: getattr(self, name) for name in self.ARRAYS},
+            'max_depth': self.max_depth,
+            'average': self.average,
+            'link': self.link,
+            'classes': self.classes_,
+            'n_features_in': self.n_features_in_,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'TreeEnsemble':
+        """Create an ensemble from artifact content made by `to_dict`."""
+        # Class labels are copied out of the memory map, so predicted labels are plain arrays
+        classes = None if data['classes'] is None else np.array(data['classes'])
+        return cls(**{name: data[name] for name in cls.ARRAYS}, max_depth=data['max_depth'],
+                   average=data['average'], link=data['link'], classes=classes,
+                   n_features_in=data['n_features_in'])
+
+
+class ArrayScaler:
+    """Standardization with stored mean and scale, matching `StandardScaler.transform`."""
+
+    def __init__(self, mean: np.ndarray, scale: np.ndarray):
+        """
+        Initialize the ArrayScaler.
+
+        Parameters:
+            mean (np.ndarray): Mean subtracted from each feature.
+            scale (np.ndarray): Scale each feature is divided by.
+        """
+        self.mean_ = mean
+        self.scale_ = scale
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        """
+        Standardize features.
+
+        Parameters:
+            X (np.ndarray): Feature matrix with shape (n_rows, n_features).
+
+        Returns:
+            np.ndarray: Standardized copy of the feature matrix.
+        """
+        X = np.array(X, dtype=float)
+        X -= self.mean_
+        X /= self.scale_
+        return X
+
+    def to_dict(self) -> dict:
+        """Artifact content of the scaler."""
+        return {'kind': 'standard_scaler', 'version': ARTIFACT_VERSION, 'mean': self.mean_, 'scale': self.scale_}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'ArrayScaler':
+        """Create a scaler from artifact content made by `to_dict`."""
+        return cls(data['mean'], data['scale'])
+
+
+def _float32_at_most(values: np.ndarray) -> np.ndarray:
+    """Largest float32 values not above the given values, so `x <= t` holds for the same float32 inputs."""
+    rounded = values.astype(np.float32)
+    too_large = rounded.astype(values.dtype) > values
+    rounded[too_large] = np.nextafter(rounded[too_large], np.float32(-np.inf))
+    return rounded
+
+
+def _ordered_keys(values: np.ndarray) -> np.ndarray:
+    """Map float64 values to int64 keys with the same order, consecutive for adjacent floats."""
+    bits = values.view(np.int64)
+    return np.where(bits < 0, -(bits & np.int64(0x7FFFFFFFFFFFFFFF)), bits)
+
+
+def _from_ordered_keys(keys: np.ndarray) -> np.ndarray:
+    """Inverse of `_ordered_keys`."""
+    bits = np.where(keys < 0, -keys | np.int64(-0x8000000000000000), keys)
+    return bits.view(np.float64)
+
+
+def _tree_depth(left: np.ndarray, right: np.ndarray, root: int) -> int:
+    """Depth of a tree given as child index arrays, where leaves are their own children."""
+    depth, level = 0, np.array([root])
+    while True:
+        inner = level[left[level] != level]
+        if not len(inner):
+            return depth
+        depth += 1
+        level = np.concatenate([left[inner], right[inner]])
+
+
+def _concatenate_trees(trees: list, **settings) -> TreeEnsemble:
+    """
+    Build a TreeEnsemble from per-tree node arrays.
+
+    Parameters:
+        trees (list): Tuples of (feature, threshold, left, right, missing_left, value) per tree,
+                      with child indices local to the tree and -1 for leaves.
+        **settings: TreeEnsemble settings other than the node arrays.
+
+    Returns:
+        TreeEnsemble: The flattened ensemble.
+    """
+    sizes = np.array([len(tree[0]) for tree in trees], dtype=np.int64)
+    roots = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int64)
+    feature, threshold, left, right, missing_left, value = (
+        np.concatenate([tree[i] for tree in trees]) for i in range(6)
+    )
+    left = left.astype(np.int64)
+    right = right.astype(np.int64)
+    offsets = np.repeat(roots, sizes)
+    is_leaf = left < 0
+    node_index = np.arange(len(left), dtype=np.int64)
+    left = np.where(is_leaf, node_index, left + offsets)
+    right = np.where(is_leaf, node_index, right + offsets)
+    feature = np.where(is_leaf, 0, feature).astype(np.int32)
+    threshold[is_leaf] = np.inf
+    max_depth = max(_tree_depth(left, right, root) for root in roots)
+    return TreeEnsemble(feature, threshold, left, right, missing_left.astype(bool), value, roots, max_depth,
+                        **settings)
+
+
+def _sklearn_tree_arrays(tree, value: np.ndarray) -> tuple:
+    """Node arrays of a fitted scikit-learn `Tree` with the given leaf values."""
+    missing_left = getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count, dtype=bool))
+    return (tree.feature, _float32_at_most(tree.threshold), tree.children_left, tree.children_right,
+            np.asarray(missing_left), value)
+
+
+def _from_sklearn_forest(model) -> TreeEnsemble:
+    """Flatten a scikit-learn random forest or extra trees ensemble."""
+    classes = getattr(model, 'classes_', None)
+    trees = []
+    for estimator in model.estimators_:
+        value = estimator.tree_.value[:, 0, :]
+        if classes is not None:
+            # Same normalization as DecisionTreeClassifier.predict_proba
+            normalizer = value.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            value = value / normalizer
+        trees.append(_sklearn_tree_arrays(estimator.tree_, value))
+    n_outputs = trees[0][5].shape[1]
+    return _concatenate_trees(trees, base_score=np.zeros(n_outputs), average=True, classes=classes,
+                              n_features_in=model.n_features_in_)
+
+
+def _from_sklearn_gradient_boosting(model) -> TreeEnsemble:
+    """Flatten a scikit-learn gradient boosting ensemble of a regressor or binary classifier."""
+    if model.estimators_.shape[1] != 1:
+        raise ValueError("Only gradient boosting regressors and binary classifiers can be flattened.")
+    classes = getattr(model, 'classes_', None)
+    # The initial raw prediction of the prior estimator is the same for every row
+    base_score = model._raw_predict_init(np.zeros((1, model.n_features_in_)))[0]
+    trees = [
+        # Leaf values are scaled by the learning rate exactly as in the stage-wise prediction
+        _sklearn_tree_arrays(estimator.tree_, model.learning_rate * estimator.tree_.value[:, 0, :])
+        for estimator in model.estimators_[:, 0]
+    ]
+    return _concatenate_trees(trees, base_score=base_score, link='identity' if classes is None else 'logistic',
+                              classes=classes, n_features_in=model.n_features_in_)
+
+
+def _from_xgboost(model) -> TreeEnsemble:
+    """Flatten an XGBoost regressor or binary classifier with a tree booster."""
+    learner = json.loads(model.get_booster().save_raw('json'))['learner']
+    booster = learner['gradient_booster']
+    if booster['name'] != 'gbtree':
+        raise ValueError(f"Unsupported XGBoost booster: {booster['name']}")
+    objective = learner['objective']['name']
+    base_score = float(learner['learner_model_param']['base_score'].strip('[]'))
+    if objective in ('binary:logistic', 'reg:logistic'):
+        link, base_score = 'logistic', np.log(base_score / (1 - base_score))
+    elif objective in ('reg:squarederror', 'reg:absoluteerror', 'reg:pseudohubererror', 'reg:quantileerror'):
+        link = 'identity'
+    else:
+        raise ValueError(f"Unsupported XGBoost objective: {objective}")
+
+    tree_data = booster['model']['trees']
+    try:
+        # Predictions of early stopped models only use the trees up to the best iteration
+        tree_data = tree_data[:int(booster['model']['iteration_indptr'][model.best_iteration + 1])]
+    except AttributeError:
+        pass
+
+    trees = []
+    for tree in tree_data:
+        if any(tree['split_type']):
+            raise ValueError("XGBoost models with categorical splits cannot be flattened.")
+        left = np.array(tree['left_children'], dtype=np.int64)
+        # Leaves store their value in place of the split condition
+        conditions = np.array(tree['split_conditions'], dtype=np.float32)
+        # XGBoost goes left if x < condition, which is x <= the next smaller float32
+        threshold = np.nextafter(conditions, np.float32(-np.inf))
+        value = np.where(left < 0, conditions, 0).astype(np.float32)[:, np.newaxis]
+        trees.append((np.array(tree['split_indices']), threshold, left, np.array(tree['right_children']),
+                      np.array(tree['default_left'], dtype=bool), value))
+
+    classes = getattr(model, 'classes_', None)
+    return _concatenate_trees(trees, base_score=np.array([base_score], dtype=np.float32), link=link,
+                              classes=classes, n_features_in=model.n_features_in_)
+
+
+def flatten_model(model) -> TreeEnsemble:
+    """
+    Flatten a fitted tree ensemble into contiguous node arrays.
+
+    Supports random forests and gradient boosting of scikit-learn, and XGBoost models,
+    each as a regressor or binary classifier.
+
+    Parameters:
+        model (object): Fitted model.
+
+    Returns:
+        TreeEnsemble: The flattened ensemble.
+    """
+    if isinstance(model, TreeEnsemble):
+        return model
+    if hasattr(model, 'get_booster'):
+        return _from_xgboost(model)
+    if hasattr(model, 'estimators_') and hasattr(model, 'learning_rate'):
+        return _from_sklearn_gradient_boosting(model)
+    if hasattr(model, 'estimators_') and all(hasattr(estimator, 'tree_') for estimator in model.estimators_):
+        return _from_sklearn_forest(model)
+    raise ValueError(f"Unsupported model type: {type(model).__name__}")
+
+
+def flatten_scaler(scaler) -> ArrayScaler:
+    """
+    Convert a fitted StandardScaler into an ArrayScaler.
+
+    Parameters:
+        scaler (object): Fitted StandardScaler.
+
+    Returns:
+        ArrayScaler: Scaler with the same mean and scale.
+    """
+    if isinstance(scaler, ArrayScaler):
+        return scaler
+    n_features = scaler.n_features_in_
+    mean = scaler.mean_ if scaler.mean_ is not None and scaler.with_mean else np.zeros(n_features)
+    scale = scaler.scale_ if scaler.scale_ is not None else np.ones(n_features)
+    return ArrayScaler(np.asarray(mean, dtype=float), np.asarray(scale, dtype=float))
+
+
+def fold_scaler(ensemble: TreeEnsemble, scaler) -> TreeEnsemble:
+    """
+    Fold the standardization of a scaler into the split thresholds of an ensemble.
+
+    The original models compare scaled features rounded to float32 with float32 thresholds. Each threshold
+    is replaced by the largest float64 raw feature value whose scaled value still rounds to at most the
+    threshold, so raw features give exactly the same decisions without a scaled copy of the input.
+
+    Parameters:
+        ensemble (TreeEnsemble): Flattened ensemble with float32 thresholds on scaled features.
+        scaler (object): Fitted StandardScaler or ArrayScaler the ensemble was trained with.
+
+    Returns:
+        TreeEnsemble: Ensemble with float64 thresholds on raw features, sharing all other arrays.
+    """
+    if ensemble.threshold.dtype != np.float32:
+        raise ValueError("Only ensembles with float32 thresholds on scaled features can be folded.")
+    scaler = flatten_scaler(scaler)
+    threshold = ensemble.threshold.astype(float)
+    internal = np.flatnonzero(ensemble.left != np.arange(len(ensemble.left)))
+    mean = scaler.mean_[ensemble.feature[internal]]
+    scale = scaler.scale_[ensemble.feature[internal]]
+
+    # Largest float64 rounding to at most the float32 threshold: the midpoint to the next float32,
+    # unless the midpoint itself rounds up
+    lower = threshold[internal]
+    upper = np.nextafter(ensemble.threshold[internal], np.float32(np.inf)).astype(float)
+    bound = (lower + upper) / 2
+    bound = np.where(bound.astype(np.float32) <= ensemble.threshold[internal], bound, np.nextafter(bound, -np.inf))
+
+    # Bisection over all float64 values in order finds the largest raw value whose scaled value is within bound
+    low = _ordered_keys(np.full(len(internal), -np.inf))
+    high = _ordered_keys(np.full(len(internal), np.inf))
+    while True:
+        searching = low + 1 < high
+        if not searching.any():
+            break
+        middle = (low >> 1) + (high >> 1) + (low & high & 1)
+        middle_value = _from_ordered_keys(middle)
+        within = (middle_value - mean) / scale <= bound
+        low = np.where(searching & within, middle, low)
+        high = np.where(searching & ~within, middle, high)
+    raw = np.where(bound == np.inf, np.inf, _from_ordered_keys(low))
+
+    threshold[internal] = raw
+    return TreeEnsemble(ensemble.feature, threshold, ensemble.left, ensemble.right, ensemble.missing_left,
+                        ensemble.value, ensemble.roots, ensemble.max_depth, ensemble.base_score,
+                        average=ensemble.average, link=ensemble.link, classes=ensemble.classes_,
+                        n_features_in=ensemble.n_features_in_)
+
+
+def compile_model(model, scaler) -> TreeEnsemble:
+    """
+    Compile a model and its scaler into one flattened ensemble that predicts from raw features.
+
+    Parameters:
+        model (object): Fitted tree ensemble or TreeEnsemble.
+        scaler (object): Fitted StandardScaler or ArrayScaler of the model.
+
+    Returns:
+        TreeEnsemble: Ensemble with the scaler folded into its thresholds.
+    """
+    return fold_scaler(flatten_model(model), scaler)
+
+
+def save_artifact(obj, path: Union[str, Path]):
+    """
+    Save a model or scaler as an array artifact.
+
+    Arrays are stored uncompressed, which is required for memory-mapping them on loading.
+
+    Parameters:
+        obj (object): Fitted model or scaler, or an already flattened TreeEnsemble or ArrayScaler.
+        path (str or Path): Path of the artifact file.
+    """
+    import joblib
+
+    flat = flatten_model(obj) if hasattr(obj, 'predict') else flatten_scaler(obj)
+    joblib.dump(flat.to_dict(), path)
+
+
+def load_artifact(path: Union[str, Path], mmap_mode: Optional[str] = 'r'):
+    """
+    Load an array artifact.
+
+    Parameters:
+        path (str or Path): Path of the artifact file.
+        mmap_mode (str, optional): NumPy memory-map mode of the arrays, e.g. 'r'. None reads them into memory.
+
+    Returns:
+        TreeEnsemble or ArrayScaler: The loaded model or scaler.
+    """
+    import joblib
+
+    data = joblib.load(path, mmap_mode=mmap_mode)
+    if data.get('version') != ARTIFACT_VERSION:
+        raise ValueError(f"Unsupported model artifact version {data.get('version')} in {path}")
+    if data['kind'] == 'tree_ensemble':
+        return TreeEnsemble.from_dict(data)
+    if data['kind'] == 'standard_scaler':
+        return ArrayScaler.from_dict(data)
+    raise ValueError(f"Unknown model artifact kind {data['kind']} in {path}")
+
+
+def convert_models(model_type: str = 'best_model', model_dir: Optional[str] = None):
+    """
+    Save array artifacts next to the pickled models and scalers of a model type.
+
+    Parameters:
+        model_type (str): Type of model to convert (e.g., 'RandomForest', 'GradientBoosting', 'XGBoost').
+        model_dir (str, optional): Directory where models are stored. If None, uses default Config.MODELS_DIR.
+    """
+    import pickle
+
+    from band_gap_ml.config import Config
+
+    pickle_paths = Config.get_model_paths(model_type, model_dir, artifact_format='pickle')
+    array_paths = Config.get_model_paths(model_type, model_dir, artifact_format='arrays')
+    for name, pickle_path in pickle_paths.items():
+        print(f"Saving {name} from {pickle_path} to {array_paths[name]}")
+        with open(pickle_path, 'rb') as file:
+            save_artifact(pickle.load(file), array_paths[name])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Convert pickled models and scalers into memory-mappable array artifacts.")
+    parser.add_argument("--model_type", type=str, default="best_model", help="Type of model to convert")
+    parser.add_argument("--model_dir", type=str, default=None, help="Directory where models and scalers are stored")
+    args = parser.parse_args()
+
+    convert_models(args.model_type, args.model_dir)
@@ -0,0 +1,261 @@
+"""Model registry module.
+
+Process-wide registry of loaded BandGapPredictor instances, so every model is unpickled once
+and shared between requests instead of being loaded for each of them.
+"""
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from band_gap_ml.band_gap_predictor import BandGapPredictor
+from band_gap_ml.config import Config
+
+
+class ModelRegistry:
+    """
+    A thread-safe registry of loaded predictors keyed by (model_type, model_dir).
+
+    Each model is loaded once on first request or at startup via `preload`. If `max_models`
+    is set, the least recently used models are evicted when the limit is exceeded.
+    """
+
+    def __init__(self, max_models: Optional[int] = None, **predictor_kwargs):
+        """
+        Initialize the ModelRegistry.
+
+        Parameters:
+            max_models (int, optional): Maximum number of resident models. None keeps all loaded models.
+            **predictor_kwargs: Additional keyword arguments passed to every BandGapPredictor.
+        """
+        self.max_models = max_models
+        self.predictor_kwargs = predictor_kwargs
+        self._predictors = OrderedDict()
+        self._details = {}
+        self._load_locks = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model_type: str = 'best_model', model_dir: Optional[str] = None) -> Tuple[str, Optional[str]]:
+        """
+        Build the registry key of a model.
+
+        Parameters:
+            model_type (str): Type of model, e.g. 'best_model' or 'XGBoost'. Case-insensitive.
+            model_dir (str, optional): Directory where models are stored.
+
+        Returns:
+            tuple: (lower-case model type, model directory or None).
+        """
+        return model_type.lower(), str(model_dir) if model_dir else None
+
+    def get(self, model_type: str = 'best_model', model_dir: Optional[str] = None) -> BandGapPredictor:
+        """
+        Get a predictor with loaded models, loading it on first use.
+
+        Parameters:
+            model_type (str): Type of model, e.g. 'best_model' or 'XGBoost'.
+            model_dir (str, optional): Directory where models are stored. If None, uses default Config.MODELS_DIR.
+
+        Returns:
+            BandGapPredictor: Predictor with loaded models.
+        """
+        key = self.make_key(model_type, model_dir)
+
+        with self._lock:
+            predictor = self._predictors.get(key)
+            if predictor is not None:
+                self._predictors.move_to_end(key)
+                self._details[key]['requests'] += 1
+                return predictor
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Load outside the registry lock, so requests for other models are not blocked
+        with load_lock:
+            with self._lock:
+                predictor = self._predictors.get(key)
+                if predictor is not None:
+                    self._details[key]['requests'] += 1
+                    return predictor
+
+            start = time.time()
+            try:
+                predictor = BandGapPredictor(model_type=model_type, model_dir=model_dir, **self.predictor_kwargs)
+                predictor.load_models()
+            except Exception:
+                # Do not keep locks of unknown or broken models around
+                with self._lock:
+                    self._load_locks.pop(key, None)
+                raise
+            load_time = time.time() - start
+
+            with self._lock:
+                self._predictors[key] = predictor
+                self._details[key] = {
+                    'model_type': model_type,
+                    'model_dir': model_dir,
+                    **self._measure_memory(predictor),
+                    'load_time_seconds': round(load_time, 4),
+                    'loaded_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(start)),
+                    'requests': 1,
+                }
+                self._evict()
+        return predictor
+
+    def preload(self, model_types: Iterable[str], model_dir: Optional[str] = None) -> List[str]:
+        """
+        Load several models ahead of the first request.
+
+        Models that fail to load are reported and skipped, so a missing model does not prevent startup.
+
+        Parameters:
+            model_types (iterable of str): Types of models to load.
+            model_dir (str, optional): Directory where models are stored.
+
+        Returns:
+            list: Model types that were loaded.
+        """
+        loaded = []
+        for model_type in model_types:
+            try:
+                self.get(model_type, model_dir)
+                loaded.append(model_type)
+            except Exception as e:
+                print(f"Failed to preload model {model_type}: {e}")
+        return loaded
+
+    def remove(self, model_type: str, model_dir: Optional[str] = None) -> bool:
+        """
+        Unload a model.
+
+        Parameters:
+            model_type (str): Type of model.
+            model_dir (str, optional): Directory where models are stored.
+
+        Returns:
+            bool: True if the model was resident.
+        """
+        key = self.make_key(model_type, model_dir)
+        with self._lock:
+            self._details.pop(key, None)
+            predictor = self._predictors.pop(key, None)
+        if predictor is not None:
+            predictor.close()
+        return predictor is not None
+
+    def resident_models(self) -> List[dict]:
+        """
+        List the resident models from least to most recently used.
+
+        Returns:
+            list: Dictionaries with model type, model directory, memory footprint in bytes of the loaded models,
+                  bytes of them memory-mapped from array artifacts, size of the artifact files,
+                  load time, load timestamp and number of requests served.
+        """
+        with self._lock:
+            return [dict(self._details[key]) for key in self._predictors]
+
+    def predictors(self) -> List[Tuple[Tuple[str, Optional[str]], BandGapPredictor]]:
+        """
+        List the resident predictors from least to most recently used.
+
+        Returns:
+            list: (registry key, BandGapPredictor) pairs.
+        """
+        with self._lock:
+            return list(self._predictors.items())
+
+    def memory_bytes(self) -> int:
+        """
+        Get the total memory footprint of the loaded resident models, excluding memory-mapped arrays.
+
+        Returns:
+            int: Memory footprint in bytes.
+        """
+        with self._lock:
+            return sum(details['memory_bytes'] for details in self._details.values())
+
+    def _evict(self):
+        """Evict the least recently used models above `max_models`. Must be called with the registry lock held."""
+        while self.max_models and len(self._predictors) > self.max_models:
+            key, predictor = self._predictors.popitem(last=False)
+            self._details.pop(key, None)
+            predictor.close()
+            print(f"Evicted model {key[0]} from the model registry")
+
+    @classmethod
+    def _measure_memory(cls, predictor: BandGapPredictor) -> dict:
+        """
+        Measure the memory footprint of the loaded models and scalers of a predictor.
+
+        Parameters:
+            predictor (BandGapPredictor): Predictor with loaded models.
+
+        Returns:
+            dict: 'memory_bytes' of the loaded models held by this process, 'mapped_bytes' of their arrays
+                  memory-mapped from array artifacts and shared through the page cache, and 'artifact_bytes'
+                  of the artifact files.
+        """
+        config = predictor.config
+        seen = set()
+        memory_bytes = mapped_bytes = 0
+        for name in ('classification_model', 'regression_model', 'classification_scaler', 'regression_scaler'):
+            held, mapped = cls._object_nbytes(getattr(config, f'_{name}'), seen)
+            memory_bytes += held
+            mapped_bytes += mapped
+        artifact_bytes = sum(Path(path).stat().st_size for path in config.model_paths.values() if Path(path).exists())
+        if any(Path(path).suffix == Config.ARTIFACT_FORMATS['onnx'] for path in config.model_paths.values()):
+            # onnxruntime sessions keep their graphs in native memory that cannot be inspected
+            memory_bytes += artifact_bytes
+        return {'memory_bytes': memory_bytes, 'mapped_bytes': mapped_bytes, 'artifact_bytes': artifact_bytes}
+
+    @classmethod
+    def _object_nbytes(cls, obj, seen: set) -> Tuple[int, int]:
+        """
+        Sum the sizes of the NumPy arrays, scikit-learn tree node arrays and XGBoost boosters reachable from a model.
+
+        Parameters:
+            obj (object): Loaded model, scaler or part of them.
+            seen (set): Ids of the objects already counted.
+
+        Returns:
+            tuple: (bytes held in process memory, bytes of memory-mapped arrays).
+        """
+        if obj is None or isinstance(obj, (str, bytes, int, float, bool, type)) or id(obj) in seen:
+            return 0, 0
+        seen.add(id(obj))
+        if isinstance(obj, np.memmap):
+            return 0, obj.nbytes
+        if isinstance(obj, np.ndarray):
+            if obj.dtype == object:
+                return cls._sum_nbytes(obj.ravel(), seen)
+            return obj.nbytes, 0
+        if hasattr(obj, 'save_raw') and hasattr(obj, 'num_boosted_rounds'):
+            # XGBoost boosters keep their trees in native memory of the size of their serialized form
+            return len(obj.save_raw()), 0
+        if isinstance(obj, dict):
+            return cls._sum_nbytes(obj.values(), seen)
+        if isinstance(obj, (list, tuple, set)):
+            return cls._sum_nbytes(obj, seen)
+        if type(obj).__name__ == 'Tree' and hasattr(obj, '__getstate__'):
+            # scikit-learn trees are extension types exposing their node arrays through their state
+            return cls._sum_nbytes(obj.__getstate__().values(), seen)
+        if hasattr(obj, '__dict__'):
+            return cls._sum_nbytes(vars(obj).values(), seen)
+        return 0, 0
+
+    @classmethod
+    def _sum_nbytes(cls, objects: Iterable, seen: set) -> Tuple[int, int]:
+        """Sum _object_nbytes over several objects."""
+        held = mapped = 0
+        for obj in objects:
+            obj_held, obj_mapped = cls._object_nbytes(obj, seen)
+            held += obj_held
+            mapped += obj_mapped
+        return held, mapped
+
+    def __len__(self):
+        return len(self._predictors)
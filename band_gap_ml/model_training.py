@@ -2,18 +2,29 @@
 Module model_training.py - Module for training and saving classification and regression models.
 This module loads data, trains models, and saves them to disk.
 """
+import copy
 import json
 import pickle
+import time
 import argparse
 import importlib
 from pathlib import Path
 
-import pandas as pd
 import numpy as np
 from sklearn import preprocessing, metrics
-from sklearn.model_selection import train_test_split, GridSearchCV
+from sklearn.base import clone
+from sklearn.model_selection import train_test_split
 
+from band_gap_ml.compaction import compact_results
 from band_gap_ml.config import Config
+from band_gap_ml.feature_cache import check_data_paths, load_training_data
+from band_gap_ml.hyperparameter_search import search_hyperparameters
+from band_gap_ml.model_arrays import save_artifact
+from band_gap_ml.onnx_export import export_onnx
+
+# Fraction of the data held out for evaluation, and the seeds of the held-out splits of each task
+TEST_SIZE = 0.2
+SPLIT_RANDOM_STATES = {'classification': 15, 'regression': 101}
 
 
 def get_model_class(model_type, task):
@@ -31,49 +42,64 @@ def train_and_save_models(
         model_dir=None,
         classification_params=None,
         regression_params=None,
-        use_grid_search=False
+        use_grid_search=False,
+        artifact_formats=('pickle',),
+        compaction_budget=None,
+        feature_cache_dir=Config.FEATURE_CACHE_DIR,
+        search_strategy=Config.DEFAULT_SEARCH_STRATEGY,
+        search_n_iter=Config.DEFAULT_SEARCH_N_ITER,
+        search_time_budget=None,
+        refit=Config.DEFAULT_REFIT
 ):
     print(f"Starting model training for {model_type}")
 
     # 1. Use provided paths or default Config paths to the DATA files
     classification_data_path = classification_data_path or Config.CLASSIFICATION_DATA_PATH
     regression_data_path = regression_data_path or Config.REGRESSION_DATA_PATH
+    check_data_paths({'classification': classification_data_path, 'regression': regression_data_path})
 
     if model_dir:
         model_dir = Path(model_dir)
+    base_model_dir = model_dir
 
     # Create a unique folder with timestamp for saving models and scalers
-    model_dir = Config.create_model_type_directory(model_type, model_dir)
+    model_dir = Config.create_model_type_directory(model_type, base_model_dir)
 
     models_statistics_file = model_dir / 'models_statistics.json'
 
+    search_options = {
+        "search_strategy": search_strategy,
+        "search_n_iter": search_n_iter,
+        "search_time_budget": search_time_budget
+    }
+
     classification_params = classification_params or Config.DEFAULT_GRID_PARAMS.get(model_type, {}).get('classification')
     # Classification step
     classification_results = train_classification_model(
-        classification_data_path, model_type, use_grid_search, classification_params
+        classification_data_path, model_type, use_grid_search, classification_params, feature_cache_dir,
+        search_options, refit
     )
 
     regression_params = regression_params or Config.DEFAULT_GRID_PARAMS.get(model_type, {}).get('regression')
     # Regression step
     regression_results = train_regression_model(
-        regression_data_path, model_type, use_grid_search, regression_params
+        regression_data_path, model_type, use_grid_search, regression_params, feature_cache_dir, search_options, refit
     )
 
-    models_statistics = {
-        "model_type": model_type,
-        "use_grid_search": use_grid_search,
-        "classification": {
-            "best_params": classification_results["best_params"],
-            "metrics": classification_results["metrics"]
-        },
-        "regression": {
-            "best_params": regression_results["best_params"],
-            "metrics": regression_results["metrics"]
-        }
-    }
+    models_statistics = build_models_statistics(model_type, use_grid_search, classification_results, regression_results)
 
     # Save models and scalers
-    save_models_and_scalers(model_dir, classification_results, regression_results)
+    save_models_and_scalers(model_dir, classification_results, regression_results, artifact_formats)
+
+    # Prune the ensembles under the accuracy budget and save them next to the original models
+    if compaction_budget is not None:
+        print(f"\nCompacting models with an accuracy budget of {compaction_budget}")
+        compact_classification = compact_results(classification_results, 'classification', compaction_budget)
+        compact_regression = compact_results(regression_results, 'regression', compaction_budget)
+        compact_model_dir = Config.create_model_type_directory(model_type + Config.COMPACT_MODEL_SUFFIX, base_model_dir)
+        save_models_and_scalers(compact_model_dir, compact_classification, compact_regression, artifact_formats)
+        models_statistics["classification"]["compaction"] = compact_classification["statistics"]
+        models_statistics["regression"]["compaction"] = compact_regression["statistics"]
 
     # Save model statistics to json file
     with open(models_statistics_file, 'w') as file:
@@ -83,99 +109,211 @@ def train_and_save_models(
     return models_statistics
 
 
-def train_classification_model(data_path, model_type, use_grid_search, params):
-    print("1. Start training of classifier ...")
-    classification_data = pd.read_csv(data_path)
-    X_classification = classification_data.iloc[:, 3:139].values
-    Y_classification = classification_data.iloc[:, 2].astype('int').values
-
-    X_train, X_test, Y_train, Y_test = train_test_split(
-        X_classification, Y_classification, test_size=0.2, random_state=15, shuffle=True
-    )
-
-    scaler = preprocessing.StandardScaler().fit(X_train)
-    X_train_scaled = scaler.transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
-
-    ClassifierModel = get_model_class(model_type, 'classification')
-
-    if use_grid_search:
-        best_classifier, best_params = perform_grid_search(ClassifierModel, X_train_scaled, Y_train, params, 'classification')
-
-    else:
-        best_classifier = ClassifierModel()
-        best_classifier.fit(X_train_scaled, Y_train)
-        best_params = "Default parameters"
-
-    Y_pred = best_classifier.predict(X_test_scaled)
-
-    metrics_dict = calculate_classification_metrics(Y_test, Y_pred)
-    print_classification_metrics(model_type, best_params, metrics_dict)
+def build_models_statistics(model_type, use_grid_search, classification_results, regression_results):
+    """
+    Build the statistics of the models of a model type saved to models_statistics.json.
+
+    Parameters:
+        model_type (str): Type of model.
+        use_grid_search (bool): Whether the hyperparameters were searched.
+        classification_results (dict): Results of the classification task.
+        regression_results (dict): Results of the regression task.
+
+    Returns:
+        dict: Best parameters, held-out metrics and search statistics of each task.
+    """
+    models_statistics = {"model_type": model_type, "use_grid_search": use_grid_search}
+    for task, results in (("classification", classification_results), ("regression", regression_results)):
+        models_statistics[task] = {
+            "best_params": results["best_params"],
+            "metrics": results["metrics"],
+            "search": results["search"],
+            "refit": results["refit"]
+        }
+    return models_statistics
 
-    # Train final model on entire dataset
-    X_scaled = scaler.fit_transform(X_classification)
-    final_model = ClassifierModel(**best_params) if use_grid_search else ClassifierModel()
-    final_model.fit(X_scaled, Y_classification)
 
-    return {
-        "best_params": best_params,
-        "metrics": metrics_dict,
-        "final_model": final_model,
-        "scaler": scaler
-    }
+def train_classification_model(data_path, model_type, use_grid_search, params,
+                               feature_cache_dir=Config.FEATURE_CACHE_DIR, search_options=None,
+                               refit=Config.DEFAULT_REFIT):
+    print("1. Start training of classifier ...")
+    X_classification, Y_classification = load_training_data(data_path, 'classification',
+                                                             cache_dir=feature_cache_dir)
+    data = prepare_task_data(X_classification, Y_classification, 'classification', refit)
+    return fit_task_model(data, 'classification', model_type, use_grid_search, params, search_options)
 
 
-def train_regression_model(data_path, model_type, use_grid_search, params):
+def train_regression_model(data_path, model_type, use_grid_search, params,
+                           feature_cache_dir=Config.FEATURE_CACHE_DIR, search_options=None,
+                           refit=Config.DEFAULT_REFIT):
     print("\n4. Start training regressor...")
-    regression_data = pd.read_csv(data_path)
-    X_regression = regression_data.iloc[:, 2:138].values
-    Y_regression = regression_data.iloc[:, 1].values
-
+    X_regression, Y_regression = load_training_data(data_path, 'regression', cache_dir=feature_cache_dir)
+    data = prepare_task_data(X_regression, Y_regression, 'regression', refit)
+    return fit_task_model(data, 'regression', model_type, use_grid_search, params, search_options)
+
+
+def prepare_task_data(X, Y, task, refit=Config.DEFAULT_REFIT):
+    """
+    Split and scale the data of a task.
+
+    Parameters:
+        X (np.ndarray): Feature matrix.
+        Y (np.ndarray): Labels.
+        task (str): 'classification' or 'regression'.
+        refit (str): How the final model is obtained, one of Config.REFIT_MODES. The held-out split is always
+                     scaled with a scaler fit on the training split only. Models of the 'full' mode are trained
+                     from scratch on the full data, so their final scaler is fit on the full data. The other modes
+                     reuse the model trained on the training split, so their final scaler is the training split
+                     scaler the model was trained with.
+
+    Returns:
+        dict: 'X_train', 'X_test', 'Y_train' and 'Y_test' of the held-out split, 'X_test_final' with the held-out
+              features scaled with the final scaler, 'X', 'Y' and 'scaler' of the full data, scaled with the final
+              scaler, and the 'refit' mode.
+    """
+    if refit not in Config.REFIT_MODES:
+        raise ValueError(f"Unknown refit mode: {refit}. Available modes: {', '.join(Config.REFIT_MODES)}")
     X_train, X_test, Y_train, Y_test = train_test_split(
-        X_regression, Y_regression, test_size=0.2, random_state=101, shuffle=True
+        X, Y, test_size=TEST_SIZE, random_state=SPLIT_RANDOM_STATES[task], shuffle=True
     )
 
-    scaler = preprocessing.StandardScaler().fit(X_train)
-    X_train_scaled = scaler.transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
+    split_scaler = preprocessing.StandardScaler().fit(X_train)
+    scaler = preprocessing.StandardScaler().fit(X) if refit == 'full' else split_scaler
+    X_test_scaled = split_scaler.transform(X_test)
+    return {
+        "X_train": split_scaler.transform(X_train),
+        "X_test": X_test_scaled,
+        "X_test_final": scaler.transform(X_test) if refit == 'full' else X_test_scaled,
+        "Y_train": Y_train,
+        "Y_test": Y_test,
+        "X": scaler.transform(X),
+        "Y": Y,
+        "scaler": scaler,
+        "refit": refit
+    }
 
-    RegressorModel = get_model_class(model_type, 'regression')
+
+def fit_task_model(data, task, model_type, use_grid_search, params, search_options=None, n_jobs=None):
+    """
+    Train, evaluate on the held-out split, and retrain on the full data a model of a task.
+
+    Parameters:
+        data (dict): Data of the task as returned by prepare_task_data.
+        task (str): 'classification' or 'regression'.
+        model_type (str): Type of model (e.g., 'RandomForest', 'GradientBoosting', 'XGBoost').
+        use_grid_search (bool): Search the hyperparameters instead of using the default ones.
+        params (dict): Parameter grid of the search.
+        search_options (dict, optional): Keyword arguments of perform_grid_search.
+        n_jobs (int, optional): Number of CPU cores to use. The search runs candidates in parallel with
+                                single-threaded estimators, and the other models use all cores themselves.
+                                None keeps the defaults of the estimators and uses all cores for the search.
+
+    Returns:
+        dict: Best parameters, held-out metrics, search statistics, final model and scaler, the model
+              evaluated on the held-out split with its data, and the held-out features scaled with the final scaler.
+    """
+    Model = get_model_class(model_type, task)
+    # Parallelism of the estimators, restored to the defaults before the models are returned
+    model_n_jobs = {} if n_jobs is None or 'n_jobs' not in Model().get_params() else {'n_jobs': n_jobs}
 
     if use_grid_search:
-        best_regressor, best_params = perform_grid_search(RegressorModel, X_train_scaled, Y_train, params, 'regression')
+        best_model, best_params, search_statistics = perform_grid_search(
+            Model, data["X_train"], data["Y_train"], params, task, **(search_options or {}),
+            n_jobs=-1 if n_jobs is None else n_jobs, estimator_params={k: 1 for k in model_n_jobs}
+        )
     else:
-        best_regressor = RegressorModel()
-        best_regressor.fit(X_train_scaled, Y_train)
+        best_model = Model(**model_n_jobs)
+        best_model.fit(data["X_train"], data["Y_train"])
         best_params = "Default parameters"
+        search_statistics = None
 
-    Y_pred = best_regressor.predict(X_test_scaled)
+    Y_pred = best_model.predict(data["X_test"])
 
-    metrics_dict = calculate_regression_metrics(Y_test, Y_pred)
-    print_regression_metrics(model_type, best_params, metrics_dict)
+    if task == 'classification':
+        metrics_dict = calculate_classification_metrics(data["Y_test"], Y_pred)
+        print_classification_metrics(model_type, best_params, metrics_dict)
+    else:
+        metrics_dict = calculate_regression_metrics(data["Y_test"], Y_pred)
+        print_regression_metrics(model_type, best_params, metrics_dict)
+
+    refit_start = time.perf_counter()
+    if data["refit"] == 'full':
+        # Train final model on entire dataset
+        final_model = Model(**best_params, **model_n_jobs) if use_grid_search else Model(**model_n_jobs)
+        final_model.fit(data["X"], data["Y"])
+    elif data["refit"] == 'warm_start':
+        final_model = warm_start_model(best_model, data["X"], data["Y"])
+    else:
+        final_model = best_model
+    refit_statistics = {
+        "mode": data["refit"],
+        "final_scaler": "full data" if data["refit"] == 'full' else "training split",
+        "time_seconds": time.perf_counter() - refit_start,
+        "n_estimators": get_n_estimators(final_model)
+    }
 
-    # Train final model on entire dataset
-    X_scaled = scaler.fit_transform(X_regression)
-    final_model = RegressorModel(**best_params) if use_grid_search else RegressorModel()
-    final_model.fit(X_scaled, Y_regression)
+    if model_n_jobs:
+        default_n_jobs = {'n_jobs': Model().get_params()['n_jobs']}
+        best_model.set_params(**default_n_jobs)
+        final_model.set_params(**default_n_jobs)
 
     return {
         "best_params": best_params,
         "metrics": metrics_dict,
+        "search": search_statistics,
+        "refit": refit_statistics,
         "final_model": final_model,
-        "scaler": scaler
+        "scaler": data["scaler"],
+        "test_model": best_model,
+        "X_test": data["X_test"],
+        "X_test_final": data["X_test_final"],
+        "Y_test": data["Y_test"]
     }
 
-def perform_grid_search(Model, X, y, params, task):
-    print(f"Starting grid search for {task}...")
-    cv = 5
+
+def get_n_estimators(model):
+    """Number of trees of a fitted forest, or of boosting stages of a fitted boosted ensemble."""
+    if hasattr(model, 'get_booster'):
+        return model.get_booster().num_boosted_rounds()
+    # Gradient boosting with early stopping fits fewer stages than its n_estimators parameter
+    return getattr(model, 'n_estimators_', model.get_params().get('n_estimators'))
+
+
+def warm_start_model(model, X, Y):
+    """
+    Continue training a fitted ensemble on the full data instead of retraining it from scratch.
+
+    The ensemble gets Config.WARM_START_EXTRA_FRACTION more trees, fit on the full data: forests add
+    trees and boosted ensembles add stages fitting the residuals of the existing ones.
+
+    Parameters:
+        model (object): Ensemble fitted on the training split, with features scaled by the training split scaler.
+        X (np.ndarray): Full feature matrix scaled with the training split scaler.
+        Y (np.ndarray): Full labels.
+
+    Returns:
+        object: The continued ensemble. The given model is not changed.
+    """
+    n_estimators = get_n_estimators(model)
+    n_extra = max(1, round(n_estimators * Config.WARM_START_EXTRA_FRACTION))
+    print(f"Warm-starting the final model with {n_extra} more trees on the full data")
+    if hasattr(model, 'get_booster'):
+        final_model = clone(model).set_params(n_estimators=n_extra)
+        final_model.fit(X, Y, xgb_model=model.get_booster())
+        return final_model.set_params(n_estimators=n_estimators + n_extra)
+    if 'warm_start' not in model.get_params():
+        raise ValueError(f"{type(model).__name__} does not support warm starts.")
+    final_model = copy.deepcopy(model).set_params(warm_start=True, n_estimators=n_estimators + n_extra)
+    final_model.fit(X, Y)
+    return final_model.set_params(warm_start=False)
+
+
+def perform_grid_search(Model, X, y, params, task, search_strategy=Config.DEFAULT_SEARCH_STRATEGY,
+                        search_n_iter=Config.DEFAULT_SEARCH_N_ITER, search_time_budget=None, n_jobs=-1,
+                        estimator_params=None):
     params = params or Config.get_default_grid_params(Model.__name__, task)
-    grid_search = GridSearchCV(
-        Model(), params, cv=cv, n_jobs=-1, verbose=2
-    )
-    grid_search.fit(X, y)
-    print(f"Best score: {grid_search.best_score_}")
-    print(f"Best parameters: {grid_search.best_params_}")
-    return grid_search.best_estimator_, grid_search.best_params_
+    return search_hyperparameters(Model, X, y, params, task, search_strategy, search_n_iter, search_time_budget,
+                                  n_jobs=n_jobs, estimator_params=estimator_params)
 
 
 def calculate_classification_metrics(y_true, y_pred):
@@ -210,26 +348,81 @@ def print_regression_metrics(model_type, best_params, metrics_dict):
         print(f"{metric.upper()}: {value}")
 
 
-def save_models_and_scalers(model_dir, classification_results, regression_results):
+def save_models_and_scalers(model_dir, classification_results, regression_results, artifact_formats=('pickle',)):
+    """
+    Save the trained models and scalers.
+
+    Artifacts of the other formats left in the directory by earlier runs are removed, so that stale
+    array artifacts or ONNX graphs are never loaded instead of the new models.
+
+    Parameters:
+        model_dir (Path): Directory of the model type.
+        classification_results (dict): Results of train_classification_model.
+        regression_results (dict): Results of train_regression_model.
+        artifact_formats (iterable of str): Formats to save: 'pickle' for pickled estimators,
+                                            'arrays' for flattened memory-mappable arrays,
+                                            'onnx' for one ONNX graph of each model with its scaler.
+    """
+    for artifact_format in artifact_formats:
+        if artifact_format not in Config.ARTIFACT_FORMATS:
+            raise ValueError(f"Unknown artifact format: {artifact_format}. "
+                             f"Available formats: {', '.join(Config.ARTIFACT_FORMATS)}")
+
     for task in ['classification', 'regression']:
         results = classification_results if task == 'classification' else regression_results
-        for item in ['model', 'scaler']:
-            path = model_dir / f'{task}_{item}.pkl'
-            obj = results['final_model'] if item == 'model' else results['scaler']
-            print(f"Saving {task} {item} to {path}")
-            with open(path, 'wb') as file:
-                pickle.dump(obj, file)
+        for artifact_format, suffix in Config.ARTIFACT_FORMATS.items():
+            if artifact_format not in artifact_formats:
+                for item in ['model', 'scaler']:
+                    (model_dir / f'{task}_{item}{suffix}').unlink(missing_ok=True)
+        for artifact_format in artifact_formats:
+            suffix = Config.ARTIFACT_FORMATS[artifact_format]
+            if artifact_format == 'onnx':
+                path = model_dir / f'{task}_model{suffix}'
+                print(f"Exporting {task} model and scaler to {path}")
+                export_onnx(results['final_model'], results['scaler'], path)
+                continue
+            for item in ['model', 'scaler']:
+                obj = results['final_model'] if item == 'model' else results['scaler']
+                path = model_dir / f'{task}_{item}{suffix}'
+                print(f"Saving {task} {item} to {path}")
+                if artifact_format == 'arrays':
+                    save_artifact(obj, path)
+                else:
+                    with open(path, 'wb') as file:
+                        pickle.dump(obj, file)
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Train and save models for classification and regression.")
-    parser.add_argument("--classification_data", type=str, help="Path to the classification dataset")
-    parser.add_argument("--regression_data", type=str, help="Path to the regression dataset")
+    parser.add_argument("--classification_data", type=str, help="Path to the classification dataset: chemical formulas with labels, "
+                                                                       "or precomputed feature columns")
+    parser.add_argument("--regression_data", type=str, help="Path to the regression dataset: chemical formulas with band gaps, "
+                                                                   "or precomputed feature columns")
     parser.add_argument("--model_type", type=str, default="RandomForest", help="Type of model to use")
     parser.add_argument("--model_dir", type=str, default="models", help="Directory to save models and scalers")
     parser.add_argument("--classification_params", type=str, help="JSON string of classification model parameters for grid search")
     parser.add_argument("--regression_params", type=str, help="JSON string of regression model parameters for grid search")
     parser.add_argument("--use_grid_search", type=bool, default=True, help="Whether to use grid search or not")
+    parser.add_argument("--search_strategy", type=str, default=Config.DEFAULT_SEARCH_STRATEGY,
+                        choices=Config.SEARCH_STRATEGIES,
+                        help="Hyperparameter search strategy: grid, halving (successive halving), random "
+                             "(randomized search within a budget) or early_stopping (GradientBoosting and XGBoost)")
+    parser.add_argument("--search_n_iter", type=int, default=Config.DEFAULT_SEARCH_N_ITER,
+                        help="Maximum number of candidates of the random and early_stopping strategies")
+    parser.add_argument("--search_time_budget", type=float, default=None,
+                        help="Seconds after which the random and early_stopping strategies start no new candidate")
+    parser.add_argument("--refit", type=str, default=Config.DEFAULT_REFIT, choices=Config.REFIT_MODES,
+                        help="Final models: full (retrain on the full data), warm_start (continue the evaluated "
+                             "models on the full data) or none (save the evaluated models)")
+    parser.add_argument("--artifact_formats", type=str, default="pickle",
+                        help="Comma-separated formats of the saved models: pickle, arrays (memory-mappable) and/or onnx")
+    parser.add_argument("--feature_cache_dir", type=str, default=str(Config.FEATURE_CACHE_DIR),
+                        help="Directory of the cached feature matrices of the datasets")
+    parser.add_argument("--no_feature_cache", action="store_true",
+                        help="Compute the features of the datasets without reading or writing the feature cache")
+    parser.add_argument("--compaction_budget", type=float, default=None,
+                        help="Allowed held-out accuracy (classification) and R2 (regression) loss of compact models "
+                             "with fewer trees, saved to <model_type>_compact. No compaction if omitted")
 
     args = parser.parse_args()
 
@@ -246,5 +439,12 @@ if __name__ == "__main__":
         model_dir=args.model_dir,
         classification_params=classification_params,
         regression_params=regression_params,
-        use_grid_search=args.use_grid_search
+        use_grid_search=args.use_grid_search,
+        artifact_formats=[artifact_format.strip() for artifact_format in args.artifact_formats.split(',')],
+        compaction_budget=args.compaction_budget,
+        feature_cache_dir=None if args.no_feature_cache else args.feature_cache_dir,
+        search_strategy=args.search_strategy,
+        search_n_iter=args.search_n_iter,
+        search_time_budget=args.search_time_budget,
+        refit=args.refit
     )
\ No newline at end of file
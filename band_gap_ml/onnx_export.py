@@ -0,0 +1,216 @@
+"""ONNX export module.
+
+Export of a tree ensemble together with its scaler as one ONNX graph, and inference of such graphs with
+onnxruntime on CPU. Requires the optional `onnx` package for export and `onnxruntime` for inference.
+"""
+import argparse
+import json
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+
+from band_gap_ml.model_arrays import TreeEnsemble, flatten_model, flatten_scaler
+
+# Operator set versions of the exported graphs, and the oldest IR version supporting them,
+# so graphs load with older onnxruntime releases than the onnx package
+ONNX_OPSET = 17
+ONNX_ML_OPSET = 3
+ONNX_IR_VERSION = 8
+
+
+def _tree_ensemble_attributes(ensemble: TreeEnsemble) -> dict:
+    """
+    Attributes of an ONNX TreeEnsembleRegressor equivalent to a flattened ensemble on scaled features.
+
+    Parameters:
+        ensemble (TreeEnsemble): Flattened ensemble with float32 thresholds.
+
+    Returns:
+        dict: Node attributes with tree-local node ids.
+    """
+    node_index = np.arange(len(ensemble.left))
+    tree_ids = np.repeat(np.arange(ensemble.n_trees), np.diff(np.append(ensemble.roots, len(node_index))))
+    tree_roots = ensemble.roots[tree_ids]
+    is_leaf = ensemble.left == node_index
+    leaves = np.flatnonzero(is_leaf)
+    n_targets = ensemble.value.shape[1]
+
+    return {
+        'nodes_treeids': tree_ids.tolist(),
+        'nodes_nodeids': (node_index - tree_roots).tolist(),
+        'nodes_featureids': ensemble.feature.tolist(),
+        'nodes_values': np.where(is_leaf, 0, ensemble.threshold).astype(np.float32).tolist(),
+        'nodes_modes': np.where(is_leaf, 'LEAF', 'BRANCH_LEQ').tolist(),
+        'nodes_truenodeids': np.where(is_leaf, 0, ensemble.left - tree_roots).tolist(),
+        'nodes_falsenodeids': np.where(is_leaf, 0, ensemble.right - tree_roots).tolist(),
+        'nodes_missing_value_tracks_true': ensemble.missing_left.astype(int).tolist(),
+        'target_treeids': np.repeat(tree_ids[leaves], n_targets).tolist(),
+        'target_nodeids': np.repeat(leaves - tree_roots[leaves], n_targets).tolist(),
+        'target_ids': np.tile(np.arange(n_targets), len(leaves)).tolist(),
+        'target_weights': np.asarray(ensemble.value[leaves], dtype=np.float32).ravel().tolist(),
+        'n_targets': n_targets,
+        'aggregate_function': 'AVERAGE' if ensemble.average else 'SUM',
+        'base_values': np.asarray(ensemble.base_score, dtype=np.float32).tolist(),
+        'post_transform': 'NONE',
+    }
+
+
+def build_onnx_model(model, scaler):
+    """
+    Build one ONNX graph of a tree ensemble with its scaler.
+
+    The graph standardizes the float64 input features, rounds them to float32 like scikit-learn and
+    XGBoost do, and evaluates the trees. Classifiers output class probabilities, regressors predictions.
+
+    Parameters:
+        model (object): Fitted tree ensemble or TreeEnsemble.
+        scaler (object): Fitted StandardScaler or ArrayScaler of the model.
+
+    Returns:
+        onnx.ModelProto: The ONNX model.
+    """
+    from onnx import TensorProto, helper, numpy_helper
+
+    ensemble = flatten_model(model)
+    scaler = flatten_scaler(scaler)
+    if ensemble.threshold.dtype != np.float32:
+        raise ValueError("Only ensembles with float32 thresholds on scaled features can be exported.")
+    n_features = len(scaler.mean_)
+    is_classifier = ensemble.classes_ is not None
+    output_name = 'probabilities' if is_classifier else 'prediction'
+
+    nodes = [
+        helper.make_node('Sub', ['features', 'mean'], ['centered']),
+        helper.make_node('Div', ['centered', 'scale'], ['scaled']),
+        helper.make_node('Cast', ['scaled'], ['scaled_float32'], to=TensorProto.FLOAT),
+        helper.make_node('TreeEnsembleRegressor', ['scaled_float32'], ['raw' if ensemble.link == 'logistic' else output_name],
+                         domain='ai.onnx.ml', **_tree_ensemble_attributes(ensemble)),
+    ]
+    initializers = [
+        numpy_helper.from_array(np.asarray(scaler.mean_, dtype=np.float64), 'mean'),
+        numpy_helper.from_array(np.asarray(scaler.scale_, dtype=np.float64), 'scale'),
+    ]
+    if ensemble.link == 'logistic':
+        # Probabilities of both classes from the raw score of the positive class
+        nodes += [
+            helper.make_node('Sigmoid', ['raw'], ['positive']),
+            helper.make_node('Sub', ['one', 'positive'], ['negative']),
+            helper.make_node('Concat', ['negative', 'positive'], [output_name], axis=1),
+        ]
+        initializers.append(numpy_helper.from_array(np.ones(1, dtype=np.float32), 'one'))
+
+    n_outputs = len(ensemble.classes_) if is_classifier else 1
+    graph = helper.make_graph(
+        nodes, 'band_gap_ml',
+        [helper.make_tensor_value_info('features', TensorProto.DOUBLE, [None, n_features])],
+        [helper.make_tensor_value_info(output_name, TensorProto.FLOAT, [None, n_outputs])],
+        initializers,
+    )
+    onnx_model = helper.make_model(graph, opset_imports=[helper.make_opsetid('', ONNX_OPSET),
+                                                         helper.make_opsetid('ai.onnx.ml', ONNX_ML_OPSET)],
+                                   ir_version=ONNX_IR_VERSION)
+    if is_classifier:
+        helper.set_model_props(onnx_model, {'classes': json.dumps(np.asarray(ensemble.classes_).tolist())})
+    return onnx_model
+
+
+def export_onnx(model, scaler, path: Union[str, Path]):
+    """
+    Save a tree ensemble with its scaler as one ONNX graph.
+
+    Parameters:
+        model (object): Fitted tree ensemble or TreeEnsemble.
+        scaler (object): Fitted StandardScaler or ArrayScaler of the model.
+        path (str or Path): Path of the ONNX file.
+    """
+    import onnx
+
+    onnx_model = build_onnx_model(model, scaler)
+    onnx.checker.check_model(onnx_model)
+    onnx.save(onnx_model, str(path))
+
+
+class OnnxModel:
+    """
+    ONNX graph of a model with its scaler, run with onnxruntime on CPU.
+
+    Takes raw features, and has the `predict`, `predict_proba` and `classes_` interface of the original model.
+    """
+
+    def __init__(self, path: Union[str, Path], intra_op_threads: Optional[int] = None):
+        """
+        Initialize the OnnxModel.
+
+        Parameters:
+            path (str or Path): Path of the ONNX file.
+            intra_op_threads (int, optional): Number of threads evaluating the trees. None or 0 uses all CPU cores.
+        """
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = onnxruntime.InferenceSession(str(path), options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+        classes = self.session.get_modelmeta().custom_metadata_map.get('classes')
+        self.classes_ = None if classes is None else np.array(json.loads(classes))
+
+    def _run(self, X: np.ndarray) -> np.ndarray:
+        """Run the graph on a feature matrix."""
+        return self.session.run(None, {self.input_name: np.ascontiguousarray(X, dtype=np.float64)})[0]
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """
+        Predict class probabilities.
+
+        Parameters:
+            X (np.ndarray): Raw feature matrix with shape (n_rows, n_features).
+
+        Returns:
+            np.ndarray: Class probabilities with shape (n_rows, n_classes).
+        """
+        if self.classes_ is None:
+            raise ValueError("Class probabilities are only available for classifiers.")
+        return self._run(X)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """
+        Predict class labels of a classifier or target values of a regressor.
+
+        Parameters:
+            X (np.ndarray): Raw feature matrix with shape (n_rows, n_features).
+
+        Returns:
+            np.ndarray: Predicted class labels or target values.
+        """
+        if self.classes_ is None:
+            return self._run(X)[:, 0]
+        return self.classes_.take(np.argmax(self._run(X), axis=1))
+
+
+def export_models(model_type: str = 'best_model', model_dir: Optional[str] = None):
+    """
+    Save ONNX graphs of the classification and regression models of a model type next to them.
+
+    Parameters:
+        model_type (str): Type of model to export (e.g., 'RandomForest', 'GradientBoosting', 'XGBoost').
+        model_dir (str, optional): Directory where models are stored. If None, uses default Config.MODELS_DIR.
+    """
+    from band_gap_ml.config import Config
+
+    config = Config(model_type, model_dir)
+    onnx_paths = Config.get_model_paths(model_type, model_dir, artifact_format='onnx')
+    for task in ('classification', 'regression'):
+        path = onnx_paths[f'{task}_model']
+        print(f"Exporting {task} model and scaler to {path}")
+        export_onnx(getattr(config, f'{task}_model'), getattr(config, f'{task}_scaler'), path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export models with their scalers as ONNX graphs.")
+    parser.add_argument("--model_type", type=str, default="best_model", help="Type of model to export")
+    parser.add_argument("--model_dir", type=str, default=None, help="Directory where models and scalers are stored")
+    args = parser.parse_args()
+
+    export_models(args.model_type, args.model_dir)
@@ -0,0 +1,128 @@
+"""Prediction cache module.
+
+Bounded in-memory LRU cache of feature vectors and prediction rows keyed by canonical composition.
+"""
+import threading
+from collections import OrderedDict
+from typing import Hashable, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+
+class CacheEntry(NamedTuple):
+    """Cached feature vector and prediction row of one composition."""
+    features: np.ndarray
+    prediction: tuple
+
+
+class PredictionCache:
+    """
+    A thread-safe LRU cache of feature vectors and prediction rows.
+
+    Entries are keyed by the model identity and the canonical (reduced fractional) composition,
+    so equivalent formulas such as 'TiO2', 'Ti2O4' and 'O2Ti' share one entry. A single cache
+    instance can be shared between several predictors.
+    """
+
+    # Number of decimals used to round atomic fractions in composition keys
+    FRACTION_DECIMALS = 10
+
+    def __init__(self, maxsize: int = 10000):
+        """
+        Initialize the PredictionCache.
+
+        Parameters:
+            maxsize (int): Maximum number of entries. The least recently used entries are evicted
+                           when the cache is full.
+        """
+        if maxsize < 1:
+            raise ValueError("Cache size must be a positive integer.")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def composition_key(cls, fractional_composition: dict) -> Tuple[Tuple[str, float], ...]:
+        """
+        Build a canonical key from a fractional composition.
+
+        Parameters:
+            fractional_composition (dict): Mapping of element symbol to its atomic fraction.
+
+        Returns:
+            tuple: Sorted (element, rounded fraction) pairs.
+        """
+        return tuple(sorted(
+            (element, round(fraction, cls.FRACTION_DECIMALS)) for element, fraction in fractional_composition.items()
+        ))
+
+    def get(self, model_key: Hashable, composition_key: Hashable) -> Optional[CacheEntry]:
+        """
+        Look up a cache entry and mark it as recently used.
+
+        Parameters:
+            model_key (hashable): Identity of the model the prediction was made with.
+            composition_key (hashable): Canonical composition key.
+
+        Returns:
+            CacheEntry or None: The cached entry, or None on a miss.
+        """
+        key = (model_key, composition_key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, model_key: Hashable, composition_key: Hashable, features: np.ndarray, prediction: tuple):
+        """
+        Store a feature vector and prediction row, evicting the least recently used entries if needed.
+
+        Parameters:
+            model_key (hashable): Identity of the model the prediction was made with.
+            composition_key (hashable): Canonical composition key.
+            features (np.ndarray): Feature vector of the composition.
+            prediction (tuple): Prediction row of the composition.
+        """
+        key = (model_key, composition_key)
+        with self._lock:
+            self._entries[key] = CacheEntry(features, prediction)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Remove all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> dict:
+        """
+        Get cache statistics.
+
+        Returns:
+            dict: Current size, maximum size, hits, misses, evictions and hit rate.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,130 @@
+"""Request coalescer module.
+
+Collects formulas of concurrent API requests for the same model into micro-batches, so that
+one batched inference serves many small requests.
+"""
+import asyncio
+from typing import Awaitable, Callable, Hashable, List, Sequence
+
+import pandas as pd
+
+
+class _PendingBatch:
+    """Requests waiting to be predicted together."""
+
+    def __init__(self, timer: asyncio.TimerHandle):
+        self.timer = timer
+        self.items = []
+        self.n_rows = 0
+
+
+class RequestCoalescer:
+    """
+    Dynamic micro-batching of concurrent prediction requests.
+
+    Requests with the same key (e.g. model type and output options) are collected for at most
+    `max_wait` seconds or until `max_rows` formulas are pending. Then a single batch prediction
+    is run and its results are handed back to each caller in submission order.
+    """
+
+    def __init__(self, run_batch: Callable[[Hashable, List[str]], Awaitable[Sequence]],
+                 max_wait: float = 0.005, max_rows: int = 256):
+        """
+        Initialize the RequestCoalescer.
+
+        Parameters:
+            run_batch (callable): Coroutine function taking a batch key and a list of formulas and
+                                  returning a DataFrame with one prediction row per formula in order,
+                                  or a list with one result per formula, e.g. serialized records.
+            max_wait (float): Maximum time in seconds a request waits for other requests to join its batch.
+            max_rows (int): Number of pending formulas that triggers a batch immediately.
+        """
+        self.run_batch = run_batch
+        self.max_wait = max_wait
+        self.max_rows = max_rows
+        self.batches = 0
+        self.requests = 0
+        self.rows = 0
+        self._pending = {}
+        self._tasks = set()
+
+    async def submit(self, key: Hashable, formulas: List[str]) -> Sequence:
+        """
+        Predict formulas as part of a micro-batch.
+
+        Parameters:
+            key (hashable): Batch key. Only requests with equal keys are predicted together.
+            formulas (list of str): Chemical formulas of this request.
+
+        Returns:
+            pd.DataFrame or list: Prediction rows or results of this request's formulas.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = self._pending[key] = _PendingBatch(loop.call_later(self.max_wait, self._flush, key))
+        batch.items.append((formulas, future))
+        batch.n_rows += len(formulas)
+
+        if batch.n_rows >= self.max_rows:
+            self._flush(key)
+
+        return await future
+
+    def _flush(self, key: Hashable):
+        """Start the batch prediction of the pending requests with the given key."""
+        batch = self._pending.pop(key, None)
+        if batch is None:
+            return
+        batch.timer.cancel()
+        # Keep a reference to the task, as the event loop holds only weak references
+        task = asyncio.ensure_future(self._run(key, batch.items))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, key: Hashable, items: list):
+        """Run one batch prediction and fan the results out to the waiting requests."""
+        formulas = [formula for request_formulas, _ in items for formula in request_formulas]
+        self.batches += 1
+        self.requests += len(items)
+        self.rows += len(formulas)
+
+        try:
+            results = await self.run_batch(key, formulas)
+        except Exception as e:
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        offset = 0
+        for request_formulas, future in items:
+            if not future.done():
+                future.set_result(self._slice(results, offset, offset + len(request_formulas)))
+            offset += len(request_formulas)
+
+    @staticmethod
+    def _slice(results: Sequence, start: int, stop: int) -> Sequence:
+        """Get the results of the formulas from `start` to `stop` of a batch."""
+        if isinstance(results, pd.DataFrame):
+            return results.iloc[start:stop].reset_index(drop=True)
+        return results[start:stop]
+
+    def stats(self) -> dict:
+        """
+        Get batching statistics.
+
+        Returns:
+            dict: Batching settings, number of batches, requests and rows, and average batch sizes.
+        """
+        return {
+            'max_wait_ms': self.max_wait * 1000,
+            'max_rows': self.max_rows,
+            'batches': self.batches,
+            'requests': self.requests,
+            'rows': self.rows,
+            'average_requests_per_batch': self.requests / self.batches if self.batches else 0.0,
+            'average_rows_per_batch': self.rows / self.batches if self.batches else 0.0,
+        }
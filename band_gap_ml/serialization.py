@@ -0,0 +1,127 @@
+"""Serialization module.
+
+Compact encoding of prediction results for the web service: columnar JSON with orjson when it is
+installed, and gzip or zstd compression negotiated from the Accept-Encoding header.
+"""
+import gzip
+import json
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+# Responses smaller than this are sent uncompressed, as compression would not pay off
+MIN_COMPRESS_BYTES = 1024
+GZIP_LEVEL = 5
+ZSTD_LEVEL = 3
+
+
+def dumps(obj) -> bytes:
+    """
+    Encode an object to compact JSON.
+
+    Uses orjson, which also serializes NumPy arrays directly, and falls back to the standard json module.
+    Both encode NaN and infinite floats as null.
+
+    Parameters:
+        obj: Object to encode. May contain NumPy arrays.
+
+    Returns:
+        bytes: UTF-8 encoded JSON.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(_replace_non_finite(obj), ensure_ascii=False, allow_nan=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def _replace_non_finite(obj):
+    """Convert NumPy values to Python values and NaN or infinite floats to None, as orjson encodes them."""
+    if isinstance(obj, dict):
+        return {key: _replace_non_finite(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_replace_non_finite(value) for value in obj]
+    if isinstance(obj, np.ndarray):
+        if obj.dtype.kind == 'f':
+            return np.where(np.isfinite(obj), obj, None).tolist()
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        obj = obj.item()
+    if isinstance(obj, float) and not np.isfinite(obj):
+        return None
+    return obj
+
+
+def columnar_results(result_df: pd.DataFrame, verbose_output: bool) -> dict:
+    """
+    Convert prediction results to columnar arrays without building a dictionary per row.
+
+    Parameters:
+        result_df (pd.DataFrame): DataFrame with predictions.
+        verbose_output (bool): Include the classification result columns.
+
+    Returns:
+        dict: Mapping of column name to a list of compositions or a NumPy array of predictions.
+    """
+    columns = ['composition', 'band_gap']
+    if verbose_output:
+        columns += ['is_semiconductor', 'semiconductor_probability']
+    results = {'composition': result_df['composition'].astype(str).tolist()}
+    for column in columns[1:]:
+        results[column] = np.ascontiguousarray(result_df[column].to_numpy())
+    return results
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Choose the response compression from the Accept-Encoding request header.
+
+    zstd is preferred when the zstandard package is installed, then gzip. Quality values are
+    honoured only to exclude encodings with q=0.
+
+    Parameters:
+        accept_encoding (str, optional): Value of the Accept-Encoding header.
+
+    Returns:
+        str or None: 'zstd', 'gzip' or None for an uncompressed response.
+    """
+    accepted = set()
+    for item in (accept_encoding or '').split(','):
+        encoding, _, params = item.strip().partition(';')
+        if params.replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(encoding.strip().lower())
+
+    if zstandard is not None and 'zstd' in accepted:
+        return 'zstd'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def compress(content: bytes, encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+    """
+    Compress a response body with the negotiated encoding.
+
+    Parameters:
+        content (bytes): Response body.
+        encoding (str, optional): 'zstd', 'gzip' or None.
+
+    Returns:
+        tuple: (possibly compressed body, applied encoding or None if the body was left as is).
+    """
+    if encoding is None or len(content) < MIN_COMPRESS_BYTES:
+        return content, None
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(content), encoding
+    return gzip.compress(content, compresslevel=GZIP_LEVEL, mtime=0), encoding
@@ -0,0 +1,291 @@
+"""Training pipeline module.
+
+Concurrent training of several model types for both tasks. The data of each task is loaded, split and scaled
+once and shared with the worker processes as read-only memory-mapped arrays, and the CPU cores are divided
+between the workers and the estimators and searches inside them. The held-out metrics of all model types are
+compared in a report, and the best model of each task can be promoted to 'best_model'.
+"""
+import argparse
+import json
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+from joblib import Parallel, cpu_count, delayed
+
+from band_gap_ml.config import Config
+from band_gap_ml.feature_cache import check_data_paths, load_training_data
+from band_gap_ml.model_training import (build_models_statistics, fit_task_model, prepare_task_data,
+                                        save_models_and_scalers)
+
+TASKS = ('classification', 'regression')
+
+
+def share_task_data(data: dict, work_dir: Path, task: str) -> dict:
+    """
+    Save the arrays of the data of a task and memory-map them read-only, so that worker processes
+    share one copy of them instead of receiving their own.
+
+    Parameters:
+        data (dict): Data of the task as returned by prepare_task_data.
+        work_dir (Path): Directory of the array files.
+        task (str): 'classification' or 'regression'.
+
+    Returns:
+        dict: The data with its arrays replaced by memory maps.
+    """
+    shared = {}
+    for name, value in data.items():
+        if isinstance(value, np.ndarray):
+            path = work_dir / f'{task}_{name}.npy'
+            np.save(path, value)
+            value = np.load(path, mmap_mode='r')
+        shared[name] = value
+    return shared
+
+
+def plan_n_jobs(n_trainings: int, n_jobs: Optional[int] = -1):
+    """
+    Divide the CPU cores between concurrent trainings.
+
+    Parameters:
+        n_trainings (int): Number of trainings.
+        n_jobs (int, optional): Number of CPU cores to use. None or negative values use all cores.
+
+    Returns:
+        tuple: (number of worker processes, number of cores of each worker).
+    """
+    n_cores = cpu_count() if n_jobs is None or n_jobs < 0 else n_jobs
+    n_workers = max(1, min(n_trainings, n_cores))
+    return n_workers, max(1, n_cores // n_workers)
+
+
+def _train_task(data, task, model_type, use_grid_search, params, search_options, n_jobs):
+    """Train the model of one task in a worker process and time it."""
+    start = time.perf_counter()
+    results = fit_task_model(data, task, model_type, use_grid_search, params, search_options, n_jobs)
+    results["training_time_seconds"] = time.perf_counter() - start
+    # The held-out data is shared by all model types and stays in the parent process
+    del results["X_test"], results["X_test_final"], results["Y_test"]
+    return results
+
+
+def compare_models(models_statistics: dict) -> dict:
+    """
+    Rank the model types of each task by their held-out metric.
+
+    Parameters:
+        models_statistics (dict): Statistics of each model type as saved to models_statistics.json,
+                                  with the training time of each task.
+
+    Returns:
+        dict: For each task, the metric, the model types with their metric and training time from best
+              to worst, and the best model type.
+    """
+    report = {}
+    for task in TASKS:
+        metric = Config.TASK_METRICS[task]
+        ranking = sorted(
+            ({"model_type": model_type,
+              metric: statistics[task]["metrics"][metric],
+              "training_time_seconds": statistics[task]["training_time_seconds"]}
+             for model_type, statistics in models_statistics.items()),
+            key=lambda entry: entry[metric], reverse=True
+        )
+        report[task] = {"metric": metric, "ranking": ranking, "best_model_type": ranking[0]["model_type"]}
+    return report
+
+
+def print_comparison_report(report: dict):
+    """Print the ranking of the model types of each task."""
+    for task, task_report in report.items():
+        metric = task_report["metric"]
+        print(f"\n{task.capitalize()} models by held-out {metric}:")
+        for entry in task_report["ranking"]:
+            print(f"{entry['model_type']:<20} {metric}: {entry[metric]:.4f}   "
+                  f"training time: {entry['training_time_seconds']:.1f} s")
+
+
+def promote_best_models(report: dict, models_statistics: dict, model_dir: Path) -> Path:
+    """
+    Copy the artifacts of the best model type of each task to the 'best_model' directory.
+
+    Artifacts of the promoted tasks already in 'best_model' are removed first, so that no artifact
+    of another model type is left next to the promoted ones.
+
+    Parameters:
+        report (dict): Comparison report as returned by compare_models.
+        models_statistics (dict): Statistics of each model type.
+        model_dir (Path): Base directory of the model type directories.
+
+    Returns:
+        Path: The 'best_model' directory.
+    """
+    best_model_dir = Config.create_model_type_directory('best_model', model_dir)
+    best_model_statistics = {"model_type": "best_model", "promoted_from": {}}
+    for task, task_report in report.items():
+        model_type = task_report["best_model_type"]
+        print(f"Promoting {model_type} {task} model to {best_model_dir}")
+        for name in (f'{task}_model', f'{task}_scaler'):
+            for suffix in Config.ARTIFACT_FORMATS.values():
+                (best_model_dir / f'{name}{suffix}').unlink(missing_ok=True)
+                source = model_dir / model_type.lower() / f'{name}{suffix}'
+                if source.exists():
+                    shutil.copy2(source, best_model_dir / source.name)
+        best_model_statistics["promoted_from"][task] = model_type
+        best_model_statistics[task] = models_statistics[model_type][task]
+
+    with open(best_model_dir / 'models_statistics.json', 'w') as file:
+        json.dump(best_model_statistics, file, indent=4)
+    return best_model_dir
+
+
+def run_training_pipeline(
+        model_types: Iterable[str] = tuple(Config.MODEL_TYPES),
+        classification_data_path=None,
+        regression_data_path=None,
+        model_dir=None,
+        use_grid_search=False,
+        search_strategy=Config.DEFAULT_SEARCH_STRATEGY,
+        search_n_iter=Config.DEFAULT_SEARCH_N_ITER,
+        search_time_budget=None,
+        artifact_formats=('pickle',),
+        feature_cache_dir=Config.FEATURE_CACHE_DIR,
+        n_jobs=-1,
+        promote_best=False,
+        refit=Config.DEFAULT_REFIT
+):
+    """
+    Train and save the models of several model types for both tasks concurrently, and compare them.
+
+    Parameters:
+        model_types (iterable of str): Model types to train (e.g., 'RandomForest', 'GradientBoosting', 'XGBoost').
+        classification_data_path (str, optional): Path to the classification dataset.
+                                                  If None, uses Config.CLASSIFICATION_DATA_PATH.
+        regression_data_path (str, optional): Path to the regression dataset. If None, uses Config.REGRESSION_DATA_PATH.
+        model_dir (str, optional): Base directory of the models. If None, uses Config.MODELS_DIR.
+        use_grid_search (bool): Search the hyperparameters over Config.DEFAULT_GRID_PARAMS.
+        search_strategy (str): Search strategy, one of Config.SEARCH_STRATEGIES.
+        search_n_iter (int): Maximum number of candidates of the random and early_stopping strategies.
+        search_time_budget (float, optional): Seconds after which the random and early_stopping strategies
+                                              start no new candidate.
+        artifact_formats (iterable of str): Formats of the saved models, see save_models_and_scalers.
+        feature_cache_dir (str, optional): Directory of the feature cache. If None, features are not cached.
+        n_jobs (int): Number of CPU cores to use. -1 uses all cores.
+        promote_best (bool): Copy the best model of each task to 'best_model'.
+        refit (str): How the final models are obtained, one of Config.REFIT_MODES.
+
+    Returns:
+        dict: Comparison report with the ranking of the model types of each task.
+    """
+    model_types = list(model_types)
+    unknown_model_types = [model_type for model_type in model_types if model_type not in Config.MODEL_TYPES]
+    if unknown_model_types:
+        raise ValueError(f"Unknown model types: {', '.join(unknown_model_types)}. "
+                         f"Available model types: {', '.join(Config.MODEL_TYPES)}")
+
+    data_paths = {
+        "classification": classification_data_path or Config.CLASSIFICATION_DATA_PATH,
+        "regression": regression_data_path or Config.REGRESSION_DATA_PATH
+    }
+    check_data_paths(data_paths)
+    base_model_dir = Path(model_dir) if model_dir else Config.MODELS_DIR
+    search_options = {
+        "search_strategy": search_strategy,
+        "search_n_iter": search_n_iter,
+        "search_time_budget": search_time_budget
+    }
+    trainings = [(model_type, task) for model_type in model_types for task in TASKS]
+    n_workers, n_jobs_per_worker = plan_n_jobs(len(trainings), n_jobs)
+    print(f"Training {len(trainings)} models in {n_workers} processes with {n_jobs_per_worker} cores each")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        data = {}
+        for task in TASKS:
+            X, Y = load_training_data(data_paths[task], task, cache_dir=feature_cache_dir)
+            data[task] = share_task_data(prepare_task_data(X, Y, task, refit), Path(work_dir), task)
+
+        trained = Parallel(n_jobs=n_workers)(
+            delayed(_train_task)(
+                data[task], task, model_type, use_grid_search,
+                Config.get_default_grid_params(model_type, task), search_options, n_jobs_per_worker
+            )
+            for model_type, task in trainings
+        )
+
+    results = {model_type: {} for model_type in model_types}
+    for (model_type, task), task_results in zip(trainings, trained):
+        results[model_type][task] = task_results
+
+    models_statistics = {}
+    for model_type in model_types:
+        classification_results, regression_results = results[model_type]["classification"], results[model_type]["regression"]
+        type_model_dir = Config.create_model_type_directory(model_type, base_model_dir)
+        save_models_and_scalers(type_model_dir, classification_results, regression_results, artifact_formats)
+
+        statistics = build_models_statistics(model_type, use_grid_search, classification_results, regression_results)
+        for task in TASKS:
+            statistics[task]["training_time_seconds"] = results[model_type][task]["training_time_seconds"]
+        with open(type_model_dir / 'models_statistics.json', 'w') as file:
+            json.dump(statistics, file, indent=4)
+        models_statistics[model_type] = statistics
+
+    report = compare_models(models_statistics)
+    print_comparison_report(report)
+    if promote_best:
+        promote_best_models(report, models_statistics, base_model_dir)
+        report["promoted"] = {task: report[task]["best_model_type"] for task in TASKS}
+
+    report_path = base_model_dir / 'comparison_report.json'
+    with open(report_path, 'w') as file:
+        json.dump(report, file, indent=4)
+    print(f"Comparison report saved to {report_path}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train, compare and save models of several model types concurrently.")
+    parser.add_argument("--model_types", type=str, default=",".join(Config.MODEL_TYPES),
+                        help="Comma-separated model types to train")
+    parser.add_argument("--classification_data", type=str, help="Path to the classification dataset")
+    parser.add_argument("--regression_data", type=str, help="Path to the regression dataset")
+    parser.add_argument("--model_dir", type=str, default=None, help="Base directory to save models and scalers")
+    parser.add_argument("--use_grid_search", action="store_true", help="Search the hyperparameters of the models")
+    parser.add_argument("--search_strategy", type=str, default=Config.DEFAULT_SEARCH_STRATEGY,
+                        choices=Config.SEARCH_STRATEGIES, help="Hyperparameter search strategy")
+    parser.add_argument("--search_n_iter", type=int, default=Config.DEFAULT_SEARCH_N_ITER,
+                        help="Maximum number of candidates of the random and early_stopping strategies")
+    parser.add_argument("--search_time_budget", type=float, default=None,
+                        help="Seconds after which the random and early_stopping strategies start no new candidate")
+    parser.add_argument("--refit", type=str, default=Config.DEFAULT_REFIT, choices=Config.REFIT_MODES,
+                        help="Final models: full (retrain on the full data), warm_start (continue the evaluated "
+                             "models on the full data) or none (save the evaluated models)")
+    parser.add_argument("--artifact_formats", type=str, default="pickle",
+                        help="Comma-separated formats of the saved models: pickle, arrays (memory-mappable) and/or onnx")
+    parser.add_argument("--feature_cache_dir", type=str, default=str(Config.FEATURE_CACHE_DIR),
+                        help="Directory of the cached feature matrices of the datasets")
+    parser.add_argument("--no_feature_cache", action="store_true",
+                        help="Compute the features of the datasets without reading or writing the feature cache")
+    parser.add_argument("--n_jobs", type=int, default=-1, help="Number of CPU cores to use; -1 uses all cores")
+    parser.add_argument("--promote_best", action="store_true",
+                        help="Copy the best model of each task to the best_model directory")
+    args = parser.parse_args()
+
+    run_training_pipeline(
+        model_types=[model_type.strip() for model_type in args.model_types.split(',')],
+        classification_data_path=args.classification_data,
+        regression_data_path=args.regression_data,
+        model_dir=args.model_dir,
+        use_grid_search=args.use_grid_search,
+        search_strategy=args.search_strategy,
+        search_n_iter=args.search_n_iter,
+        search_time_budget=args.search_time_budget,
+        artifact_formats=[artifact_format.strip() for artifact_format in args.artifact_formats.split(',')],
+        feature_cache_dir=None if args.no_feature_cache else args.feature_cache_dir,
+        n_jobs=args.n_jobs,
+        promote_best=args.promote_best,
+        refit=args.refit
+    )
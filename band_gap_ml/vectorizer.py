@@ -1,19 +1,213 @@
+import csv
+import re
+from functools import lru_cache
+from typing import NamedTuple
+
 import numpy as np
-import pandas as pd
-from pymatgen.core.composition import Composition
 from band_gap_ml.config import Config
 
+# Tokens of a plain chemical formula: element symbol, amount, opening bracket, closing bracket
+FORMULA_TOKEN_PATTERN = re.compile(r'([A-Z][a-z]?)|(\d+\.?\d*|\.\d+)|([(\[])|([)\]])')
+# Separators of hydrate/adduct parts, e.g. CuSO4·5H2O or CuSO4*5H2O
+HYDRATE_SEPARATOR_PATTERN = re.compile(r'[·•*]')
+# Optional leading coefficient of a hydrate part, e.g. '5' in '5H2O'
+LEADING_COEFFICIENT_PATTERN = re.compile(r'(\d+\.?\d*|\.\d+)?(.+)')
+CLOSING_BRACKETS = {'(': ')', '[': ']'}
+
+
+class ElementsTable(NamedTuple):
+    """Element symbols and their properties as read from the elements data file."""
+    symbols: tuple
+    property_names: tuple
+    properties: np.ndarray
+
+
+@lru_cache(maxsize=None)
+def load_elements_table(elements_data_path):
+    """
+    Read the elements data file once per process.
+
+    The file is parsed with the csv module instead of pandas, so that creating a FormulaVectorizer
+    neither imports pandas nor parses the file again.
+
+    Parameters:
+        elements_data_path (str or Path): Path to the elements properties file.
+
+    Returns:
+        ElementsTable: Element symbols, property names and a read-only property array.
+    """
+    with open(elements_data_path, newline='', encoding='utf-8') as fh:
+        reader = csv.reader(fh)
+        header = next(reader)
+        rows = list(reader)
+    properties = np.array([[float(value) if value else np.nan for value in row[1:]] for row in rows])
+    # The array is shared by all vectorizers of the process
+    properties.setflags(write=False)
+    return ElementsTable(tuple(row[0] for row in rows), tuple(header[1:]), properties)
+
+
+def _add_amounts(target, amounts, multiplier):
+    """Add element amounts multiplied by `multiplier` to the `target` dictionary in place."""
+    for element, amount in amounts.items():
+        target[element] = target.get(element, 0.0) + amount * multiplier
+
+
+def _parse_stoichiometry(formula):
+    """
+    Parse a formula without hydrate separators into element amounts.
+
+    Parameters:
+        formula (str): Chemical formula, e.g. 'Hg0.7Cd0.3Te' or 'Ba2B6O9(OH)4'.
+
+    Returns:
+        dict or None: Mapping of element symbol to its amount, or None if the formula is not understood.
+    """
+    stack = [{}]
+    brackets = []
+    pending = None
+    position = 0
+
+    for match in FORMULA_TOKEN_PATTERN.finditer(formula):
+        if match.start() != position:
+            return None
+        position = match.end()
+        element, amount, opening_bracket, closing_bracket = match.groups()
+
+        if amount is not None:
+            # Amount applies to the preceding element or bracketed group
+            if pending is None:
+                return None
+            _add_amounts(stack[-1], pending, float(amount))
+            pending = None
+            continue
+
+        if pending is not None:
+            _add_amounts(stack[-1], pending, 1.0)
+            pending = None
+
+        if element:
+            pending = {element: 1.0}
+        elif opening_bracket:
+            stack.append({})
+            brackets.append(CLOSING_BRACKETS[opening_bracket])
+        else:
+            if not brackets or brackets.pop() != closing_bracket:
+                return None
+            pending = stack.pop()
+
+    if position != len(formula) or brackets:
+        return None
+    if pending is not None:
+        _add_amounts(stack[-1], pending, 1.0)
+
+    return stack[0]
+
+
+def parse_formula_fast(formula):
+    """
+    Parse a chemical formula into its fractional composition without pymatgen.
+
+    Supports fractional stoichiometry (Hg0.7Cd0.3Te), nested parentheses and square brackets
+    (Ba2B6O9(OH)4) and hydrates separated by '·', '•' or '*' (CuSO4·5H2O).
+
+    Parameters:
+        formula (str): Chemical formula.
+
+    Returns:
+        dict or None: Mapping of element symbol to its atomic fraction,
+                      or None if the formula is not understood by the parser.
+    """
+    if not isinstance(formula, str):
+        return None
+
+    amounts = {}
+    for i, part in enumerate(HYDRATE_SEPARATOR_PATTERN.split(formula)):
+        match = LEADING_COEFFICIENT_PATTERN.fullmatch(part)
+        if match is None:
+            return None
+        coefficient, stoichiometry = match.groups()
+        # Only hydrate parts may start with a coefficient
+        if coefficient is not None and i == 0:
+            return None
+        part_amounts = _parse_stoichiometry(stoichiometry)
+        if not part_amounts:
+            return None
+        _add_amounts(amounts, part_amounts, float(coefficient) if coefficient is not None else 1.0)
+
+    amounts = {element: amount for element, amount in amounts.items() if amount > 0}
+    total = sum(amounts.values())
+    if not total:
+        return None
+
+    return {element: amount / total for element, amount in amounts.items()}
+
+
+def parse_formula_pymatgen(formula):
+    """
+    Parse a chemical formula into its fractional composition with pymatgen.
+
+    pymatgen is imported lazily, because importing it takes seconds and it is only needed
+    for formulas the built-in parser cannot handle.
+
+    Parameters:
+        formula (str): Chemical formula.
+
+    Returns:
+        dict: Mapping of element symbol to its atomic fraction.
+    """
+    from pymatgen.core.composition import Composition
+    return Composition(formula).fractional_composition.as_dict()
+
 
 class FormulaVectorizer:
     def __init__(self, elements_data_path=Config.ELEMENTS_PATH):
-        self.elements_df = pd.read_csv(elements_data_path)
-        self.elements_df.set_index('Symbol', inplace=True)
+        self.elements_data_path = elements_data_path
+        elements_table = load_elements_table(elements_data_path)
         self.column_names = [f'{stat}_{col}' for stat in ['avg', 'diff', 'max', 'min'] for col in
-                             self.elements_df.columns]
+                             elements_table.property_names]
+
+        # Precomputed lookup structures for batch vectorization
+        self.element_index = {symbol: i for i, symbol in enumerate(elements_table.symbols)}
+        self.element_properties = elements_table.properties
+        self._elements_df = None
+
+    @property
+    def elements_df(self):
+        """
+        Returns the element properties as a DataFrame indexed by symbol, creating it on first use.
+
+        Returns:
+            pd.DataFrame: Element properties.
+        """
+        if self._elements_df is None:
+            import pandas as pd
+            elements_table = load_elements_table(self.elements_data_path)
+            self._elements_df = pd.DataFrame(self.element_properties, columns=list(elements_table.property_names),
+                                             index=pd.Index(elements_table.symbols, name='Symbol'))
+        return self._elements_df
+
+    def parse_formula(self, formula):
+        """
+        Parse a chemical formula into its fractional composition.
+
+        The built-in parser is tried first; pymatgen is used only for formulas it cannot handle
+        or which contain symbols missing from the elements table (e.g. 'D' for deuterium).
+
+        Parameters:
+            formula (str): Chemical formula, e.g. 'Hg0.7Cd0.3Te'.
+
+        Returns:
+            dict: Mapping of element symbol to its atomic fraction.
+        """
+        fractional_composition = parse_formula_fast(formula)
+        if fractional_composition is None or not all(
+                element in self.element_index for element in fractional_composition):
+            fractional_composition = parse_formula_pymatgen(formula)
+        return fractional_composition
 
     def vectorize_formula(self, formula):
         try:
-            fractional_composition = Composition(formula).fractional_composition.as_dict()
+            fractional_composition = self.parse_formula(formula)
 
             # Initialize arrays for avg, diff, max, min
             avg_feature = np.zeros(len(self.elements_df.iloc[0]))
@@ -38,3 +232,162 @@ class FormulaVectorizer:
         except Exception as e:
             print(f"Error processing formula {formula}: {e}")
             return [np.nan] * len(self.elements_df.columns) * 4  # Return appropriate length with NaNs
+
+    def parse_formulas(self, formulas):
+        """
+        Parse a batch of chemical formulas into fractional compositions.
+
+        Repeated formula strings within the batch are parsed only once.
+
+        Parameters:
+            formulas (iterable of str): Chemical formulas.
+
+        Returns:
+            list: Fractional composition dictionaries, or None for formulas that could not be parsed
+                  or contain elements missing from the elements table.
+        """
+        parsed = {}
+        compositions = []
+        for formula in formulas:
+            try:
+                compositions.append(parsed[formula])
+                continue
+            except (KeyError, TypeError):
+                pass
+
+            try:
+                fractional_composition = self.parse_formula(formula)
+                unknown_elements = [element for element in fractional_composition
+                                    if element not in self.element_index]
+                if unknown_elements:
+                    raise KeyError(f"Unknown elements {unknown_elements}")
+            except Exception as e:
+                print(f"Error processing formula {formula}: {e}")
+                fractional_composition = None
+
+            compositions.append(fractional_composition)
+            try:
+                parsed[formula] = fractional_composition
+            except TypeError:
+                pass
+        return compositions
+
+    def composition_matrix(self, compositions):
+        """
+        Build a sparse composition matrix for a batch of parsed compositions.
+
+        Parameters:
+            compositions (list): Fractional composition dictionaries as returned by `parse_formulas`.
+                                 None entries produce empty rows.
+
+        Returns:
+            scipy.sparse.csr_matrix: Matrix of shape (n_compositions, n_elements) with atomic fractions.
+        """
+        from scipy import sparse
+
+        indptr, cols, fractions = self._composition_arrays(compositions)
+        return sparse.csr_matrix((fractions, cols, indptr), shape=(len(compositions), len(self.element_index)))
+
+    def _composition_arrays(self, compositions):
+        """
+        Build the CSR arrays of the composition matrix without creating a scipy matrix.
+
+        Parameters:
+            compositions (list): Fractional composition dictionaries. None entries produce empty rows.
+
+        Returns:
+            tuple: (np.ndarray row pointers, np.ndarray element indices, np.ndarray atomic fractions).
+        """
+        counts, cols, fractions = [], [], []
+
+        for fractional_composition in compositions:
+            if fractional_composition is None:
+                counts.append(0)
+                continue
+            counts.append(len(fractional_composition))
+            cols.extend(self.element_index[element] for element in fractional_composition)
+            fractions.extend(fractional_composition.values())
+
+        indptr = np.zeros(len(compositions) + 1, dtype=np.intp)
+        np.cumsum(counts, out=indptr[1:])
+        return indptr, np.asarray(cols, dtype=np.intp), np.asarray(fractions, dtype=float)
+
+    def vectorize_batch(self, formulas):
+        """
+        Vectorize a batch of chemical formulas at once.
+
+        Parameters:
+            formulas (iterable of str): Chemical formulas.
+
+        Returns:
+            np.ndarray: Feature matrix of shape (n_formulas, 4 * n_properties).
+                        Rows for formulas that could not be processed are filled with NaN.
+        """
+        return self.vectorize_compositions(self.parse_formulas(formulas))
+
+    def vectorize_compositions(self, compositions):
+        """
+        Vectorize a batch of parsed compositions at once.
+
+        All blocks are grouped reductions over the properties of the elements present in each
+        formula: a fraction-weighted sum for avg and NaN-aware reductions for max and min.
+        The output follows the `column_names` layout of `vectorize_formula`.
+
+        Parameters:
+            compositions (list): Fractional composition dictionaries as returned by `parse_formulas`.
+
+        Returns:
+            np.ndarray: Feature matrix of shape (n_compositions, 4 * n_properties).
+                        Rows for None entries are filled with NaN.
+        """
+        indptr, cols, fractions = self._composition_arrays(compositions)
+        valid = np.array([composition is not None for composition in compositions], dtype=bool)
+        n_formulas, n_properties = len(compositions), self.element_properties.shape[1]
+
+        avg_feature = np.zeros((n_formulas, n_properties))
+        max_feature = np.full((n_formulas, n_properties), np.nan)
+        min_feature = np.full((n_formulas, n_properties), np.nan)
+
+        if len(cols):
+            # Reduce the properties of present elements per row; skip rows without elements
+            non_empty = np.diff(indptr) > 0
+            starts = indptr[:-1][non_empty]
+            present_properties = self.element_properties[cols]
+            avg_feature[non_empty] = np.add.reduceat(present_properties * fractions[:, None], starts, axis=0)
+            max_feature[non_empty] = np.fmax.reduceat(present_properties, starts, axis=0)
+            min_feature[non_empty] = np.fmin.reduceat(present_properties, starts, axis=0)
+
+        diff_feature = max_feature - min_feature
+
+        features = np.hstack([avg_feature, diff_feature, max_feature, min_feature])
+        features[~valid] = np.nan
+        return features
+
+
+# FormulaVectorizer of the current featurization worker process
+_worker_vectorizer = None
+
+
+def init_featurization_worker(elements_data_path):
+    """
+    Initialize a featurization worker process with its own FormulaVectorizer.
+
+    Parameters:
+        elements_data_path (str or Path): Path to the elements properties file.
+    """
+    global _worker_vectorizer
+    _worker_vectorizer = FormulaVectorizer(elements_data_path)
+
+
+def featurize_chunk(formulas):
+    """
+    Parse and vectorize a chunk of formulas in a featurization worker process.
+
+    Parameters:
+        formulas (list of str): Chemical formulas.
+
+    Returns:
+        tuple: (list of fractional compositions, np.ndarray of feature vectors).
+    """
+    compositions = _worker_vectorizer.parse_formulas(formulas)
+    return compositions, _worker_vectorizer.vectorize_compositions(compositions)
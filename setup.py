@@ -43,6 +43,8 @@ setup(
         'band_gap_ml': [
             'data/*.csv',  # Include all CSV files in the data subfolder
             'models/**/*.pkl',  # Include all model files in the models subfolder
+            'models/**/*.joblib',  # Include memory-mappable model arrays
+            'models/**/*.onnx',  # Include ONNX model graphs
         ],
     },
     install_requires=read_requirements(),
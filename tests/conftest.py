@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import (GradientBoostingClassifier, GradientBoostingRegressor, RandomForestClassifier,
+                              RandomForestRegressor)
+from sklearn.preprocessing import StandardScaler
+from xgboost import XGBClassifier, XGBRegressor
+
+from band_gap_ml.config import Config
+
+N_ROWS = 600
+N_BOUNDARY_NODES = 300
+
+MODELS = {
+    'random_forest': (RandomForestClassifier, RandomForestRegressor, {'max_depth': 6, 'random_state': 0}),
+    'gradient_boosting': (GradientBoostingClassifier, GradientBoostingRegressor, {'max_depth': 3, 'random_state': 0}),
+    'xgboost': (XGBClassifier, XGBRegressor, {'max_depth': 4, 'random_state': 0}),
+}
+
+
+@pytest.fixture(scope='session')
+def training_data():
+    """Features and band gaps of a sample of the shipped regression dataset."""
+    data = pd.read_csv(Config.REGRESSION_DATA_PATH).sample(N_ROWS, random_state=0)
+    X = data.drop(columns=['Composition', 'Eg']).to_numpy(dtype=float)
+    return X, data['Eg'].to_numpy(dtype=float)
+
+
+@pytest.fixture(scope='session')
+def fit_model(training_data):
+    """Function fitting a small model of a model family and task and its scaler on the training data."""
+    def fit(model_type, task, n_estimators=20, **params):
+        X, eg = training_data
+        Classifier, Regressor, default_params = MODELS[model_type]
+        Model = Classifier if task == 'classification' else Regressor
+        y = (eg > np.median(eg)).astype(int) if task == 'classification' else eg
+        scaler = StandardScaler().fit(X)
+        model = Model(n_estimators=n_estimators, **{**default_params, **params}).fit(scaler.transform(X), y)
+        return model, scaler
+    return fit
+
+
+@pytest.fixture(scope='session')
+def boundary_rows():
+    """Function building rows with one feature set to a raw threshold of a compiled ensemble or its neighbours."""
+    def rows(X: np.ndarray, compiled) -> np.ndarray:
+        internal = np.flatnonzero(compiled.left != np.arange(len(compiled.left)))
+        nodes = np.random.default_rng(0).choice(internal, min(N_BOUNDARY_NODES, len(internal)), replace=False)
+        result = []
+        for i, node in enumerate(nodes):
+            threshold = compiled.threshold[node]
+            for value in (np.nextafter(np.nextafter(threshold, -np.inf), -np.inf), np.nextafter(threshold, -np.inf),
+                          threshold, np.nextafter(threshold, np.inf),
+                          np.nextafter(np.nextafter(threshold, np.inf), np.inf)):
+                row = X[i % len(X)].copy()
+                row[compiled.feature[node]] = value
+                result.append(row)
+        return np.array(result)
+    return rows
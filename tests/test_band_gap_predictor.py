@@ -0,0 +1,33 @@
+import threading
+
+from band_gap_ml.band_gap_predictor import BandGapPredictor
+
+FORMULAS = ['GaAs', 'SiO2', 'NaCl', 'Fe2O3', 'ZnO', 'TiO2', 'CdTe', 'Cu']
+
+
+def test_last_batch_stats_and_timings_are_per_thread():
+    predictor = BandGapPredictor(model_type='xgboost', cache_size=0)
+    predictor.load_models()
+    barrier = threading.Barrier(len(FORMULAS))
+    seen, errors = {}, []
+
+    def predict(n_rows):
+        try:
+            barrier.wait()
+            for _ in range(5):
+                predictor.predict_from_formula(FORMULAS[:n_rows])
+                assert predictor.last_batch_stats['rows'] == n_rows
+            seen[n_rows] = (predictor.last_batch_stats, predictor.last_timings)
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=predict, args=(n,)) for n in range(1, len(FORMULAS) + 1)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert {n: stats['unique_compositions'] for n, (stats, _) in seen.items()} == {n: n for n in seen}
+    assert all(timings for _, timings in seen.values())
+    assert predictor.last_batch_stats == {} and predictor.last_timings == {}
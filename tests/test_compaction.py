@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+from xgboost import XGBRegressor
+
+from band_gap_ml.compaction import select_n_trees, staged_predictions, staged_scores, truncate_model
+
+from conftest import MODELS
+
+N_ESTIMATORS = 20
+
+
+def assert_predictions_equal(task, actual, expected):
+    if task == 'classification':
+        np.testing.assert_array_equal(actual, expected)
+    else:
+        np.testing.assert_allclose(actual, expected, rtol=1e-6, atol=1e-6)
+
+
+@pytest.mark.parametrize('model_type', MODELS)
+@pytest.mark.parametrize('task', ['classification', 'regression'])
+def test_truncated_model_predicts_like_its_stage(training_data, fit_model, model_type, task):
+    X, _ = training_data
+    model, scaler = fit_model(model_type, task, N_ESTIMATORS)
+    X_scaled = scaler.transform(X)
+    predictions = model.predict(X_scaled)
+    staged = staged_predictions(model, X_scaled)
+
+    assert staged.shape == (N_ESTIMATORS, len(X))
+    assert_predictions_equal(task, staged[-1], predictions)
+    for n_trees in (1, 7, N_ESTIMATORS):
+        assert_predictions_equal(task, truncate_model(model, n_trees).predict(X_scaled), staged[n_trees - 1])
+    # The original model keeps all its trees
+    assert_predictions_equal(task, model.predict(X_scaled), predictions)
+
+
+def test_truncate_early_stopped_xgboost(training_data):
+    X, eg = training_data
+    model = XGBRegressor(n_estimators=500, learning_rate=0.5, early_stopping_rounds=3, random_state=0)
+    model.fit(X[:400], eg[:400], eval_set=[(X[400:], eg[400:])], verbose=False)
+    n_rounds = model.best_iteration + 1
+    assert n_rounds < model.get_booster().num_boosted_rounds()
+
+    staged = staged_predictions(model, X)
+    assert len(staged) == n_rounds
+    np.testing.assert_allclose(staged[-1], model.predict(X), rtol=1e-6, atol=1e-6)
+    for n_trees in (1, n_rounds):
+        np.testing.assert_allclose(truncate_model(model, n_trees).predict(X), staged[n_trees - 1], rtol=1e-6, atol=1e-6)
+    with pytest.raises(ValueError, match='Cannot keep'):
+        truncate_model(model, n_rounds + 1)
+
+
+def test_staged_scores_end_with_the_model_score(training_data, fit_model):
+    X, eg = training_data
+    for task in ('classification', 'regression'):
+        model, scaler = fit_model('gradient_boosting', task, N_ESTIMATORS)
+        y = (eg > np.median(eg)).astype(int) if task == 'classification' else eg
+        scores = staged_scores(model, scaler.transform(X), y, task)
+        assert scores[-1] == pytest.approx(model.score(scaler.transform(X), y))
+
+
+def test_select_n_trees():
+    scores = np.array([0.5, 0.8, 0.9, 0.95, 0.94])
+    assert select_n_trees(scores, 0.0) == 4
+    assert select_n_trees(scores, 0.05) == 3
+    assert select_n_trees(scores, 1.0) == 1
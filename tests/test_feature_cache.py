@@ -0,0 +1,80 @@
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from band_gap_ml.config import Config
+from band_gap_ml.feature_cache import check_data_paths, get_cache_path, load_training_data
+from band_gap_ml.vectorizer import FormulaVectorizer
+
+N_ROWS = 50
+
+
+@pytest.fixture(scope='module')
+def regression_data():
+    return pd.read_csv(Config.REGRESSION_DATA_PATH, nrows=N_ROWS)
+
+
+def test_cache_key_changes_with_dataset_and_elements(tmp_path):
+    data_path = tmp_path / 'data.csv'
+    data_path.write_text('composition,label\nGaAs,1\n')
+    elements_path = tmp_path / 'elements.csv'
+    shutil.copy(Config.ELEMENTS_PATH, elements_path)
+    cache_path = get_cache_path(data_path, 'classification', elements_path, tmp_path)
+
+    assert get_cache_path(data_path, 'classification', elements_path, tmp_path) == cache_path
+    assert get_cache_path(data_path, 'regression', elements_path, tmp_path) != cache_path
+
+    data_path.write_text('composition,label\nGaAs,0\n')
+    changed_data_path = get_cache_path(data_path, 'classification', elements_path, tmp_path)
+    assert changed_data_path != cache_path
+
+    with open(elements_path, 'a') as file:
+        file.write('\n')
+    assert get_cache_path(data_path, 'classification', elements_path, tmp_path) not in (cache_path, changed_data_path)
+
+
+def test_composition_file_is_featurized_with_its_last_column_as_labels(tmp_path, regression_data):
+    data_path = tmp_path / 'compositions.csv'
+    pd.DataFrame({
+        'id': range(N_ROWS),
+        'composition': regression_data['Composition'],
+        'band_gap': regression_data['Eg'],
+    }).to_csv(data_path, index=False)
+    vectorizer = FormulaVectorizer()
+
+    X, y = load_training_data(data_path, 'regression', cache_dir=tmp_path / 'cache')
+
+    np.testing.assert_array_equal(y, regression_data['Eg'].to_numpy())
+    np.testing.assert_allclose(X, regression_data[vectorizer.column_names].to_numpy(dtype=float), rtol=1e-9, atol=1e-9)
+
+
+def test_precomputed_features_are_read_by_column_name(tmp_path, regression_data):
+    data_path = tmp_path / 'features.csv'
+    vectorizer = FormulaVectorizer()
+    # Feature columns before the label, in another order than the vectorizer's
+    regression_data[['Composition', *vectorizer.column_names[::-1], 'Eg']].to_csv(data_path, index=False)
+
+    X, y = load_training_data(data_path, 'regression', cache_dir=None)
+
+    np.testing.assert_array_equal(y, regression_data['Eg'].to_numpy())
+    np.testing.assert_array_equal(X, regression_data[vectorizer.column_names].to_numpy(dtype=float))
+
+
+def test_cached_features_are_reused(tmp_path, regression_data):
+    data_path = tmp_path / 'compositions.csv'
+    regression_data[['Composition', 'Eg']].to_csv(data_path, index=False)
+    cache_dir = tmp_path / 'cache'
+    X, y = load_training_data(data_path, 'classification', cache_dir=cache_dir)
+
+    cache_path = get_cache_path(data_path, 'classification', Config.ELEMENTS_PATH, cache_dir)
+    np.savez(cache_path, X=X[:1], y=y[:1])
+    X_cached, _ = load_training_data(data_path, 'classification', cache_dir=cache_dir)
+    assert len(X_cached) == 1
+    assert y.dtype.kind == 'i'
+
+
+def test_missing_dataset_is_reported_with_its_path(tmp_path):
+    with pytest.raises(FileNotFoundError, match='missing.csv'):
+        check_data_paths({'classification': tmp_path / 'missing.csv'})
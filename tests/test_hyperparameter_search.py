@@ -0,0 +1,54 @@
+import pytest
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+from xgboost import XGBRegressor
+
+from band_gap_ml.hyperparameter_search import search_hyperparameters
+
+PARAMS = {'max_depth': [2, 3, 4], 'learning_rate': [0.1, 0.3], 'n_estimators': [10]}
+
+
+@pytest.fixture(scope='module')
+def data(training_data):
+    X, eg = training_data
+    return X[:, :20], eg
+
+
+def search(data, Model, strategy, params=PARAMS, **options):
+    X, y = data
+    return search_hyperparameters(Model, X, y, params, 'regression', strategy, cv=3, n_jobs=1, **options)
+
+
+@pytest.mark.parametrize('strategy', ['grid', 'halving'])
+def test_exhaustive_strategies_count_distinct_candidates(data, strategy):
+    estimator, best_params, stats = search(data, GradientBoostingRegressor, strategy)
+    assert stats['strategy'] == strategy
+    assert stats['n_candidates'] == 6
+    assert best_params['max_depth'] in PARAMS['max_depth']
+    assert estimator.get_params()['max_depth'] == best_params['max_depth']
+
+
+def test_random_search_evaluates_n_iter_candidates(data):
+    _, best_params, stats = search(data, GradientBoostingRegressor, 'random', n_iter=3)
+    assert stats['n_candidates'] == 3
+    assert set(best_params) == set(PARAMS)
+
+
+@pytest.mark.parametrize('Model, estimator_params', [(XGBRegressor, {'n_jobs': 1}), (GradientBoostingRegressor, {})])
+def test_early_stopping_finds_n_estimators(data, Model, estimator_params):
+    params = {'max_depth': [2, 3], 'learning_rate': [0.3], 'n_estimators': [200]}
+    estimator, best_params, stats = search(data, Model, 'early_stopping', params, n_iter=2,
+                                           estimator_params=estimator_params)
+    assert isinstance(best_params['n_estimators'], int)
+    assert 1 <= best_params['n_estimators'] <= 200
+    assert estimator.get_params()['n_estimators'] == best_params['n_estimators']
+    assert {'best_score', 'validation_score'} <= set(stats)
+
+
+def test_early_stopping_requires_boosted_models(data):
+    with pytest.raises(ValueError, match='Early stopping'):
+        search(data, RandomForestRegressor, 'early_stopping', {'max_depth': [2]}, n_iter=1)
+
+
+def test_unknown_strategy_is_rejected(data):
+    with pytest.raises(ValueError, match='Unknown search strategy'):
+        search(data, GradientBoostingRegressor, 'bayesian')
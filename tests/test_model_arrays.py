@@ -0,0 +1,78 @@
+import joblib
+import numpy as np
+import pytest
+
+from band_gap_ml.config import Config
+from band_gap_ml.model_arrays import (ARTIFACT_VERSION, TreeEnsemble, compile_model, convert_models, load_artifact,
+                                     save_artifact)
+from band_gap_ml.model_training import save_models_and_scalers
+
+from conftest import MODELS
+
+
+@pytest.mark.parametrize('model_type', MODELS)
+@pytest.mark.parametrize('task', ['classification', 'regression'])
+def test_compiled_model_matches_native(training_data, fit_model, boundary_rows, model_type, task):
+    X, _ = training_data
+    model, scaler = fit_model(model_type, task)
+    compiled = compile_model(model, scaler)
+
+    X_check = np.vstack([X, boundary_rows(X, compiled)])
+    X_scaled = scaler.transform(X_check)
+    if task == 'classification':
+        np.testing.assert_array_equal(compiled.predict(X_check), model.predict(X_scaled))
+        np.testing.assert_allclose(compiled.predict_proba(X_check), model.predict_proba(X_scaled),
+                                   rtol=1e-6, atol=1e-7)
+    else:
+        np.testing.assert_allclose(compiled.predict(X_check), model.predict(X_scaled), rtol=1e-6, atol=1e-7)
+
+
+@pytest.mark.parametrize('model_type', MODELS)
+@pytest.mark.parametrize('mmap_mode', ['r', None])
+def test_artifact_round_trip(tmp_path, training_data, fit_model, model_type, mmap_mode):
+    X, _ = training_data
+    model, scaler = fit_model(model_type, 'classification')
+    save_artifact(model, tmp_path / 'model.joblib')
+    save_artifact(scaler, tmp_path / 'scaler.joblib')
+
+    loaded_model = load_artifact(tmp_path / 'model.joblib', mmap_mode)
+    loaded_scaler = load_artifact(tmp_path / 'scaler.joblib', mmap_mode)
+
+    assert isinstance(loaded_model, TreeEnsemble)
+    assert isinstance(loaded_model.threshold, np.memmap) == (mmap_mode is not None)
+    assert isinstance(loaded_scaler.mean_, np.memmap) == (mmap_mode is not None)
+    np.testing.assert_array_equal(loaded_scaler.transform(X), scaler.transform(X))
+    np.testing.assert_array_equal(loaded_model.classes_, model.classes_)
+    np.testing.assert_allclose(loaded_model.predict_proba(scaler.transform(X)), model.predict_proba(scaler.transform(X)),
+                               rtol=1e-6, atol=1e-7)
+
+
+def test_load_artifact_rejects_other_versions_and_kinds(tmp_path):
+    joblib.dump({'kind': 'standard_scaler', 'version': ARTIFACT_VERSION + 1}, tmp_path / 'newer.joblib')
+    with pytest.raises(ValueError, match='version'):
+        load_artifact(tmp_path / 'newer.joblib')
+    joblib.dump({'kind': 'pipeline', 'version': ARTIFACT_VERSION}, tmp_path / 'unknown.joblib')
+    with pytest.raises(ValueError, match='kind'):
+        load_artifact(tmp_path / 'unknown.joblib')
+
+
+def test_converted_models_are_loaded_memory_mapped(tmp_path, training_data, fit_model):
+    X, _ = training_data
+    model_dir = tmp_path / 'xgboost'
+    model_dir.mkdir()
+    results = {task: dict(zip(('final_model', 'scaler'), fit_model('xgboost', task)))
+               for task in ('classification', 'regression')}
+    save_models_and_scalers(model_dir, results['classification'], results['regression'], ('pickle',))
+    assert Config('XGBoost', tmp_path).model_paths['regression_model'].suffix == '.pkl'
+
+    convert_models('XGBoost', tmp_path)
+
+    for config in (Config('XGBoost', tmp_path), Config('XGBoost', tmp_path, artifact_format='arrays', mmap_mode='r')):
+        assert all(path.suffix == '.joblib' for path in config.model_paths.values())
+        assert isinstance(config.regression_model.threshold, np.memmap)
+        for task in ('classification', 'regression'):
+            native, scaler = results[task]['final_model'], results[task]['scaler']
+            loaded = getattr(config, f'{task}_model')
+            loaded_scaler = getattr(config, f'{task}_scaler')
+            np.testing.assert_allclose(loaded.predict(loaded_scaler.transform(X)), native.predict(scaler.transform(X)),
+                                       rtol=1e-6, atol=1e-7)
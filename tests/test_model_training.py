@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+from band_gap_ml.config import Config
+from band_gap_ml.model_training import (SPLIT_RANDOM_STATES, TEST_SIZE, fit_task_model, get_n_estimators,
+                                        prepare_task_data, save_models_and_scalers, warm_start_model)
+
+from conftest import MODELS
+
+
+def test_retraining_removes_artifacts_of_formats_not_written(tmp_path, training_data, fit_model):
+    X, _ = training_data
+    model_dir = tmp_path / 'xgboost'
+    model_dir.mkdir()
+
+    def results(task, n_estimators):
+        model, scaler = fit_model('xgboost', task, n_estimators)
+        return {'final_model': model, 'scaler': scaler}
+
+    save_models_and_scalers(model_dir, results('classification', 5), results('regression', 5), ('pickle', 'arrays'))
+    assert Config('XGBoost', tmp_path).model_paths['regression_model'].suffix == '.joblib'
+
+    classification_results, regression_results = results('classification', 30), results('regression', 30)
+    save_models_and_scalers(model_dir, classification_results, regression_results, ('pickle',))
+
+    assert not list(model_dir.glob('*.joblib'))
+    config = Config('XGBoost', tmp_path)
+    assert config.model_paths['regression_model'].suffix == '.pkl'
+    scaled = regression_results['scaler'].transform(X)
+    np.testing.assert_array_equal(config.regression_model.predict(config.regression_scaler.transform(X)),
+                                  regression_results['final_model'].predict(scaled))
+
+
+@pytest.mark.parametrize('model_type', MODELS)
+def test_warm_start_grows_the_ensemble_without_changing_the_model(training_data, fit_model, model_type):
+    X, eg = training_data
+    model, scaler = fit_model(model_type, 'regression', 20)
+    X_scaled = scaler.transform(X)
+    predictions = model.predict(X_scaled)
+
+    final_model = warm_start_model(model, X_scaled, eg)
+
+    assert get_n_estimators(final_model) == 20 + round(20 * Config.WARM_START_EXTRA_FRACTION)
+    assert get_n_estimators(model) == 20
+    np.testing.assert_array_equal(model.predict(X_scaled), predictions)
+    assert not np.array_equal(final_model.predict(X_scaled), predictions)
+
+
+def test_n_estimators_of_early_stopped_gradient_boosting(training_data, fit_model):
+    model, _ = fit_model('gradient_boosting', 'regression', 500, n_iter_no_change=2, learning_rate=0.5)
+    assert model.n_estimators_ < 500
+    assert get_n_estimators(model) == model.n_estimators_
+
+
+@pytest.mark.parametrize('refit', Config.REFIT_MODES)
+def test_held_out_split_is_scaled_with_the_training_split_only(training_data, refit):
+    X, eg = training_data
+    X_train, X_test = train_test_split(X, test_size=TEST_SIZE, random_state=SPLIT_RANDOM_STATES['regression'])
+    split_scaler = StandardScaler().fit(X_train)
+
+    data = prepare_task_data(X, eg, 'regression', refit)
+
+    np.testing.assert_allclose(data['X_train'], split_scaler.transform(X_train))
+    np.testing.assert_allclose(data['X_test'], split_scaler.transform(X_test))
+    assert data['scaler'].n_samples_seen_ == (len(X) if refit == 'full' else len(X_train))
+    np.testing.assert_allclose(data['X'], data['scaler'].transform(X))
+    np.testing.assert_allclose(data['X_test_final'], data['scaler'].transform(X_test))
+
+
+@pytest.mark.parametrize('refit', Config.REFIT_MODES)
+def test_refit_modes(training_data, refit):
+    X, eg = training_data
+    data = prepare_task_data(X, eg, 'regression', refit)
+    results = fit_task_model(data, 'regression', 'XGBoost', False, None, n_jobs=1)
+
+    assert results['refit']['mode'] == refit
+    assert results['refit']['final_scaler'] == ('full data' if refit == 'full' else 'training split')
+    expected_n_estimators = {'full': 100, 'warm_start': 125, 'none': 100}[refit]
+    assert results['refit']['n_estimators'] == expected_n_estimators
+    assert (results['final_model'] is results['test_model']) == (refit == 'none')
+    assert results['final_model'].get_params()['n_jobs'] is None
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from band_gap_ml.model_arrays import compile_model
+from band_gap_ml.onnx_export import OnnxModel, export_onnx
+
+from conftest import MODELS
+
+pytest.importorskip('onnx')
+pytest.importorskip('onnxruntime')
+
+
+@pytest.mark.parametrize('model_type', MODELS)
+@pytest.mark.parametrize('task', ['classification', 'regression'])
+def test_onnx_model_matches_native(tmp_path, training_data, fit_model, boundary_rows, model_type, task):
+    X, _ = training_data
+    model, scaler = fit_model(model_type, task)
+    path = tmp_path / 'model.onnx'
+    export_onnx(model, scaler, path)
+    onnx_model = OnnxModel(path, intra_op_threads=1)
+
+    X_check = np.vstack([X, boundary_rows(X, compile_model(model, scaler))])
+    X_scaled = scaler.transform(X_check)
+    # onnxruntime sums the leaf values in float32
+    if task == 'classification':
+        np.testing.assert_array_equal(onnx_model.classes_, model.classes_)
+        np.testing.assert_allclose(onnx_model.predict_proba(X_check), model.predict_proba(X_scaled), atol=1e-5)
+        np.testing.assert_array_equal(onnx_model.predict(X_check), model.predict(X_scaled))
+    else:
+        np.testing.assert_allclose(onnx_model.predict(X_check), model.predict(X_scaled), rtol=1e-5, atol=1e-5)
@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+from band_gap_ml import serialization
+
+RESULTS = {
+    'composition': ['GaAs', 'Xx', 'SiO2'],
+    'band_gap': np.array([1.42, np.nan, np.inf]),
+    'is_semiconductor': np.array([1, 0, 1]),
+    'semiconductor_probability': [0.99, float('nan'), np.float64(-np.inf)],
+}
+
+
+def test_json_fallback_encodes_non_finite_floats_as_null(monkeypatch):
+    monkeypatch.setattr(serialization, 'orjson', None)
+    assert serialization.dumps(RESULTS) == (b'{"composition":["GaAs","Xx","SiO2"],"band_gap":[1.42,null,null],'
+                                            b'"is_semiconductor":[1,0,1],"semiconductor_probability":[0.99,null,null]}')
+
+
+def test_json_fallback_matches_orjson(monkeypatch):
+    if serialization.orjson is None:
+        pytest.skip('orjson is not installed')
+    expected = serialization.dumps(RESULTS)
+    monkeypatch.setattr(serialization, 'orjson', None)
+    assert serialization.dumps(RESULTS) == expected
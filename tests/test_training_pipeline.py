@@ -0,0 +1,81 @@
+import json
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from band_gap_ml.config import Config
+from band_gap_ml.training_pipeline import compare_models, plan_n_jobs, promote_best_models, run_training_pipeline
+
+N_ROWS = 150
+
+
+def statistics(accuracy, r2_score):
+    return {
+        'classification': {'metrics': {'accuracy': accuracy}, 'training_time_seconds': 1.0},
+        'regression': {'metrics': {'r2_score': r2_score}, 'training_time_seconds': 2.0},
+    }
+
+
+@pytest.mark.parametrize('n_trainings, n_jobs, expected', [(6, 4, (4, 1)), (2, 8, (2, 4)), (3, 1, (1, 1)),
+                                                           (4, 6, (4, 1))])
+def test_plan_n_jobs(n_trainings, n_jobs, expected):
+    assert plan_n_jobs(n_trainings, n_jobs) == expected
+
+
+def test_plan_n_jobs_uses_all_cores_by_default():
+    n_workers, n_jobs_per_worker = plan_n_jobs(1, None)
+    assert n_workers == 1 and n_jobs_per_worker >= 1
+
+
+def test_compare_models_ranks_each_task_by_its_metric():
+    report = compare_models({'RandomForest': statistics(0.9, 0.7), 'XGBoost': statistics(0.8, 0.8)})
+    assert report['classification']['best_model_type'] == 'RandomForest'
+    assert report['regression']['best_model_type'] == 'XGBoost'
+    assert [entry['model_type'] for entry in report['regression']['ranking']] == ['XGBoost', 'RandomForest']
+    assert report['regression']['ranking'][0]['r2_score'] == 0.8
+
+
+def test_promotion_removes_artifacts_of_the_previous_winner(tmp_path):
+    for model_type in ('randomforest', 'xgboost'):
+        (tmp_path / model_type).mkdir()
+        suffixes = ('.pkl', '.joblib') if model_type == 'randomforest' else ('.pkl',)
+        for name in Config.ARTIFACT_NAMES:
+            for suffix in suffixes:
+                (tmp_path / model_type / f'{name}{suffix}').write_text(model_type)
+    models_statistics = {'RandomForest': statistics(0.9, 0.9), 'XGBoost': statistics(0.8, 0.8)}
+    promote_best_models(compare_models(models_statistics), models_statistics, tmp_path)
+    assert len(list((tmp_path / 'best_model').glob('*.joblib'))) == 4
+
+    models_statistics = {'RandomForest': statistics(0.7, 0.9), 'XGBoost': statistics(0.8, 0.8)}
+    best_model_dir = promote_best_models(compare_models(models_statistics), models_statistics, tmp_path)
+
+    assert not (best_model_dir / 'classification_model.joblib').exists()
+    assert not (best_model_dir / 'classification_scaler.joblib').exists()
+    assert (best_model_dir / 'classification_model.pkl').read_text() == 'xgboost'
+    assert (best_model_dir / 'regression_model.joblib').read_text() == 'randomforest'
+    with open(best_model_dir / 'models_statistics.json') as file:
+        assert json.load(file)['promoted_from'] == {'classification': 'XGBoost', 'regression': 'RandomForest'}
+
+
+def test_training_pipeline_trains_compares_and_promotes(tmp_path):
+    data = pd.read_csv(Config.REGRESSION_DATA_PATH, usecols=['Composition', 'Eg'], nrows=N_ROWS)
+    data.to_csv(tmp_path / 'regression.csv', index=False)
+    data.assign(Eg=(data['Eg'] > data['Eg'].median()).astype(int)).to_csv(tmp_path / 'classification.csv',
+                                                                           index=False)
+
+    report = run_training_pipeline(['XGBoost', 'GradientBoosting'], tmp_path / 'classification.csv',
+                                   tmp_path / 'regression.csv', tmp_path / 'models', feature_cache_dir=None,
+                                   n_jobs=1, promote_best=True, refit='none')
+
+    with open(tmp_path / 'models' / 'comparison_report.json') as file:
+        assert json.load(file) == report
+    for task in ('classification', 'regression'):
+        assert {entry['model_type'] for entry in report[task]['ranking']} == {'XGBoost', 'GradientBoosting'}
+        assert report['promoted'][task] == report[task]['best_model_type']
+    with open(tmp_path / 'models' / 'xgboost' / 'regression_model.pkl', 'rb') as file:
+        model = pickle.load(file)
+    # The parallelism of the training run is not saved with the model
+    assert model.get_params()['n_jobs'] is None
+    assert np.isfinite(model.predict(np.zeros((1, model.n_features_in_)))).all()
@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from band_gap_ml.config import Config
+from band_gap_ml.vectorizer import FormulaVectorizer, parse_formula_fast, parse_formula_pymatgen
+
+
+@pytest.fixture(scope='module')
+def training_data():
+    return pd.read_csv(Config.REGRESSION_DATA_PATH)
+
+
+def test_fast_parser_matches_pymatgen(training_data):
+    for formula in training_data['Composition']:
+        fast = parse_formula_fast(formula)
+        assert fast is not None, formula
+        assert fast == pytest.approx(parse_formula_pymatgen(formula), rel=1e-12, abs=1e-12), formula
+
+
+def test_vectorize_batch_matches_training_features(training_data):
+    vectorizer = FormulaVectorizer()
+    features = vectorizer.vectorize_batch(training_data['Composition'])
+    expected = training_data[vectorizer.column_names].to_numpy(dtype=float)
+    np.testing.assert_allclose(features, expected, rtol=1e-9, atol=1e-9)